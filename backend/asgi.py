@@ -0,0 +1,274 @@
+"""
+ASGI 入口
+
+流式接口（调试事件 SSE、设备画面 MJPEG）直接运行在 asyncio 事件循环上：
+空闲或缓慢的订阅者只占用一个协程和一个有界缓冲区，不再各自占用一个服务线程。
+其余请求原样转交 Flask 应用，在线程池中执行，行为与 WSGI 模式一致。
+
+运行方式：python backend/main.py --mode async
+"""
+from __future__ import annotations
+
+import asyncio
+import io
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs
+
+from flask import Flask
+
+from backend.common.utils import sse_format
+from backend.common.events import debug_broker, stream_event_matches
+from backend.routes.device_routes import mjpeg_part, screen_stream_params
+from backend.untils.runtime import find_session
+
+KEEPALIVE_SECONDS = 15
+CORS_HEADERS = [(b"access-control-allow-origin", b"*")]
+
+Scope = dict
+Receive = Callable[[], Awaitable[dict]]
+Send = Callable[[dict], Awaitable[None]]
+
+
+class ThreadedWsgiBridge:
+    """
+    在线程池中运行 WSGI 应用的 ASGI 适配器
+
+    asgiref 的 WsgiToAsgi 默认把所有请求放到同一个线程执行，会让阻塞的截图、加载请求互相排队；
+    这里每个请求（以及流式响应的每次迭代）都提交到线程池，互不阻塞。
+    """
+
+    def __init__(self, wsgi_app, executor: ThreadPoolExecutor):
+        self.wsgi_app = wsgi_app
+        self.executor = executor
+
+    @staticmethod
+    def _build_environ(scope: Scope, body: bytes) -> dict:
+        server = scope.get("server") or ("127.0.0.1", 80)
+        client = scope.get("client") or ("127.0.0.1", 0)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+            "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+            "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+            "SERVER_NAME": str(server[0]),
+            "SERVER_PORT": str(server[1]),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "REMOTE_ADDR": str(client[0]),
+            "REMOTE_PORT": str(client[1]),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        for raw_name, raw_value in scope.get("headers", []):
+            name = raw_name.decode("latin-1").upper().replace("-", "_")
+            value = raw_value.decode("latin-1")
+            if name == "CONTENT_TYPE":
+                environ["CONTENT_TYPE"] = value
+            elif name == "CONTENT_LENGTH":
+                environ["CONTENT_LENGTH"] = value
+            else:
+                key = f"HTTP_{name}"
+                environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+
+        environ = self._build_environ(scope, b"".join(chunks))
+        loop = asyncio.get_running_loop()
+        started: Dict[str, object] = {}
+
+        def start_response(status, headers, exc_info=None):
+            started["status"] = int(status.split(" ", 1)[0])
+            started["headers"] = [
+                (name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers
+            ]
+            return lambda data: None
+
+        def call_app():
+            result = self.wsgi_app(environ, start_response)
+            return result, iter(result)
+
+        result, iterator = await loop.run_in_executor(self.executor, call_app)
+        try:
+            chunk = await loop.run_in_executor(self.executor, next, iterator, None)
+            await send({
+                "type": "http.response.start",
+                "status": started.get("status", 500),
+                "headers": started.get("headers", []),
+            })
+            while chunk is not None:
+                if chunk:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                chunk = await loop.run_in_executor(self.executor, next, iterator, None)
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            close = getattr(result, "close", None)
+            if close:
+                await loop.run_in_executor(self.executor, close)
+
+
+async def _watch_disconnect(receive: Receive, disconnected: asyncio.Event):
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            disconnected.set()
+            return
+
+
+def _query(scope: Scope) -> Dict[str, str]:
+    parsed = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return {k: v[-1] for k, v in parsed.items() if v}
+
+
+async def debug_stream(scope: Scope, receive: Receive, send: Send, executor: ThreadPoolExecutor):
+    """/debug/stream 的异步实现，参数与 Flask 版本一致（job_id / session_id 过滤）"""
+    params = _query(scope)
+    job_id = params.get("job_id")
+    session_id = params.get("session_id")
+    queue = debug_broker.register_async()
+    disconnected = asyncio.Event()
+    watcher = asyncio.ensure_future(_watch_disconnect(receive, disconnected))
+    closed = asyncio.ensure_future(disconnected.wait())
+    try:
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream; charset=utf-8"),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no"),
+                *CORS_HEADERS,
+            ],
+        })
+        hello = sse_format({"type": "hello", "job_id": job_id, "timestamp": int(time.time() * 1000)})
+        await send({"type": "http.response.body", "body": hello.encode("utf-8"), "more_body": True})
+        while not disconnected.is_set():
+            # 同时等待事件与客户端断开，断开后立即结束，而不是等到下一次保活超时
+            getter = asyncio.ensure_future(queue.get())
+            await asyncio.wait({getter, closed}, timeout=KEEPALIVE_SECONDS, return_when=asyncio.FIRST_COMPLETED)
+            if not getter.done():
+                getter.cancel()
+                if disconnected.is_set():
+                    break
+                body = b": keep-alive\n\n"
+            else:
+                payload = getter.result()
+                if not stream_event_matches(payload, job_id, session_id):
+                    continue
+                body = sse_format(payload).encode("utf-8")
+            await send({"type": "http.response.body", "body": body, "more_body": True})
+    except OSError:
+        # 客户端已断开，写入失败
+        pass
+    finally:
+        debug_broker.unregister_async(queue)
+        watcher.cancel()
+        closed.cancel()
+
+
+async def screen_stream(scope: Scope, receive: Receive, send: Send, executor: ThreadPoolExecutor):
+    """
+    /device/screen/stream：以 multipart/x-mixed-replace（MJPEG）持续推送设备画面
+
+    查询参数见 device_routes.screen_stream_params；WSGI 模式下由 device_routes 中的同名路由处理
+    """
+    try:
+        session_id, interval, max_side, quality = screen_stream_params(_query(scope))
+    except ValueError:
+        await _send_plain(send, 400, b"Invalid interval/max_side/quality")
+        return
+    session = find_session(session_id)
+    if session is None or not session.controller:
+        await _send_plain(send, 404, b"Device not connected")
+        return
+
+    loop = asyncio.get_running_loop()
+    disconnected = asyncio.Event()
+    watcher = asyncio.ensure_future(_watch_disconnect(receive, disconnected))
+    try:
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"multipart/x-mixed-replace; boundary=frame"),
+                (b"cache-control", b"no-cache"),
+                *CORS_HEADERS,
+            ],
+        })
+        while not disconnected.is_set():
+            part = await loop.run_in_executor(executor, mjpeg_part, session, quality, max_side)
+            if part is not None:
+                await send({"type": "http.response.body", "body": part, "more_body": True})
+            try:
+                await asyncio.wait_for(disconnected.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+    except OSError:
+        pass
+    finally:
+        watcher.cancel()
+
+
+async def _send_plain(send: Send, status: int, body: bytes):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"text/plain; charset=utf-8"), *CORS_HEADERS],
+    })
+    await send({"type": "http.response.body", "body": body, "more_body": False})
+
+
+STREAM_ROUTES: Dict[Tuple[str, str], Callable[..., Awaitable[None]]] = {
+    ("GET", "/debug/stream"): debug_stream,
+    ("GET", "/device/screen/stream"): screen_stream,
+}
+
+
+def create_asgi_app(flask_app: Optional[Flask] = None, threads: int = 64,
+                    on_startup: Optional[Callable[[], None]] = None):
+    """流式路由由事件循环处理，其余请求转交 Flask；on_startup 在 lifespan 启动时调用"""
+    if flask_app is None:
+        from backend.main import create_app
+
+        flask_app = create_app()
+
+    executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="maa-wsgi")
+    bridge = ThreadedWsgiBridge(flask_app, executor)
+
+    async def app(scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    if on_startup is not None:
+                        on_startup()
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    executor.shutdown(wait=False)
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+
+        handler = STREAM_ROUTES.get((scope["method"], scope["path"]))
+        if handler is not None:
+            await handler(scope, receive, send, executor)
+        else:
+            await bridge(scope, receive, send)
+
+    return app
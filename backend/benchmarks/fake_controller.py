@@ -0,0 +1,124 @@
+"""
+用于压测的本地替身控制器
+
+实现 MaaFramework 的 CustomController：截图返回预先生成的画面（按顺序循环），
+每次截图、点击等操作可附加人为延迟，模拟真实设备的响应时间；无需模拟器或真机。
+"""
+import itertools
+import threading
+import time
+from typing import List, Optional
+
+import numpy
+from maa.controller import CustomController
+
+
+def canned_frames(width: int, height: int, count: int = 8, noise: int = 12, seed: int = 0) -> List[numpy.ndarray]:
+    """生成 count 张 BGR 画面：渐变底色叠加随机色块与噪点，编码后的体积接近真实游戏截图"""
+    rng = numpy.random.default_rng(seed)
+    ys, xs = numpy.mgrid[0:height, 0:width]
+    frames = []
+    for idx in range(count):
+        frame = numpy.empty((height, width, 3), dtype=numpy.uint8)
+        frame[..., 0] = (xs * 255 // max(1, width - 1) + idx * 31) % 256
+        frame[..., 1] = (ys * 255 // max(1, height - 1) + idx * 17) % 256
+        frame[..., 2] = (idx * 53) % 256
+        for _ in range(24):
+            w, h = int(rng.integers(20, width // 4 + 21)), int(rng.integers(20, height // 4 + 21))
+            x, y = int(rng.integers(0, max(1, width - w))), int(rng.integers(0, max(1, height - h)))
+            frame[y:y + h, x:x + w] = rng.integers(0, 256, size=3, dtype=numpy.uint8)
+        if noise:
+            jitter = rng.integers(-noise, noise + 1, size=frame.shape, dtype=numpy.int16)
+            frame = numpy.clip(frame.astype(numpy.int16) + jitter, 0, 255).astype(numpy.uint8)
+        frames.append(frame)
+    return frames
+
+
+class FakeController(CustomController):
+    """
+    替身控制器
+
+    Args:
+        width / height: 画面分辨率
+        screencap_latency: 每次截图的人为延迟（秒）
+        input_latency: 点击、滑动等输入操作的人为延迟（秒）
+        frames: 自定义画面列表（BGR ndarray），默认按分辨率生成
+    """
+
+    def __init__(
+        self,
+        width: int = 1280,
+        height: int = 720,
+        screencap_latency: float = 0.02,
+        input_latency: float = 0.005,
+        frames: Optional[List[numpy.ndarray]] = None,
+        uuid: str = "fake-controller",
+    ):
+        super().__init__()
+        self.width = width
+        self.height = height
+        self.screencap_latency = screencap_latency
+        self.input_latency = input_latency
+        self.frames = frames or canned_frames(width, height)
+        self._uuid = uuid
+        self._cycle = itertools.cycle(range(len(self.frames)))
+        self._lock = threading.Lock()
+        self.screencaps = 0
+        self.inputs = 0
+
+    def _input(self) -> bool:
+        if self.input_latency:
+            time.sleep(self.input_latency)
+        with self._lock:
+            self.inputs += 1
+        return True
+
+    def connect(self) -> bool:
+        return True
+
+    def request_uuid(self) -> str:
+        return self._uuid
+
+    def start_app(self, intent: str) -> bool:
+        return True
+
+    def stop_app(self, intent: str) -> bool:
+        return True
+
+    def screencap(self) -> numpy.ndarray:
+        if self.screencap_latency:
+            time.sleep(self.screencap_latency)
+        with self._lock:
+            self.screencaps += 1
+            idx = next(self._cycle)
+        return self.frames[idx]
+
+    def click(self, x: int, y: int) -> bool:
+        return self._input()
+
+    def swipe(self, x1: int, y1: int, x2: int, y2: int, duration: int) -> bool:
+        return self._input()
+
+    def touch_down(self, contact: int, x: int, y: int, pressure: int) -> bool:
+        return self._input()
+
+    def touch_move(self, contact: int, x: int, y: int, pressure: int) -> bool:
+        return self._input()
+
+    def touch_up(self, contact: int) -> bool:
+        return self._input()
+
+    def click_key(self, keycode: int) -> bool:
+        return self._input()
+
+    def input_text(self, text: str) -> bool:
+        return self._input()
+
+    def key_down(self, keycode: int) -> bool:
+        return self._input()
+
+    def key_up(self, keycode: int) -> bool:
+        return self._input()
+
+    def scroll(self, dx: int, dy: int) -> bool:
+        return self._input()
@@ -0,0 +1,373 @@
+"""
+设备 / 调试接口压测
+
+在本进程内启动后端（waitress，未安装时退回 werkzeug 多线程服务器），为每个会话接入 FakeController，
+按目标速率并发请求 /device/screenshot、/debug/ocr_text、/debug/node，同时保持若干 /debug/stream 订阅者，
+最后输出吞吐、延迟分位数、SSE 事件延迟与内存增长（JSON）。
+
+用法（在仓库根目录）：
+    python -m backend.benchmarks.load --duration 30 --screenshot-rps 20 --ocr-rps 5 --node-rps 5 --sse 200
+    python -m backend.benchmarks.load --sessions 4 --width 1920 --height 1080 --screencap-latency 0.05 --out load.json
+
+延迟从请求的计划发出时间算起（开环），服务端跟不上时排队时间会计入延迟，不会被掩盖。
+OCR 需要 --resource 指向带 model/ocr 的资源包，否则识别结果为空，但截图与调度开销仍会被测到。
+"""
+import argparse
+import http.client
+import json
+import os
+import shutil
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from backend.common.memory import rss_bytes
+
+LOAD_ENTRY = "LoadTest_Entry"
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50_ms": None, "p90_ms": None, "p99_ms": None, "max_ms": None, "mean_ms": None}
+    ordered = sorted(values)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+
+    return {
+        "p50_ms": pick(0.50),
+        "p90_ms": pick(0.90),
+        "p99_ms": pick(0.99),
+        "max_ms": round(ordered[-1], 2),
+        "mean_ms": round(statistics.fmean(ordered), 2),
+    }
+
+
+# ---------------------------
+# 服务端
+# ---------------------------
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(threads: int):
+    """在后台线程中启动后端，返回 (port, stop)"""
+    from backend.main import create_app
+
+    app = create_app()
+    port = _free_port()
+    try:
+        from waitress import create_server
+
+        server = create_server(app, host="127.0.0.1", port=port, threads=threads, connection_limit=threads * 8)
+        stop = server.close
+        target = server.run
+    except ImportError:
+        from werkzeug.serving import make_server
+
+        server = make_server("127.0.0.1", port, app, threaded=True)
+        stop = server.shutdown
+        target = server.serve_forever
+    threading.Thread(target=target, name="load-server", daemon=True).start()
+    return port, stop
+
+
+def prepare_sessions(count: int, resource_path: str, width: int, height: int, screencap_latency: float,
+                     input_latency: float) -> List[Any]:
+    from backend.benchmarks.fake_controller import FakeController, canned_frames
+    from backend.untils.runtime import sessions
+
+    frames = canned_frames(width, height)
+    controllers = []
+    for idx in range(count):
+        maafw = sessions().get_or_create(f"load-{idx}")
+        controller = FakeController(width, height, screencap_latency, input_latency, frames=frames, uuid=f"fake-{idx}")
+        if not maafw.connect_controller(controller, {"type": "fake", "name": f"fake-{idx}"}):
+            raise RuntimeError("Failed to connect fake controller")
+        success, msg = maafw.load_resource([resource_path])
+        if not success:
+            raise RuntimeError(f"Failed to load resource {resource_path}: {msg}")
+        controllers.append(controller)
+    return controllers
+
+
+def minimal_bundle(root: str) -> str:
+    """只含一个入口节点的资源包（/debug/node 的节点通过 pipeline_override 传入）"""
+    os.makedirs(os.path.join(root, "pipeline"), exist_ok=True)
+    with open(os.path.join(root, "pipeline", "load.json"), "w", encoding="utf-8") as f:
+        json.dump({LOAD_ENTRY: {"recognition": "DirectHit"}}, f)
+    return root
+
+
+# ---------------------------
+# 客户端
+# ---------------------------
+class EndpointLoad:
+    """
+    以固定速率（开环）压测一个接口
+
+    第 i 个请求计划在 start + i / rps 发出，由 workers 个线程各自持有 keep-alive 连接领取执行。
+    """
+
+    def __init__(self, name: str, method: str, path: str, rps: float, workers: int, port: int,
+                 body_for, session_ids: List[str]):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.rps = rps
+        self.workers = workers
+        self.port = port
+        self.body_for = body_for
+        self.session_ids = session_ids
+        self.latencies: List[float] = []
+        self.service_times: List[float] = []
+        self.statuses: Counter = Counter()
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+        self._next = 0
+
+    def _ticket(self) -> int:
+        with self._lock:
+            ticket = self._next
+            self._next += 1
+            return ticket
+
+    def _worker(self, started: float, deadline: float):
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+        while True:
+            ticket = self._ticket()
+            due = started + ticket / self.rps
+            if due >= deadline:
+                break
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            session_id = self.session_ids[ticket % len(self.session_ids)]
+            body = self.body_for(ticket)
+            headers = {"X-Session-Id": session_id, "Accept-Encoding": "gzip"}
+            payload = None
+            if body is not None:
+                payload = json.dumps(body).encode("utf-8")
+                headers["Content-Type"] = "application/json"
+            sent = time.perf_counter()
+            try:
+                conn.request(self.method, self.path, body=payload, headers=headers)
+                resp = conn.getresponse()
+                data = resp.read()
+                status = str(resp.status)
+            except (OSError, http.client.HTTPException) as exc:
+                data = b""
+                status = type(exc).__name__
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+            ended = time.perf_counter()
+            with self._lock:
+                self.latencies.append((ended - due) * 1000)
+                self.service_times.append((ended - sent) * 1000)
+                self.statuses[status] += 1
+                self.bytes_received += len(data)
+        conn.close()
+
+    def start(self, started: float, deadline: float) -> List[threading.Thread]:
+        threads = [
+            threading.Thread(target=self._worker, args=(started, deadline), name=f"load-{self.name}-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for t in threads:
+            t.start()
+        return threads
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        total = sum(self.statuses.values())
+        ok = self.statuses.get("200", 0)
+        return {
+            "target_rps": self.rps,
+            "requests": total,
+            "ok": ok,
+            "errors": total - ok,
+            "statuses": dict(self.statuses),
+            "throughput_rps": round(ok / elapsed, 2) if elapsed else None,
+            "received_mb": round(self.bytes_received / 1048576, 2),
+            "latency": percentiles(self.latencies),
+            "service_time": percentiles(self.service_times),
+        }
+
+
+class SseSubscribers:
+    """保持 count 个 /debug/stream 长连接，统计收到的事件数与事件延迟（事件 timestamp 到收到的时间差）"""
+
+    def __init__(self, count: int, port: int):
+        self.count = count
+        self.port = port
+        self.connected = 0
+        self.failed = 0
+        self.events = 0
+        self.lags: List[float] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _subscriber(self):
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=30)
+        try:
+            conn.request("GET", "/debug/stream")
+            resp = conn.getresponse()
+            if resp.status != 200:
+                with self._lock:
+                    self.failed += 1
+                return
+            with self._lock:
+                self.connected += 1
+            while not self._stop.is_set():
+                line = resp.fp.readline()
+                if not line:
+                    break
+                if not line.startswith(b"data: "):
+                    continue
+                received = time.time() * 1000
+                try:
+                    payload = json.loads(line[6:])
+                except ValueError:
+                    continue
+                with self._lock:
+                    self.events += 1
+                    if payload.get("timestamp") and payload.get("type") != "hello":
+                        self.lags.append(received - payload["timestamp"])
+        except (OSError, http.client.HTTPException):
+            with self._lock:
+                self.failed += 1
+        finally:
+            conn.close()
+
+    def start(self):
+        for i in range(self.count):
+            threading.Thread(target=self._subscriber, name=f"load-sse-{i}", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "subscribers": self.count,
+                "connected": self.connected,
+                "failed": self.failed,
+                "events": self.events,
+                "lag": percentiles(self.lags),
+            }
+
+
+def _node_body(ticket: int) -> dict:
+    return {
+        "node": {
+            "id": f"LoadTest_{ticket % 16}",
+            "recognition": "DirectHit",
+            "action": "Click",
+            "target": [10, 10, 5, 5],
+        }
+    }
+
+
+def run(args) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix="maa-load-")
+    cwd = os.getcwd()
+    # MaaFramework 会在 cwd 下写 config/、debug/，压测在临时目录中进行
+    os.chdir(workdir)
+    try:
+        resource_path = args.resource or minimal_bundle(os.path.join(workdir, "res"))
+        rss_start = rss_bytes()
+        port, stop_server = start_server(args.threads)
+        controllers = prepare_sessions(args.sessions, resource_path, args.width, args.height,
+                                       args.screencap_latency, args.input_latency)
+        session_ids = [f"load-{i}" for i in range(args.sessions)]
+        rss_ready = rss_bytes()
+
+        sse = SseSubscribers(args.sse, port)
+        sse.start()
+        time.sleep(min(2.0, 0.01 * args.sse + 0.2))
+
+        loads = [
+            EndpointLoad("screenshot", "GET", "/device/screenshot", args.screenshot_rps, args.workers, port,
+                         lambda _: None, session_ids),
+            EndpointLoad("ocr_text", "POST", "/debug/ocr_text", args.ocr_rps, args.workers, port,
+                         lambda _: {"roi": [0, 0, 200, 100]}, session_ids),
+            EndpointLoad("debug_node", "POST", "/debug/node", args.node_rps, args.workers, port,
+                         _node_body, session_ids),
+        ]
+        loads = [load for load in loads if load.rps > 0]
+
+        rss_samples = [rss_ready]
+        started = time.perf_counter()
+        deadline = started + args.duration
+        threads = []
+        for load in loads:
+            threads.extend(load.start(started, deadline))
+        while any(t.is_alive() for t in threads):
+            time.sleep(0.5)
+            rss_samples.append(rss_bytes())
+        elapsed = time.perf_counter() - started
+        # 等待排队中的调试作业把事件推送完
+        time.sleep(1.0)
+        sse.stop()
+        rss_end = rss_bytes()
+        stop_server()
+
+        return {
+            "params": {k: v for k, v in vars(args).items() if k != "out"},
+            "elapsed_s": round(elapsed, 2),
+            "endpoints": {load.name: load.report(elapsed) for load in loads},
+            "sse": sse.report(),
+            "controllers": {
+                "screencaps": sum(c.screencaps for c in controllers),
+                "inputs": sum(c.inputs for c in controllers),
+            },
+            "memory": {
+                "rss_start_mb": round(rss_start / 1048576, 1),
+                "rss_ready_mb": round(rss_ready / 1048576, 1),
+                "rss_peak_mb": round(max(rss_samples) / 1048576, 1),
+                "rss_end_mb": round(rss_end / 1048576, 1),
+                "growth_during_load_mb": round((rss_end - rss_ready) / 1048576, 1),
+            },
+        }
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Load-test device and debug endpoints against fake controllers")
+    parser.add_argument("--duration", type=float, default=20, help="压测时长（秒）")
+    parser.add_argument("--sessions", type=int, default=1, help="会话（替身设备）数量，请求按会话轮询分配")
+    parser.add_argument("--screenshot-rps", type=float, default=10)
+    parser.add_argument("--ocr-rps", type=float, default=5)
+    parser.add_argument("--node-rps", type=float, default=5)
+    parser.add_argument("--workers", type=int, default=16, help="每个接口的客户端线程数（最大并发）")
+    parser.add_argument("--sse", type=int, default=50, help="/debug/stream 订阅者数量")
+    parser.add_argument("--threads", type=int, default=64, help="服务端工作线程数")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--screencap-latency", type=float, default=0.02, help="替身设备截图延迟（秒）")
+    parser.add_argument("--input-latency", type=float, default=0.005, help="替身设备输入操作延迟（秒）")
+    parser.add_argument("--resource", help="加载的资源包路径（默认生成只含一个节点的资源包）")
+    parser.add_argument("--out", help="结果 JSON 输出路径（默认打印到 stdout）")
+    args = parser.parse_args(argv)
+    if args.sse and args.sse >= args.threads:
+        print("[load] warning: SSE subscribers occupy server threads; raise --threads above --sse", file=sys.stderr)
+
+    report = run(args)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+ResourcesManager 与资源路由基准
+
+用法（在仓库根目录）：
+    python -m backend.benchmarks.resources --sizes 1000,10000,50000,200000 --out bench.json
+    python -m backend.benchmarks.resources --sizes 1000 --compare bench.json
+
+每个规模生成一个合成资源包（见 synthetic.py），分别测量 ResourcesManager 的各个方法，
+以及通过 Flask 测试客户端调用的资源接口；结果（毫秒，min / median / mean）写为 JSON，
+--compare 读取旧结果并打印每项的耗时比值。
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from backend.benchmarks.synthetic import generate_bundle, sample_node, template_path
+
+DEFAULT_SIZES = (1000, 10000, 50000, 200000)
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        "min_ms": round(min(timings), 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "repeat": repeat,
+    }
+
+
+def _expect_ok(response):
+    if response.status_code != 200:
+        raise RuntimeError(f"{response.request.path} -> {response.status_code}: {response.get_data(as_text=True)[:200]}")
+    return response
+
+
+def bench_manager(bundle: Dict[str, Any], repeat: int) -> Dict[str, Dict[str, float]]:
+    from backend.untils import ResourcesManager
+
+    root = bundle["root"]
+    manager = ResourcesManager(root)
+    rng = random.Random(bundle["seed"])
+    first_file = bundle["files"][0]
+    target = sample_node(bundle, rng)
+    images = [template_path(i) for i in range(min(10, bundle["images"]))] or ["bench/missing.png"]
+    nodes = manager.get_nodes_by_file(root, first_file)
+
+    def save():
+        nodes[target]["timeout"] = nodes[target].get("timeout", 0) + 1
+        manager.save_nodes(root, first_file, nodes)
+
+    return {
+        "load_all": measure(manager._load_all, repeat),
+        "refresh_unchanged": measure(manager.refresh, repeat),
+        "list_all_files": measure(manager.list_all_files, repeat),
+        "search_nodes": measure(lambda: manager.search_nodes(target[-4:]), repeat),
+        "search_nodes_regex": measure(lambda: manager.search_nodes(r"N0+1\d$", use_regex=True), repeat),
+        "search_nodes_miss": measure(lambda: manager.search_nodes("no-such-node"), repeat),
+        "check_image_references": measure(lambda: manager.check_image_references(root, images), repeat),
+        "save_nodes": measure(save, repeat),
+        "get_nodes_by_file": measure(lambda: manager.get_nodes_by_file(root, first_file), repeat),
+    }
+
+
+def bench_routes(bundle: Dict[str, Any], repeat: int) -> Dict[str, Dict[str, float]]:
+    from backend.common.utils import save_config
+    from backend.main import create_app
+
+    root = bundle["root"]
+    save_config({
+        "resource_profiles": [{"name": "bench", "paths": [root]}],
+        "current_state": {"device_index": 0, "resource_profile_index": 0},
+    }, flush=True)
+    client = create_app().test_client()
+    first_file = bundle["files"][0]
+    target = sample_node(bundle, random.Random(bundle["seed"]))
+    file_req = {"source": root, "filename": first_file}
+    nodes = _expect_ok(client.post("/resource/file/nodes", json=file_req)).get_json()["nodes"]
+    del_images = [{"path": template_path(i)} for i in range(min(10, bundle["images"]))] or [{"path": "bench/missing.png"}]
+
+    def save():
+        nodes[target]["timeout"] = nodes[target].get("timeout", 0) + 1
+        _expect_ok(client.post("/resource/file/save", json={**file_req, "nodes": nodes}))
+
+    results = {
+        "route_file_nodes": measure(lambda: _expect_ok(client.post("/resource/file/nodes", json=file_req)), repeat),
+        "route_file_nodes_gzip": measure(
+            lambda: _expect_ok(client.post("/resource/file/nodes", json=file_req, headers={"Accept-Encoding": "gzip"})),
+            repeat,
+        ),
+        "route_search_nodes": measure(
+            lambda: _expect_ok(client.post("/resource/search/nodes", json={"query": target[-4:]})), repeat
+        ),
+        "route_check_unused": measure(
+            lambda: _expect_ok(client.post(
+                "/resource/images/check-unused", json={"source": root, "del_images": del_images}
+            )),
+            repeat,
+        ),
+        "route_file_save": measure(save, repeat),
+    }
+    if bundle["images"]:
+        results["route_file_templates"] = measure(
+            lambda: _expect_ok(client.post("/resource/file/templates", json=file_req)), repeat
+        )
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return out.stdout.strip()
+    except Exception:
+        return None
+
+
+def run(sizes: List[int], repeat: int, nodes_per_file: int, fanout: int, images: int, image_size: int,
+        routes: bool = True, keep: bool = False) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix="maa-bench-")
+    cwd = os.getcwd()
+    # config.json 写在 cwd，基准在临时目录中运行，避免改动真实配置
+    os.chdir(workdir)
+    results = []
+    try:
+        for size in sizes:
+            root = os.path.join(workdir, f"res_{size}")
+            started = time.perf_counter()
+            bundle = generate_bundle(root, size, nodes_per_file=nodes_per_file, fanout=fanout,
+                                     images=images, image_size=image_size)
+            generate_ms = round((time.perf_counter() - started) * 1000, 1)
+            print(f"[bench] {size} nodes / {len(bundle['files'])} files generated in {generate_ms} ms", file=sys.stderr)
+
+            ops = bench_manager(bundle, repeat)
+            if routes:
+                ops.update(bench_routes(bundle, repeat))
+            for op, stats in ops.items():
+                results.append({"size": size, "files": len(bundle["files"]), "op": op, **stats})
+                print(f"[bench] {size:>7} {op:<28} median {stats['median_ms']:>10.3f} ms", file=sys.stderr)
+    finally:
+        os.chdir(cwd)
+        if not keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": int(time.time()),
+            "params": {
+                "sizes": sizes,
+                "repeat": repeat,
+                "nodes_per_file": nodes_per_file,
+                "fanout": fanout,
+                "images": images,
+                "image_size": image_size,
+            },
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """按 (size, op) 对比中位数，ratio > 1 表示比基线慢"""
+    base = {(r["size"], r["op"]): r for r in baseline.get("results", [])}
+    rows = []
+    for r in current["results"]:
+        old = base.get((r["size"], r["op"]))
+        if not old or not old.get("median_ms"):
+            continue
+        rows.append({
+            "size": r["size"],
+            "op": r["op"],
+            "baseline_ms": old["median_ms"],
+            "current_ms": r["median_ms"],
+            "ratio": round(r["median_ms"] / old["median_ms"], 3),
+        })
+    return rows
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark ResourcesManager and resource routes on synthetic bundles")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="节点总数，逗号分隔")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--nodes-per-file", type=int, default=500)
+    parser.add_argument("--fanout", type=int, default=3)
+    parser.add_argument("--images", type=int, default=50, help="模板图片数量")
+    parser.add_argument("--image-size", type=int, default=64, help="模板图片边长（像素）")
+    parser.add_argument("--no-routes", action="store_true", help="只测 ResourcesManager，不测 Flask 接口")
+    parser.add_argument("--keep", action="store_true", help="保留生成的临时资源目录")
+    parser.add_argument("--out", help="结果 JSON 输出路径（默认打印到 stdout）")
+    parser.add_argument("--compare", help="与之前的结果 JSON 对比")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    report = run(sizes, args.repeat, args.nodes_per_file, args.fanout, args.images, args.image_size,
+                 routes=not args.no_routes, keep=args.keep)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            report["comparison"] = compare(report, json.load(f))
+        for row in report["comparison"]:
+            flag = "  <-- slower" if row["ratio"] > 1.2 else ""
+            print(f"[compare] {row['size']:>7} {row['op']:<28} x{row['ratio']:<6}{flag}", file=sys.stderr)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
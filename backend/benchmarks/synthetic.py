@@ -0,0 +1,101 @@
+"""
+合成资源包生成器
+
+按参数生成 pipeline/*.json 与 image/*.png，节点之间按 next 扇出随机连接，部分节点引用模板图片。
+同样的参数与 seed 总是生成同样的内容，便于在不同提交之间对比基准结果。
+"""
+import json
+import os
+import random
+from typing import Any, Dict, List, Optional
+
+
+def node_id(file_idx: int, node_idx: int) -> str:
+    return f"F{file_idx:04d}_N{node_idx:05d}"
+
+
+def template_path(image_idx: int) -> str:
+    return f"bench/tpl_{image_idx:05d}.png"
+
+
+def _write_images(image_root: str, count: int, size: int, seed: int):
+    from PIL import Image
+
+    rng = random.Random(seed)
+    os.makedirs(os.path.join(image_root, "bench"), exist_ok=True)
+    for idx in range(count):
+        color = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+        Image.new("RGB", (size, size), color).save(os.path.join(image_root, template_path(idx)))
+
+
+def generate_bundle(
+    root: str,
+    total_nodes: int,
+    nodes_per_file: int = 500,
+    fanout: int = 3,
+    images: int = 50,
+    image_size: int = 64,
+    template_ratio: float = 0.3,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    在 root 下生成一个资源包（root/pipeline、root/image），返回生成参数与文件列表
+
+    Args:
+        total_nodes: 节点总数
+        nodes_per_file: 每个 pipeline 文件的节点数
+        fanout: 每个节点 next 列表的长度
+        images: 模板图片数量（0 表示不生成图片）
+        image_size: 模板图片边长（像素）
+        template_ratio: 引用模板图片（TemplateMatch）的节点比例
+    """
+    rng = random.Random(seed)
+    pipeline_dir = os.path.join(root, "pipeline")
+    os.makedirs(pipeline_dir, exist_ok=True)
+
+    file_count = max(1, -(-total_nodes // nodes_per_file))
+    sizes = [nodes_per_file] * file_count
+    sizes[-1] = total_nodes - nodes_per_file * (file_count - 1)
+    all_ids = [node_id(f, n) for f, size in enumerate(sizes) for n in range(size)]
+
+    filenames: List[str] = []
+    for file_idx, size in enumerate(sizes):
+        nodes: Dict[str, Any] = {}
+        for node_idx in range(size):
+            data: Dict[str, Any] = {
+                "next": rng.sample(all_ids, min(fanout, len(all_ids))),
+                "timeout": 20000,
+            }
+            if images and rng.random() < template_ratio:
+                data["recognition"] = "TemplateMatch"
+                data["template"] = [template_path(rng.randrange(images))]
+                data["threshold"] = 0.8
+            else:
+                data["recognition"] = "OCR"
+                data["expected"] = [f"text {rng.randrange(10000)}"]
+            data["action"] = rng.choice(["Click", "DoNothing", "Swipe"])
+            nodes[node_id(file_idx, node_idx)] = data
+        fname = f"bench_{file_idx:04d}.json"
+        with open(os.path.join(pipeline_dir, fname), "w", encoding="utf-8") as f:
+            json.dump(nodes, f, ensure_ascii=False, indent=4)
+        filenames.append(fname)
+
+    if images:
+        _write_images(os.path.join(root, "image"), images, image_size, seed)
+
+    return {
+        "root": root,
+        "nodes": total_nodes,
+        "files": filenames,
+        "nodes_per_file": nodes_per_file,
+        "fanout": fanout,
+        "images": images,
+        "image_size": image_size,
+        "seed": seed,
+    }
+
+
+def sample_node(bundle: Dict[str, Any], rng: Optional[random.Random] = None) -> str:
+    """随机取一个存在的节点 id（用于搜索、保存等操作的输入）"""
+    rng = rng or random.Random(bundle["seed"])
+    return node_id(0, rng.randrange(min(bundle["nodes"], bundle["nodes_per_file"])))
@@ -0,0 +1,153 @@
+import atexit
+import copy
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+from backend.common.files import replacement_mode
+
+CONFIG_FILE = "config.json"
+DEFAULT_CONFIG = {
+    "devices": [],
+    "resource_profiles": [{"name": "Default Profile", "paths": []}],
+    "current_state": {"device_index": 0, "resource_profile_index": 0},
+}
+
+FLUSH_DELAY_SECONDS = 0.2
+# 落盘失败后按指数退避重试，间隔上限
+MAX_RETRY_DELAY_SECONDS = 30.0
+
+
+class ConfigStore:
+    """
+    进程内共享的配置存储
+
+    读取直接返回内存中的副本；写入在锁内按顶层键合并，随后延迟 FLUSH_DELAY_SECONDS 统一落盘，
+    短时间内的多次写入只写一次文件。落盘先写临时文件再 os.replace，避免写到一半的 config.json。
+    文件被外部修改（mtime/size 变化）且没有待写入的改动时，下次读取会重新加载。
+    落盘失败时保留改动，按指数退避（上限 MAX_RETRY_DELAY_SECONDS）重新安排写入。
+    """
+
+    def __init__(self, path: str = CONFIG_FILE, flush_delay: float = FLUSH_DELAY_SECONDS):
+        self.path = path
+        self.flush_delay = flush_delay
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._data: Optional[Dict[str, Any]] = None
+        self._stamp: Optional[tuple] = None
+        self._dirty = False
+        self._timer: Optional[threading.Timer] = None
+        self._retry_delay = flush_delay
+        self.last_error: Optional[str] = None
+
+    # ---------------------------
+    # 读取
+    # ---------------------------
+    def _file_stamp(self) -> Optional[tuple]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _read_file(self) -> Dict[str, Any]:
+        cfg: Dict[str, Any] = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    cfg = json.load(f) or {}
+            except Exception:
+                cfg = {}
+        for k, v in DEFAULT_CONFIG.items():
+            if k not in cfg:
+                cfg[k] = copy.deepcopy(v)
+        return cfg
+
+    def _ensure_loaded(self):
+        stamp = self._file_stamp()
+        if self._data is None or (not self._dirty and stamp != self._stamp):
+            self._data = self._read_file()
+            self._stamp = stamp
+
+    def load(self) -> Dict[str, Any]:
+        """返回当前配置的深拷贝，调用方可以随意修改"""
+        with self._lock:
+            self._ensure_loaded()
+            return copy.deepcopy(self._data)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            self._ensure_loaded()
+            return copy.deepcopy(self._data.get(key, default))
+
+    # ---------------------------
+    # 写入
+    # ---------------------------
+    def update(self, data: Dict[str, Any], flush: bool = False) -> bool:
+        """合并顶层键并安排落盘；flush=True 时同步写入并返回是否成功"""
+        with self._lock:
+            self._ensure_loaded()
+            self._data.update(copy.deepcopy(data))
+            self._dirty = True
+            if not flush:
+                self._schedule()
+                return True
+        return self.flush()
+
+    def _schedule(self, delay: Optional[float] = None):
+        if self._timer is not None:
+            return
+        self._timer = threading.Timer(self.flush_delay if delay is None else delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self) -> bool:
+        """把内存中的配置写回文件（无改动时直接返回）"""
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return True
+                text = json.dumps(self._data, ensure_ascii=False, indent=4)
+                self._dirty = False
+
+            try:
+                self._atomic_write(text)
+            except Exception as exc:
+                with self._lock:
+                    self._dirty = True
+                    self.last_error = str(exc)
+                    self._retry_delay = min(MAX_RETRY_DELAY_SECONDS, max(self._retry_delay, self.flush_delay) * 2)
+                    self._schedule(self._retry_delay)
+                return False
+
+            with self._lock:
+                self.last_error = None
+                self._retry_delay = self.flush_delay
+                if not self._dirty:
+                    self._stamp = self._file_stamp()
+            return True
+
+    def _atomic_write(self, text: str):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        mode = replacement_mode(self.path)
+        fd, tmp_path = tempfile.mkstemp(prefix=".config-", suffix=".tmp", dir=directory)
+        try:
+            os.chmod(tmp_path, mode)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+config_store = ConfigStore()
+atexit.register(config_store.flush)
@@ -0,0 +1,94 @@
+"""
+调试事件分发
+
+只依赖标准库，导入 MaaFramework 之前即可使用：SSE 路由、预热与启动流程都可以先订阅 / 发布事件。
+"""
+import asyncio
+from queue import Queue
+from threading import Lock
+from typing import List, Optional, Tuple
+
+from backend.common.metrics import registry
+
+
+class DebugStreamBroker:
+    """
+    简易的 SSE 事件分发器
+
+    线程模式的订阅者使用 Queue；异步模式的订阅者使用绑定到事件循环的有界 asyncio.Queue，
+    发布时通过 call_soon_threadsafe 投递，缓冲满时丢弃最旧的事件，慢客户端不会拖累发布方。
+    """
+
+    def __init__(self):
+        self._clients: List[Queue] = []
+        self._async_clients: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+        self._lock = Lock()
+
+    def register(self) -> Queue:
+        q = Queue()
+        with self._lock:
+            self._clients.append(q)
+        return q
+
+    def unregister(self, q: Queue):
+        with self._lock:
+            if q in self._clients:
+                self._clients.remove(q)
+
+    def register_async(self, maxsize: int = 256) -> asyncio.Queue:
+        """在事件循环线程中调用，返回该订阅者的异步缓冲区"""
+        loop = asyncio.get_running_loop()
+        q: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        with self._lock:
+            self._async_clients.append((loop, q))
+        return q
+
+    def unregister_async(self, q: asyncio.Queue):
+        with self._lock:
+            self._async_clients = [(loop, c) for loop, c in self._async_clients if c is not q]
+
+    @property
+    def client_count(self) -> int:
+        with self._lock:
+            return len(self._clients) + len(self._async_clients)
+
+    @staticmethod
+    def _offer(q: asyncio.Queue, payload: dict):
+        if q.full():
+            try:
+                q.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+        q.put_nowait(payload)
+
+    def publish(self, payload: dict):
+        if not payload:
+            return
+        with self._lock:
+            for q in list(self._clients):
+                try:
+                    q.put_nowait(payload)
+                except Exception:
+                    # 忽略单个客户端队列的异常，避免阻塞其他客户端
+                    pass
+            for loop, q in list(self._async_clients):
+                try:
+                    loop.call_soon_threadsafe(self._offer, q, payload)
+                except RuntimeError:
+                    # 事件循环已关闭
+                    pass
+
+
+def stream_event_matches(payload: dict, job_id: Optional[str] = None, session_id: Optional[str] = None) -> bool:
+    """按作业 / 会话过滤 SSE 事件；不带 session_id 的全局事件对所有会话可见"""
+    if job_id and payload.get("job_id") != job_id:
+        return False
+    if session_id and payload.get("session_id") not in (None, session_id):
+        return False
+    return True
+
+
+debug_broker = DebugStreamBroker()
+registry.register_collector(
+    "maa_sse_clients", "Connected debug stream subscribers", lambda: [({}, debug_broker.client_count)]
+)
@@ -0,0 +1,28 @@
+"""
+文件写入辅助
+"""
+import os
+import stat
+
+
+def _read_umask() -> int:
+    # os.umask 只能“设置并返回旧值”，在启动时读一次，避免运行中与其他线程竞争
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+_UMASK = _read_umask()
+
+
+def replacement_mode(path: str) -> int:
+    """
+    原子替换 path 时临时文件应有的权限
+
+    tempfile.mkstemp 创建的文件权限为 0600，os.replace 后会沿用到目标文件上；
+    替换前改为原文件的权限，文件尚不存在时按 umask 取默认权限。
+    """
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except OSError:
+        return 0o666 & ~_UMASK
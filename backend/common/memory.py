@@ -0,0 +1,48 @@
+"""
+内存占用统计
+"""
+import os
+import sys
+from typing import Any, Optional, Set
+
+
+def rss_bytes() -> int:
+    """当前常驻内存；非 Linux 平台退回到峰值 RSS，Windows 上不可用时返回 0"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def deep_sizeof(obj: Any, seen: Optional[Set[int]] = None) -> int:
+    """
+    递归累加容器及其内容的 sys.getsizeof
+
+    seen 在多次调用间共享时，已计入的对象（如两个结构共同引用的节点数据）不会重复计算。
+    """
+    seen = set() if seen is None else seen
+    total = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif hasattr(item, "__slots__"):
+            for name in item.__slots__:
+                if hasattr(item, name):
+                    stack.append(getattr(item, name))
+    return total
@@ -0,0 +1,274 @@
+"""
+进程内指标收集，输出 Prometheus 文本格式（/system/metrics）
+
+不依赖 prometheus_client：计数器、仪表与直方图都是带锁的简单字典，按标签组合分别累计。
+领域指标（节点数、SSE 客户端数等）通过 register_collector 注册的回调在抓取时读取。
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from flask import Flask, g, request
+
+LabelValues = Tuple[str, ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+    return "{" + inner + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key: LabelValues) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    @abstractmethod
+    def samples(self) -> List[Sample]:
+        """当前所有标签组合的 (名称, 标签, 取值)"""
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            return [(self.name, self._labels(k), v) for k, v in self._values.items()]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str):
+        self.inc(-amount, **labels)
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            return [(self.name, self._labels(k), v) for k, v in self._values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [各桶计数..., 总数, 总和]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 2)
+            if idx < len(self.buckets):
+                state[idx] += 1
+            state[-2] += 1
+            state[-1] += value
+
+    def time(self, **labels: str) -> "_Timer":
+        return _Timer(self, labels)
+
+    def samples(self) -> List[Sample]:
+        out: List[Sample] = []
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        for key, state in items:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                out.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            out.append((f"{self.name}_bucket", {**labels, "le": "+Inf"}, state[-2]))
+            out.append((f"{self.name}_count", labels, state[-2]))
+            out.append((f"{self.name}_sum", labels, state[-1]))
+        return out
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self._histogram = histogram
+        self._labels = labels
+        self._started = 0.0
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._histogram.observe(time.perf_counter() - self._started, **self._labels)
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Tuple[str, str, Callable[[], Iterable[Tuple[Dict[str, str], float]]]]] = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def register_collector(self, name: str, help_text: str, collect: Callable[[], Iterable[Tuple[Dict[str, str], float]]]):
+        """注册抓取时才计算的仪表：collect() 返回 [(labels, value), ...]"""
+        with self._lock:
+            self._collectors = [c for c in self._collectors if c[0] != name]
+            self._collectors.append((name, help_text, collect))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+
+        lines: List[str] = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for name, help_text, collect in collectors:
+            try:
+                values = list(collect())
+            except Exception:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in values:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# ---------------------------
+# HTTP 指标
+# ---------------------------
+http_requests = registry.counter("maa_http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+http_errors = registry.counter("maa_http_errors_total", "HTTP requests that raised or returned 5xx", ("method", "route"))
+http_latency = registry.histogram("maa_http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+http_request_size = registry.histogram("maa_http_request_size_bytes", "HTTP request body size", ("method", "route"), SIZE_BUCKETS)
+http_response_size = registry.histogram("maa_http_response_size_bytes", "HTTP response body size", ("method", "route"), SIZE_BUCKETS)
+http_in_flight = registry.gauge("maa_http_requests_in_flight", "HTTP requests currently being handled")
+
+# ---------------------------
+# 截图指标
+# ---------------------------
+screencap_capture = registry.histogram("maa_screencap_capture_seconds", "Time waiting for the controller screencap")
+screencap_convert = registry.histogram("maa_screencap_convert_seconds", "Time converting the raw frame to a PIL image")
+image_encode = registry.histogram("maa_image_encode_seconds", "Time encoding screenshots for responses", ("format",))
+
+
+def _route_label() -> str:
+    rule = request.url_rule
+    return rule.rule if rule is not None else "<unmatched>"
+
+
+def _before_request():
+    g._metrics_started = time.perf_counter()
+    g._metrics_done = False
+    http_in_flight.inc()
+
+
+def _after_request(response):
+    started = g.get("_metrics_started")
+    if started is None:
+        return response
+    route = _route_label()
+    method = request.method
+    http_latency.observe(time.perf_counter() - started, method=method, route=route)
+    http_requests.inc(method=method, route=route, status=str(response.status_code))
+    if response.status_code >= 500:
+        http_errors.inc(method=method, route=route)
+    if request.content_length:
+        http_request_size.observe(request.content_length, method=method, route=route)
+    if not response.is_streamed and response.content_length is not None:
+        http_response_size.observe(response.content_length, method=method, route=route)
+    g._metrics_done = True
+    return response
+
+
+def _teardown_request(exc: Optional[BaseException]):
+    if g.get("_metrics_started") is None:
+        return
+    http_in_flight.dec()
+    if exc is not None and not g.get("_metrics_done"):
+        route = _route_label()
+        http_errors.inc(method=request.method, route=route)
+        http_requests.inc(method=request.method, route=route, status="500")
+
+
+def init_metrics(app: Flask) -> None:
+    """在 create_app 中调用：注册请求计时钩子"""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
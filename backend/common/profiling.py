@@ -0,0 +1,233 @@
+"""
+按需的单请求性能分析
+
+config.json 中开启 "profiling": true 后，带请求头 X-Maa-Profile 或查询参数 ?profile= 的请求会在分析器下执行：
+    cprofile（默认）：确定性分析，输出 .pstats，可用 snakeviz / gprof2dot 查看；
+    sample：采样分析（按固定间隔抓取请求线程的调用栈），输出折叠栈 .collapsed，可直接交给 flamegraph.pl / speedscope。
+结果写入 profiles 目录（config 中 profiles_dir 可覆盖），响应头 X-Maa-Profile-Id 返回分析 id，
+之后通过 /system/profiles/<id> 下载。
+"""
+from __future__ import annotations
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from flask import Flask, g, request
+
+from backend.common.utils import load_config
+
+PROFILE_HEADER = "X-Maa-Profile"
+PROFILE_ID_HEADER = "X-Maa-Profile-Id"
+PROFILE_MODES = ("cprofile", "sample")
+DEFAULT_PROFILES_DIR = "profiles"
+DEFAULT_SAMPLE_INTERVAL = 0.001
+PROFILE_HISTORY_LIMIT = 50
+
+PROFILE_EXTENSIONS = {"cprofile": ".pstats", "sample": ".collapsed"}
+
+
+def profiling_enabled() -> bool:
+    return bool(load_config().get("profiling", False))
+
+
+def profiles_dir() -> str:
+    return load_config().get("profiles_dir") or DEFAULT_PROFILES_DIR
+
+
+def _requested_mode() -> Optional[str]:
+    raw = request.headers.get(PROFILE_HEADER) or request.args.get("profile")
+    if not raw:
+        return None
+    raw = raw.strip().lower()
+    if raw in ("0", "false", "off", "no"):
+        return None
+    return raw if raw in PROFILE_MODES else "cprofile"
+
+
+class StackSampler:
+    """在后台线程中按固定间隔抓取目标线程的调用栈，累计为折叠栈计数"""
+
+    def __init__(self, thread_id: int, interval: float = DEFAULT_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="maa-profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+class ProfileStore:
+    """分析结果目录：每个分析一个结果文件和一个同名 .json 元数据"""
+
+    def __init__(self, history_limit: int = PROFILE_HISTORY_LIMIT):
+        self.history_limit = history_limit
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _dir() -> str:
+        return os.path.abspath(profiles_dir())
+
+    def save(self, mode: str, meta: Dict[str, Any], write) -> str:
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        directory = self._dir()
+        os.makedirs(directory, exist_ok=True)
+        filename = profile_id + PROFILE_EXTENSIONS[mode]
+        write(os.path.join(directory, filename))
+        meta = {"id": profile_id, "mode": mode, "file": filename, **meta}
+        with open(os.path.join(directory, profile_id + ".json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        self._prune()
+        return profile_id
+
+    def list(self) -> List[Dict[str, Any]]:
+        directory = self._dir()
+        if not os.path.isdir(directory):
+            return []
+        items = []
+        for name in os.listdir(directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                    items.append(json.load(f))
+            except Exception:
+                continue
+        items.sort(key=lambda m: m.get("created_at", 0), reverse=True)
+        return items
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        if not profile_id or os.path.basename(profile_id) != profile_id:
+            return None
+        path = os.path.join(self._dir(), profile_id + ".json")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        meta["path"] = os.path.join(self._dir(), meta["file"])
+        return meta
+
+    def _prune(self):
+        with self._lock:
+            items = self.list()
+            for meta in items[self.history_limit:]:
+                for name in (meta.get("file"), f"{meta.get('id')}.json"):
+                    if not name:
+                        continue
+                    try:
+                        os.remove(os.path.join(self._dir(), name))
+                    except OSError:
+                        pass
+
+
+profile_store = ProfileStore()
+
+
+def pstats_summary(path: str, limit: int = 40, sort: str = "cumulative") -> str:
+    """把 .pstats 文件渲染为文本摘要，便于直接在浏览器中查看"""
+    out = io.StringIO()
+    stats = pstats.Stats(path, stream=out)
+    stats.sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+# ---------------------------
+# 请求钩子
+# ---------------------------
+def _before_request():
+    mode = _requested_mode()
+    if mode is None or not profiling_enabled():
+        return
+    if mode == "sample":
+        profiler = StackSampler(threading.get_ident())
+        profiler.start()
+    else:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # 同一时刻只能有一个确定性分析器（另一个请求正在被分析），本次不做分析
+            return
+    g._profile_mode = mode
+    g._profile_started = time.perf_counter()
+    g._profiler = profiler
+
+
+def _finish(status_code: Optional[int]) -> Optional[str]:
+    profiler = g.pop("_profiler", None)
+    if profiler is None:
+        return None
+    mode = g.pop("_profile_mode")
+    elapsed_ms = round((time.perf_counter() - g.pop("_profile_started")) * 1000, 1)
+    if mode == "sample":
+        profiler.stop()
+        text = profiler.collapsed()
+
+        def write(path):
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+    else:
+        profiler.disable()
+        write = profiler.dump_stats
+
+    meta = {
+        "method": request.method,
+        "path": request.path,
+        "route": request.url_rule.rule if request.url_rule is not None else None,
+        "status": status_code,
+        "elapsed_ms": elapsed_ms,
+        "created_at": int(time.time() * 1000),
+    }
+    try:
+        return profile_store.save(mode, meta, write)
+    except OSError:
+        return None
+
+
+def _after_request(response):
+    profile_id = _finish(response.status_code)
+    if profile_id:
+        response.headers[PROFILE_ID_HEADER] = profile_id
+    return response
+
+
+def _teardown_request(exc):
+    # 视图抛出异常时 after_request 不会执行，这里保证分析器被关闭并保存
+    if exc is not None:
+        _finish(500)
+
+
+def init_profiling(app: Flask) -> None:
+    """在 create_app 中最后调用，使分析范围尽量只覆盖视图函数"""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
@@ -0,0 +1,127 @@
+"""
+响应层：更快的 JSON 编码与响应压缩
+
+- 安装了 orjson 时由其负责 jsonify / json_response 的序列化，否则回退到标准库 json；
+- 客户端接受时，对超过阈值的文本类响应做 brotli（可选依赖）或 gzip 压缩；
+  图片、multipart 等本身已压缩的内容以及流式响应（SSE、MJPEG）不再压缩。
+"""
+from __future__ import annotations
+
+import gzip
+from typing import Any
+
+from flask import Flask, Response, current_app, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # 可选依赖
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # 可选依赖
+    brotli = None
+
+COMPRESS_MIN_SIZE = 1024
+COMPRESS_LEVEL = 5
+BROTLI_QUALITY = 4
+
+# 已经是压缩格式或不适合整体压缩的内容类型
+_SKIP_MIME_PREFIXES = ("image/", "video/", "audio/", "multipart/", "text/event-stream")
+_SKIP_MIME_TYPES = {"application/zip", "application/gzip", "application/octet-stream"}
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    优先使用 orjson 的 JSON provider，遇到 orjson 无法处理的对象时回退到标准库
+
+    与 Flask 默认行为保持一致：sort_keys 为 True（默认）时按键排序输出，
+    前端与缓存的响应体不会因为是否安装 orjson 而改变字段顺序。
+    """
+
+    def _option(self) -> int:
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if orjson is not None and not kwargs:
+            try:
+                return orjson.dumps(obj, option=self._option()).decode("utf-8")
+            except TypeError:
+                pass
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        if orjson is None:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        option = self._option()
+        if self.compact is False or (self.compact is None and self._app.debug):
+            option |= orjson.OPT_INDENT_2
+        try:
+            body = orjson.dumps(obj, option=option)
+        except TypeError:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def _skip_mimetype(mimetype: str) -> bool:
+    return mimetype.startswith(_SKIP_MIME_PREFIXES) or mimetype in _SKIP_MIME_TYPES
+
+
+def _pick_encoding() -> str | None:
+    accepted = request.accept_encodings
+    if brotli is not None and accepted.quality("br") > 0:
+        return "br"
+    if accepted.quality("gzip") > 0:
+        return "gzip"
+    return None
+
+
+def compress_response(response: Response) -> Response:
+    """after_request：按 Accept-Encoding 压缩较大的响应体"""
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+        or "Content-Encoding" in response.headers
+        or _skip_mimetype(response.mimetype or "")
+    ):
+        return response
+
+    config = current_app.config
+    min_size = config.get("COMPRESS_MIN_SIZE", COMPRESS_MIN_SIZE)
+    if response.content_length is not None and response.content_length < min_size:
+        return response
+
+    encoding = _pick_encoding()
+    if encoding is None:
+        return response
+
+    body = response.get_data()
+    if len(body) < min_size:
+        return response
+
+    if encoding == "br":
+        compressed = brotli.compress(body, quality=config.get("BROTLI_QUALITY", BROTLI_QUALITY))
+    else:
+        compressed = gzip.compress(body, compresslevel=config.get("COMPRESS_LEVEL", COMPRESS_LEVEL), mtime=0)
+
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def init_response_layer(app: Flask) -> None:
+    """在 create_app 中调用：安装 JSON provider 与压缩钩子"""
+    app.json = FastJSONProvider(app)
+    app.config.setdefault("COMPRESS_MIN_SIZE", COMPRESS_MIN_SIZE)
+    app.config.setdefault("COMPRESS_LEVEL", COMPRESS_LEVEL)
+    app.config.setdefault("BROTLI_QUALITY", BROTLI_QUALITY)
+    app.after_request(compress_response)
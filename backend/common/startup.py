@@ -0,0 +1,66 @@
+"""
+启动耗时记录
+
+main.py 在导入其他模块之前先导入本模块，以此作为进程启动的时间零点；
+各阶段（导入路由、创建应用、后台加载 MaaFramework 等）通过 timed() 记录，/system/startup 返回报告。
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+PROCESS_STARTED = time.perf_counter()
+PROCESS_STARTED_AT = time.time()
+
+
+class StartupReport:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._phases: List[Dict[str, Any]] = []
+        self._marks: Dict[str, float] = {}
+
+    @staticmethod
+    def _offset_ms(t: float) -> float:
+        return round((t - PROCESS_STARTED) * 1000, 1)
+
+    def mark(self, name: str):
+        """记录一个时间点（如 server_ready）"""
+        with self._lock:
+            self._marks.setdefault(name, self._offset_ms(time.perf_counter()))
+
+    @contextmanager
+    def timed(self, name: str, **extra: Any):
+        started = time.perf_counter()
+        error: Optional[str] = None
+        try:
+            yield
+        except Exception as exc:
+            error = str(exc)
+            raise
+        finally:
+            ended = time.perf_counter()
+            phase = {
+                "name": name,
+                "thread": threading.current_thread().name,
+                "start_ms": self._offset_ms(started),
+                "duration_ms": round((ended - started) * 1000, 1),
+                **extra,
+            }
+            if error:
+                phase["error"] = error
+            with self._lock:
+                self._phases.append(phase)
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            phases = sorted(self._phases, key=lambda p: p["start_ms"])
+            marks = dict(self._marks)
+        return {
+            "process_started_at": int(PROCESS_STARTED_AT * 1000),
+            "uptime_ms": self._offset_ms(time.perf_counter()),
+            "marks": marks,
+            "phases": phases,
+        }
+
+
+startup_report = StartupReport()
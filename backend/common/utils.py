@@ -1,19 +1,21 @@
+from __future__ import annotations
+
 import base64
 import json
 import mimetypes
 import os
 from io import BytesIO
-from typing import Any, Dict, Optional
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from flask import jsonify, request
 
-from PIL import Image
-from flask import jsonify
+from backend.common.config_store import CONFIG_FILE, DEFAULT_CONFIG, config_store
+from backend.common.metrics import image_encode
 
-CONFIG_FILE = "config.json"
-DEFAULT_CONFIG = {
-    "devices": [],
-    "resource_profiles": [{"name": "Default Profile", "paths": []}],
-    "current_state": {"device_index": 0, "resource_profile_index": 0},
-}
+if TYPE_CHECKING:
+    from PIL import Image
+
+DEFAULT_SESSION_ID = "default"
 
 # 运行时状态占位，后续需要时可扩展
 states = {"device": {"connected": False}, "resource": {"loaded": False}, "agent": {"connected": False}}
@@ -23,6 +25,14 @@ def norm_path(path: Optional[str]) -> Optional[str]:
     return os.path.normpath(path) if path else None
 
 
+def request_session_id(payload: Optional[dict] = None) -> str:
+    """从请求头 X-Session-Id、查询参数或 JSON 体中解析会话 id，缺省为默认会话"""
+    session_id = request.headers.get("X-Session-Id") or request.args.get("session_id")
+    if not session_id and isinstance(payload, dict):
+        session_id = payload.get("session_id")
+    return str(session_id) if session_id else DEFAULT_SESSION_ID
+
+
 def convert_node(node: dict) -> dict:
     if not node or "id" not in node:
         return {}
@@ -43,29 +53,12 @@ def sse_format(data: dict) -> str:
 
 
 def load_config() -> Dict[str, Any]:
-    if not os.path.exists(CONFIG_FILE):
-        return DEFAULT_CONFIG.copy()
-    try:
-        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-            cfg = json.load(f) or {}
-        for k, v in DEFAULT_CONFIG.items():
-            if k not in cfg:
-                cfg[k] = v
-        print("111111111111111")
-        return cfg
-    except Exception:
-        return DEFAULT_CONFIG.copy()
+    return config_store.load()
 
 
-def save_config(data: Dict[str, Any]) -> bool:
-    try:
-        current = load_config()
-        current.update(data)
-        with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-            json.dump(current, f, ensure_ascii=False, indent=4)
-        return True
-    except Exception:
-        return False
+def save_config(data: Dict[str, Any], flush: bool = False) -> bool:
+    """合并写入配置；默认异步落盘，flush=True 时同步写入"""
+    return config_store.update(data, flush=flush)
 
 
 def encode_image_to_base64(fullpath: str) -> Optional[str]:
@@ -80,10 +73,33 @@ def encode_image_to_base64(fullpath: str) -> Optional[str]:
         return None
 
 
+def encode_pil_image(img: Image.Image, fmt: str = "JPEG", quality: int = 80, max_side: Optional[int] = None) -> bytes:
+    """按需等比缩小后编码为图片字节（JPEG 会丢弃 alpha 通道）。"""
+    from PIL import Image
+
+    if max_side and max(img.size) > max_side:
+        img = img.copy()
+        img.thumbnail((max_side, max_side), Image.BILINEAR)
+    fmt = fmt.upper()
+    if fmt == "JPG":
+        fmt = "JPEG"
+    if fmt == "JPEG" and img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    buffer = BytesIO()
+    with image_encode.time(format=fmt):
+        if fmt == "JPEG":
+            img.save(buffer, format=fmt, quality=quality)
+        else:
+            img.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
 def encode_pil_image_to_base64(img: Image.Image, mime: str = "image/png") -> str:
     """将 PIL Image 对象转换为 base64 data URI。"""
     buffer = BytesIO()
-    img.save(buffer, format=mime.split("/")[-1].upper())
+    fmt = mime.split("/")[-1].upper()
+    with image_encode.time(format=fmt):
+        img.save(buffer, format=fmt)
     base64_str = base64.b64encode(buffer.getvalue()).decode("utf-8")
     return f"data:{mime};base64,{base64_str}"
 
@@ -6,39 +6,109 @@ import os
 import sys
 from pathlib import Path
 
-from flask import Flask
-from flask_cors import CORS
-
 # 确保在以脚本方式运行时也能找到 backend 包（嵌入式 Python 不一定读取 PYTHONPATH）
 BASE_DIR = Path(__file__).resolve().parent
 ROOT_DIR = BASE_DIR.parent
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
-from backend.routes.agent_routes import agent_bp
-from backend.routes.debug_routes import debug_bp
-from backend.routes.device_routes import device_bp
-from backend.routes.resource_routes import resource_bp
-from backend.routes.system_routes import system_bp
+# 最先导入：作为启动耗时报告的时间零点
+from backend.common.startup import startup_report
+
+with startup_report.timed("import:flask"):
+    from flask import Flask
+    from flask_cors import CORS
+
+# 路由只导入轻量模块，MaaFramework（maa / numpy / PIL）由 backend.untils.runtime 延迟加载
+with startup_report.timed("import:routes"):
+    from backend.common.metrics import init_metrics
+    from backend.common.profiling import init_profiling
+    from backend.common.response import init_response_layer
+    from backend.routes.agent_routes import agent_bp
+    from backend.routes.debug_routes import debug_bp
+    from backend.routes.device_routes import device_bp
+    from backend.routes.resource_routes import resource_bp
+    from backend.routes.system_routes import system_bp
+    from backend.untils.runtime import preload_framework
+    from backend.untils.warm_start import WARM_START_ENV, warm_start
+
+PRELOAD_ENV = "MAA_PRELOAD_FRAMEWORK"
 
 
 def create_app() -> Flask:
     app = Flask(__name__)
     CORS(app)
+    # 计时钩子先注册，after_request 逆序执行，因此记录的是压缩后的响应大小
+    init_metrics(app)
+    init_response_layer(app)
     app.register_blueprint(system_bp)
     app.register_blueprint(resource_bp)
     app.register_blueprint(device_bp)
     app.register_blueprint(agent_bp)
     app.register_blueprint(debug_bp)
+    init_profiling(app)
     return app
 
 
-app = create_app()
+with startup_report.timed("create_app"):
+    app = create_app()
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value and value.isdigit() else default
+
+
+def preload_enabled() -> bool:
+    return os.environ.get(PRELOAD_ENV, "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def on_listening() -> None:
+    """服务开始监听后调用：后台加载 MaaFramework，并按配置执行启动预热"""
+    startup_report.mark("listening")
+    if preload_enabled():
+        preload_framework()
+    warm_start.start()
+
+
+def run_production(flask_app: Flask, host: str, port: int, threads: int, reserved_threads: int) -> None:
+    """使用多线程 WSGI 服务器（waitress）运行，关闭调试与自动重载"""
+    try:
+        from waitress import create_server
+    except ImportError:
+        sys.exit("production 模式需要 waitress：pip install waitress")
+
+    flask_app.debug = False
+    # SSE 长连接各占一个线程，保留 reserved_threads 个线程给普通 API 请求
+    flask_app.config["MAX_STREAM_CLIENTS"] = max(1, threads - reserved_threads)
+    server = create_server(
+        flask_app,
+        host=host,
+        port=port,
+        threads=threads,
+        connection_limit=max(1000, threads * 2),
+        ident="MaaInspector",
+    )
+    on_listening()
+    server.run()
+
+
+def run_async(flask_app: Flask, host: str, port: int, threads: int) -> None:
+    """使用 asyncio 服务器（uvicorn）运行：流式接口走事件循环，其余请求由线程池执行 Flask"""
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit("async 模式需要 uvicorn：pip install uvicorn")
+
+    from backend.asgi import create_asgi_app
+
+    flask_app.debug = False
+    asgi_app = create_asgi_app(flask_app, threads=threads, on_startup=on_listening)
+    uvicorn.run(asgi_app, host=host, port=port, log_level="info")
 
 
 if __name__ == "__main__":
-    env_port = os.environ.get("MAA_BACKEND_PORT")
-    default_port = int(env_port) if env_port and env_port.isdigit() else 38081
+    default_port = _env_int("MAA_BACKEND_PORT", 38081)
 
     parser = argparse.ArgumentParser(description="Run MaaInspector backend")
     parser.add_argument(
@@ -47,6 +117,52 @@ if __name__ == "__main__":
         default=default_port,
         help="监听端口，默认读取环境变量 MAA_BACKEND_PORT，未设置则为 5000",
     )
+    parser.add_argument(
+        "--mode",
+        choices=["dev", "production", "async"],
+        default=os.environ.get("MAA_BACKEND_MODE", "dev"),
+        help="dev 为 Flask 调试服务器；production 为多线程 WSGI 服务器；"
+             "async 为 asyncio 服务器（流式接口不占线程），默认读取 MAA_BACKEND_MODE",
+    )
+    parser.add_argument("--host", default=os.environ.get("MAA_BACKEND_HOST", "127.0.0.1"), help="监听地址")
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=_env_int("MAA_BACKEND_THREADS", 256),
+        help="production 模式的工作线程数（SSE 连接与普通请求共用）；async 模式下为执行 Flask 请求的线程数，"
+             "默认读取 MAA_BACKEND_THREADS",
+    )
+    parser.add_argument(
+        "--reserved-threads",
+        type=int,
+        default=_env_int("MAA_BACKEND_RESERVED_THREADS", 32),
+        help="production 模式为普通 API 请求保留、不允许 SSE 长连接占用的线程数",
+    )
+    parser.add_argument(
+        "--warm-start",
+        action="store_true",
+        help="启动时在后台重连上次的设备并预加载当前资源方案（也可设置 MAA_WARM_START=1 或配置 warm_start）",
+    )
+    parser.add_argument(
+        "--no-preload",
+        action="store_true",
+        help="不在启动后于后台加载 MaaFramework，首次使用设备 / 调试功能时再加载（也可设置 MAA_PRELOAD_FRAMEWORK=0）",
+    )
     args = parser.parse_args()
+    if args.warm_start:
+        os.environ[WARM_START_ENV] = "1"
+    if args.no_preload:
+        os.environ[PRELOAD_ENV] = "0"
+
+    if args.mode == "production":
+        run_production(app, args.host, args.port, args.threads, args.reserved_threads)
+        sys.exit(0)
+    if args.mode == "async":
+        run_async(app, args.host, args.port, args.threads)
+        sys.exit(0)
+
+    # debug 模式下 reloader 的监控进程不加载框架、不执行预热，只在实际服务的子进程中启动
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        on_listening()
 
-    app.run(port=args.port, debug=True)
+    app.run(host=args.host, port=args.port, debug=True)
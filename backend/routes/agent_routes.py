@@ -1,7 +1,7 @@
 from flask import Blueprint, request
 
-from backend.common.utils import json_response
-from backend.untils.maafw import maafw
+from backend.common.utils import json_response, request_session_id
+from backend.untils.runtime import sessions
 
 agent_bp = Blueprint("agent", __name__)
 
@@ -14,6 +14,7 @@ def agent_connect():
     if not socket_id:
         return json_response(False, "Missing socket_id", status=400)
 
+    maafw = sessions().get_or_create(request_session_id(payload))
     maafw.create_agent(socket_id)
     maafw.connect_agent()
     print("agent connected")
@@ -2,31 +2,42 @@ import time
 from queue import Empty
 from typing import Optional
 
-from PIL import Image
-from flask import Blueprint, Response, jsonify, request, stream_with_context
-from maa.pipeline import JOCR
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
 
 from backend.common.utils import (
     convert_node,
     encode_pil_image_to_base64,
     json_response,
+    request_session_id,
     sse_format,
 )
-from backend.untils.maafw import debug_broker, maafw
+from backend.common.events import debug_broker, stream_event_matches
+from backend.untils.runtime import find_session
 
 debug_bp = Blueprint("debug", __name__)
 
 
 @debug_bp.route("/debug/stream", methods=["GET"])
 def debug_stream():
+    # 可选 job_id / session_id：只订阅某个作业或某台设备相关的事件
+    job_id = request.args.get("job_id")
+    session_id = request.args.get("session_id")
+    # 生产模式下每条 SSE 长连接占用一个服务线程，超过上限时拒绝，为普通 API 请求保留线程
+    max_clients = current_app.config.get("MAX_STREAM_CLIENTS")
+    if max_clients and debug_broker.client_count >= max_clients:
+        response, status = json_response(False, "Too many stream clients", status=503)
+        response.headers["Retry-After"] = "5"
+        return response, status
     queue = debug_broker.register()
 
     def event_stream():
         try:
-            yield sse_format({"type": "hello", "timestamp": int(time.time() * 1000)})
+            yield sse_format({"type": "hello", "job_id": job_id, "timestamp": int(time.time() * 1000)})
             while True:
                 try:
                     payload = queue.get(timeout=15)
+                    if not stream_event_matches(payload, job_id, session_id):
+                        continue
                     yield sse_format(payload)
                 except Empty:
                     yield ": keep-alive\n\n"
@@ -42,31 +53,86 @@ def debug_stream():
 
 @debug_bp.route("/debug/node", methods=["POST"])
 def debug_node():
-    data = request.get_json()
-    node = (data or {}).get("node") or {}
+    data = request.get_json(force=True, silent=True) or {}
+    maafw = find_session(request_session_id(data))
+    if maafw is None:
+        return json_response(False, "Session not found", status=404)
+    node = data.get("node") or {}
     node_id = node.get("id")
+    if not node_id:
+        return json_response(False, "Missing node id", status=400)
+    try:
+        priority = int(data.get("priority") or 0)
+    except (TypeError, ValueError):
+        return json_response(False, "Invalid priority", status=400)
+
     if data.get("debug_mode") == "recognition_only":
         node["next"] = []
         node["on_error"] = []
         node["action"] = "DoNothing"
-        converted = convert_node(node)
-        maafw.run_task(node_id, converted)
-    else:
-        converted = convert_node(node)
-        maafw.run_task(node_id, converted)
-    return json_response(True, "debug_return", {})
+    converted = convert_node(node)
+    job = maafw.jobs.submit(node_id, converted, priority=priority)
+    return json_response(True, "debug_return", {"job_id": job.job_id, "job": job.to_dict()})
 
 
 @debug_bp.route("/debug/stop", methods=["POST"])
 def debug_stop():
-    maafw.stop_task()
-    return json_response(True, "debug_return", {})
+    maafw = find_session(request_session_id(request.get_json(silent=True)))
+    cancelled = maafw.jobs.cancel_all() if maafw is not None else 0
+    return json_response(True, "debug_return", {"cancelled": cancelled})
 
 
 @debug_bp.route("/debug/status", methods=["POST"])
 def debug_status():
+    maafw = find_session(request_session_id(request.get_json(silent=True)))
+    if maafw is None:
+        return json_response(True, "debug_return_running", {"running": False, "current_job": None, "queued": 0})
     running = getattr(getattr(maafw, "tasker", None), "running", False)
-    return json_response(True, "debug_return_running", {"running": running})
+    current = maafw.jobs.current
+    return json_response(
+        True,
+        "debug_return_running",
+        {
+            "running": running,
+            "current_job": current.to_dict() if current else None,
+            "queued": maafw.jobs.queued_count(),
+        },
+    )
+
+
+@debug_bp.route("/debug/jobs", methods=["GET"])
+def debug_jobs():
+    maafw = find_session(request_session_id())
+    if maafw is None:
+        return json_response(True, "jobs", {"jobs": [], "current_job_id": None, "queued": 0})
+    status = request.args.get("status") or None
+    jobs = [job.to_dict() for job in maafw.jobs.list_jobs(status)]
+    current = maafw.jobs.current
+    return json_response(
+        True,
+        "jobs",
+        {"jobs": jobs, "current_job_id": current.job_id if current else None, "queued": maafw.jobs.queued_count()},
+    )
+
+
+@debug_bp.route("/debug/jobs/<job_id>", methods=["GET"])
+def debug_job_detail(job_id: str):
+    maafw = find_session(request_session_id())
+    job = maafw.jobs.get(job_id) if maafw is not None else None
+    if job is None:
+        return json_response(False, "Job not found", {"job": None}, status=404)
+    return json_response(True, "job", {"job": job.to_dict()})
+
+
+@debug_bp.route("/debug/jobs/<job_id>/cancel", methods=["POST"])
+def debug_job_cancel(job_id: str):
+    maafw = find_session(request_session_id(request.get_json(silent=True)))
+    job = maafw.jobs.get(job_id) if maafw is not None else None
+    if job is None:
+        return json_response(False, "Job not found", status=404)
+    if not maafw.jobs.cancel(job_id):
+        return json_response(False, f"Job already {job.status}", {"job": job.to_dict()}, status=409)
+    return json_response(True, "Cancelling", {"job": job.to_dict()})
 
 
 @debug_bp.route("/debug/ocr_text", methods=["POST"])
@@ -75,11 +141,16 @@ def debug_ocr_text():
     roi = data.get("roi")
     if not roi or not isinstance(roi, list) or len(roi) != 4:
         return json_response(False, "Missing or invalid roi", status=400)
+    from maa.pipeline import JOCR
+
+    maafw = find_session(request_session_id(data))
+    if maafw is None:
+        return json_response(False, "Session not found", status=404)
     task=JOCR()
     task.roi=roi
     tasker=maafw.run_re()
-    maafw.screencap()
-    result = tasker.post_recognition("OCR",task,maafw.im).wait().get().nodes[0].recognition
+    im = maafw.capture_raw()
+    result = tasker.post_recognition("OCR",task,im).wait().get().nodes[0].recognition
     if result.hit:
         txt = result.best_result.text
     else:
@@ -94,6 +165,11 @@ def get_reco_details():
     if reco_id is None:
         return json_response(False, "Missing reco_id", status=400)
 
+    from PIL import Image
+
+    maafw = find_session(request_session_id(data))
+    if maafw is None:
+        return json_response(False, "Session not found", {"detail": None}, status=404)
     try:
         detail = maafw.get_reco_detail(reco_id)
         if detail is None:
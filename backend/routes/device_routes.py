@@ -1,17 +1,38 @@
-from flask import Blueprint, request
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Mapping, Optional, Tuple
 
-from backend.common.utils import encode_pil_image_to_base64, json_response, save_config, load_config
-from backend.untils.maafw import maafw
+from flask import Blueprint, Response, current_app, request, stream_with_context
+
+from backend.common.events import debug_broker
+from backend.common.utils import (
+    DEFAULT_SESSION_ID,
+    encode_pil_image,
+    encode_pil_image_to_base64,
+    json_response,
+    request_session_id,
+    save_config,
+)
+from backend.untils.runtime import find_session, sessions
 
 device_bp = Blueprint("device", __name__)
 
+# 截图是阻塞的 IO 等待，每台设备占一个线程；编码是 CPU 工作，按核数限制并发
+_capture_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="maa-screencap")
+_encode_pool = ThreadPoolExecutor(max_workers=max(2, os.cpu_count() or 2), thread_name_prefix="maa-encode")
+
+GRID_FORMATS = {"jpeg": "image/jpeg", "jpg": "image/jpeg", "png": "image/png", "webp": "image/webp"}
+
 
 @device_bp.route("/device/connect/adb", methods=["POST"])
 def device_connect_adb():
     """连接 ADB 设备"""
     info = request.get_json(force=True, silent=True) or {}
-    if maafw is None:
-        return json_response(False, "Backend logic missing", status=500)
+    maafw = sessions().get_or_create(request_session_id(info))
     
     try:
         # 获取必需参数
@@ -39,9 +60,7 @@ def device_connect_adb():
                 "address": address,
                 "config": config
             }
-            current_config = load_config()
-            current_config["last_connected_device"] = last_device
-            save_config(current_config)
+            save_config({"last_connected_device": last_device})
             
             return json_response(True, "ADB Device Connected", {"info": {"detail": msg}})
         return json_response(False, msg or "Connect failed", status=400)
@@ -53,8 +72,7 @@ def device_connect_adb():
 def device_connect_win32():
     """连接 Win32 窗口设备"""
     info = request.get_json(force=True, silent=True) or {}
-    if maafw is None:
-        return json_response(False, "Backend logic missing", status=500)
+    maafw = sessions().get_or_create(request_session_id(info))
     
     try:
         # 获取必需参数
@@ -91,9 +109,7 @@ def device_connect_win32():
                 "mouse_method": mouse_method,
                 "keyboard_method": keyboard_method
             }
-            current_config = load_config()
-            current_config["last_connected_device"] = last_device
-            save_config(current_config)
+            save_config({"last_connected_device": last_device})
             
             return json_response(True, "Win32 Device Connected", {"info": {"detail": msg}})
         return json_response(False, msg or "Connect failed", status=400)
@@ -101,9 +117,87 @@ def device_connect_win32():
         return json_response(False, f"Win32 connection error: {str(exc)}", status=500)
 
 
+def screen_stream_params(params: Mapping[str, str]) -> Tuple[str, float, int, int]:
+    """
+    /device/screen/stream 的查询参数 (session_id, interval, max_side, quality)，ASGI 与 WSGI 实现共用
+
+    interval 为秒（默认 0.5，最小 0.05），max_side 默认 960，quality 默认 70；取值非法时抛出 ValueError
+    """
+    return (
+        params.get("session_id") or DEFAULT_SESSION_ID,
+        max(0.05, float(params.get("interval", 0.5))),
+        int(params.get("max_side", 960)),
+        int(params.get("quality", 70)),
+    )
+
+
+def mjpeg_part(session, quality: int, max_side: int) -> Optional[bytes]:
+    """截一帧并编码为 multipart/x-mixed-replace 的一个部分，截图失败时返回 None"""
+    screenshot = session.screencap()
+    if screenshot is None:
+        return None
+    frame = encode_pil_image(screenshot, "JPEG", quality=quality, max_side=max_side)
+    return (
+        b"--frame\r\nContent-Type: image/jpeg\r\n"
+        + f"Content-Length: {len(frame)}\r\n\r\n".encode("ascii")
+        + frame
+        + b"\r\n"
+    )
+
+
+_screen_streams = 0
+_screen_streams_lock = threading.Lock()
+
+
+@device_bp.route("/device/screen/stream", methods=["GET"])
+def device_screen_stream():
+    """
+    以 multipart/x-mixed-replace（MJPEG）持续推送设备画面
+
+    async 模式下该路由由 backend/asgi.py 在事件循环上处理；这里是开发 / production（WSGI）模式的实现，
+    每条连接占用一个服务线程，与调试事件流一起受 MAX_STREAM_CLIENTS 限制。
+    """
+    try:
+        session_id, interval, max_side, quality = screen_stream_params(request.args)
+    except ValueError:
+        return json_response(False, "Invalid interval/max_side/quality", status=400)
+    session = find_session(session_id)
+    if session is None or not session.controller:
+        return json_response(False, "Device not connected", status=404)
+    max_clients = current_app.config.get("MAX_STREAM_CLIENTS")
+    if max_clients and _screen_streams + debug_broker.client_count >= max_clients:
+        response, status = json_response(False, "Too many stream clients", status=503)
+        response.headers["Retry-After"] = "5"
+        return response, status
+
+    def generate():
+        global _screen_streams
+        # 在生成器内计数：响应未被迭代就被丢弃时，finally 不会执行
+        with _screen_streams_lock:
+            _screen_streams += 1
+        try:
+            while True:
+                part = mjpeg_part(session, quality, max_side)
+                if part is not None:
+                    yield part
+                time.sleep(interval)
+        finally:
+            with _screen_streams_lock:
+                _screen_streams -= 1
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="multipart/x-mixed-replace; boundary=frame",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @device_bp.route("/device/screenshot", methods=["GET"])
 def device_screenshot():
     image_base64 = None
+    maafw = find_session(request_session_id())
+    if maafw is None:
+        return json_response(False, "Session not found", status=404)
     screenshot = maafw.screencap()
     if screenshot is not None:
         image_base64 = encode_pil_image_to_base64(screenshot)
@@ -111,3 +205,133 @@ def device_screenshot():
         return json_response(True, "OK", {"image": image_base64, "size": [1280, 720]})
     return json_response(False, "No image", status=404)
 
+
+
+@device_bp.route("/device/sessions", methods=["GET"])
+def device_sessions():
+    """列出所有设备会话及其连接、资源与运行状态"""
+    described = [session.describe() for session in sessions().list()]
+    return json_response(True, "OK", {"sessions": described})
+
+
+@device_bp.route("/device/sessions/close", methods=["POST"])
+def device_session_close():
+    info = request.get_json(force=True, silent=True) or {}
+    session_id = request_session_id(info)
+    if not sessions().close(session_id):
+        return json_response(False, "Session not found", status=404)
+    return json_response(True, "Session closed", {"session_id": session_id})
+
+
+def _capture_and_encode(maafw, fmt: str, quality: int, max_side: int) -> dict:
+    """在截图线程中等待设备截图，再把缩放与编码交给编码线程池"""
+    started = time.perf_counter()
+    screenshot = maafw.screencap()
+    capture_ms = round((time.perf_counter() - started) * 1000, 1)
+    if screenshot is None:
+        return {"ok": False, "capture_ms": capture_ms, "error": "No image"}
+
+    def _encode():
+        encode_started = time.perf_counter()
+        data = encode_pil_image(screenshot, fmt, quality=quality, max_side=max_side)
+        return data, round((time.perf_counter() - encode_started) * 1000, 1)
+
+    data, encode_ms = _encode_pool.submit(_encode).result()
+    return {
+        "ok": True,
+        "capture_ms": capture_ms,
+        "encode_ms": encode_ms,
+        "source_size": list(screenshot.size),
+        "bytes": len(data),
+        "data": data,
+    }
+
+
+@device_bp.route("/device/screenshot/grid", methods=["POST"])
+def device_screenshot_grid():
+    """
+    并发截取多台设备，返回 multipart/form-data：
+    第一个部分 manifest 为 JSON（每台设备的截图/编码耗时与错误），
+    其后每台截图成功的设备一个图片部分，字段名为会话 id。
+    """
+    info = request.get_json(force=True, silent=True) or {}
+    session_ids = info.get("session_ids")
+    if session_ids is not None and (
+        not isinstance(session_ids, list) or not all(isinstance(sid, str) for sid in session_ids)
+    ):
+        return json_response(False, "Invalid session_ids, expected a list of strings", status=400)
+    fmt = str(info.get("format") or "jpeg").lower()
+    if fmt not in GRID_FORMATS:
+        return json_response(False, f"Unsupported format: {fmt}", status=400)
+    try:
+        quality = int(info.get("quality") or 80)
+        max_side = int(info.get("max_side") or 640)
+        timeout = float(info.get("timeout") or 10)
+    except (TypeError, ValueError):
+        return json_response(False, "Invalid quality/max_side/timeout", status=400)
+
+    if session_ids:
+        found = [find_session(sid) for sid in session_ids]
+        missing = [sid for sid, session in zip(session_ids, found) if session is None]
+        targets = [session for session in found if session is not None]
+    else:
+        targets = [session for session in sessions().list() if session.controller]
+        missing = []
+    if not targets and not missing:
+        return json_response(False, "No connected devices", status=404)
+
+    started = time.perf_counter()
+    futures = {
+        _capture_pool.submit(_capture_and_encode, session, fmt, quality, max_side): session.session_id
+        for session in targets
+    }
+    wait(futures, timeout=timeout)
+
+    manifest = [{"session_id": sid, "ok": False, "error": "Session not found"} for sid in missing]
+    images = []
+    for future, sid in futures.items():
+        entry = {"session_id": sid}
+        if not future.done():
+            entry.update({"ok": False, "error": "Timeout"})
+        else:
+            try:
+                result = future.result()
+            except Exception as exc:
+                result = {"ok": False, "error": str(exc)}
+            data = result.pop("data", None)
+            entry.update(result)
+            if data is not None:
+                images.append((sid, data))
+        manifest.append(entry)
+
+    boundary = uuid.uuid4().hex
+    mime = GRID_FORMATS[fmt]
+    ext = "jpg" if mime == "image/jpeg" else fmt
+    summary = {
+        "success": True,
+        "total_ms": round((time.perf_counter() - started) * 1000, 1),
+        "format": mime,
+        "devices": manifest,
+    }
+    parts = [
+        (
+            f"--{boundary}\r\n"
+            'Content-Disposition: form-data; name="manifest"\r\n'
+            "Content-Type: application/json\r\n\r\n"
+        ).encode("utf-8")
+        + json.dumps(summary, ensure_ascii=False).encode("utf-8")
+        + b"\r\n"
+    ]
+    for sid, data in images:
+        parts.append(
+            (
+                f"--{boundary}\r\n"
+                f'Content-Disposition: form-data; name="{sid}"; filename="{sid}.{ext}"\r\n'
+                f"Content-Type: {mime}\r\n\r\n"
+            ).encode("utf-8")
+            + data
+            + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode("utf-8"))
+
+    return Response(b"".join(parts), mimetype=f"multipart/form-data; boundary={boundary}")
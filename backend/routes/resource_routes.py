@@ -1,13 +1,24 @@
-from flask import Blueprint, jsonify, request
+import fnmatch
+import time
+
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
 
 from backend.common.utils import (
     encode_image_to_base64,
     json_response,
     load_config,
     norm_path,
+    request_session_id,
+)
+from backend.untils import (
+    EDGE_FIELDS,
+    ResourcesManager,
+    VersionConflict,
+    find_resources_manager,
+    get_resources_manager,
 )
-from backend.untils import ResourcesManager
-from backend.untils.maafw import maafw
+from backend.untils.layout import layout_cache
+from backend.untils.runtime import loaded_resource_pool, sessions
 
 resource_bp = Blueprint("resource", __name__)
 
@@ -15,12 +26,19 @@ resource_bp = Blueprint("resource", __name__)
 @resource_bp.route("/resource/load", methods=["POST"])
 def resource_load():
     payload = request.get_json(force=True, silent=True) or {}
+    maafw = sessions().get_or_create(request_session_id(payload))
     if "path" in payload and isinstance(payload.get("path"), dict):
         payload = payload.get("path") or {}
 
     paths = payload.get("paths", []) or []
-    result, message = maafw.load_resource(paths)
-    manager = ResourcesManager(paths)
+    started = time.perf_counter()
+    result, message = maafw.load_resource(
+        paths,
+        force=bool(payload.get("force")),
+        content_hash=bool(payload.get("content_hash")),
+    )
+    load_ms = round((time.perf_counter() - started) * 1000, 1)
+    manager = get_resources_manager(paths)
     results = manager.list_all_files() if result else []
 
     return jsonify(
@@ -29,25 +47,294 @@ def resource_load():
             "success": bool(result),
             "message": message or ("Loaded" if result else "Load failed"),
             "list": results,
+            "bundles": maafw.load_report,
+            "load_ms": load_ms,
         }
     )
 
 
+MAX_BATCH_NODES = 500
+MAX_NEIGHBORHOOD_NODES = 2000
+
+
+def _file_request():
+    data = request.get_json(force=True, silent=True) or {}
+    return data, norm_path(data.get("source")), data.get("filename")
+
+
+def _versioned_response(manager, resource_path: str, filename: str, build, variant: str = ""):
+    """
+    文件未变化时只返回 304，前端复用已有的数据；弱 ETag 与响应是否压缩无关
+
+    build(version) 返回 json_response 的结果，仅在需要响应正文时调用；
+    响应正文还取决于请求参数（如分页）时，用 variant 区分 ETag
+    """
+    version = manager.file_version(resource_path, filename)
+    etag = f"{version}-{variant}" if version and variant else version
+    if etag and request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response, _ = build(version)
+    if etag:
+        response.set_etag(etag, weak=True)
+        response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def _int_param(data: dict, key: str, default: int, low: int, high: int) -> int:
+    try:
+        value = int(data.get(key, default))
+    except (TypeError, ValueError):
+        value = default
+    return max(low, min(high, value))
+
+
 @resource_bp.route("/resource/file/nodes", methods=["POST"])
 def get_file_nodes():
-    data = request.get_json(force=True, silent=True) or {}
-    resource_path = norm_path(data.get("source"))
-    filename = data.get("filename")
+    _, resource_path, filename = _file_request()
 
     if not resource_path or not filename:
         return json_response(False, "Missing params", status=400)
 
     try:
-        manager = ResourcesManager(resource_path)
+        manager = find_resources_manager(resource_path)
         nodes = manager.get_nodes_by_file(resource_path, filename)
         if nodes is None:
             return json_response(False, "File not found", {"nodes": {}}, 404)
-        return json_response(True, "Loaded", {"nodes": nodes})
+        return _versioned_response(
+            manager, resource_path, filename,
+            lambda version: json_response(True, "Loaded", {"nodes": nodes, "version": version}),
+        )
+    except Exception as exc:
+        return json_response(False, str(exc), status=500)
+
+
+MAX_BULK_FILES = 500
+
+
+def _bulk_targets(data: dict):
+    """
+    批量读取的目标文件：files 为 [{source, filename}]，或 glob 按文件名匹配
+    （glob 可配合 source 限定资源包，否则在 paths / 当前资源配置中查找）
+
+    Returns:
+        (targets, error)，targets 为 [(source, filename)]
+    """
+    files = data.get("files")
+    pattern = data.get("glob")
+    if files is not None:
+        if not isinstance(files, list) or not files:
+            return None, "Invalid files, expected a non-empty list"
+        targets, invalid = [], []
+        for index, item in enumerate(files):
+            if isinstance(item, dict):
+                source, filename = item.get("source"), item.get("filename")
+            elif isinstance(item, list) and len(item) == 2:
+                source, filename = item
+            else:
+                source = filename = None
+            if isinstance(source, str) and source and isinstance(filename, str) and filename:
+                targets.append((norm_path(source), filename))
+            else:
+                invalid.append(str(index))
+        if invalid:
+            return None, (f"Invalid file entries at index {', '.join(invalid)}: "
+                          "expected {source, filename} or [source, filename] strings")
+        return targets, None
+    if isinstance(pattern, str) and pattern:
+        source = data.get("source")
+        if source is not None and not isinstance(source, str):
+            return None, "Invalid source"
+        if source:
+            manager = find_resources_manager(norm_path(source))
+            sources = {norm_path(source)}
+        else:
+            _, manager, error = _request_manager()
+            if error:
+                return None, error
+            sources = None
+        targets = [
+            (entry["source"], entry["filename"])
+            for entry in manager.list_all_files()
+            if entry["filename"] and fnmatch.fnmatch(entry["filename"], pattern)
+            and (sources is None or entry["source"] in sources)
+        ]
+        targets.sort(key=lambda t: (manager.resource_paths.index(t[0]), t[1]))
+        return targets, None
+    return None, "Missing params"
+
+
+def _bulk_entries(targets):
+    """逐个读取目标文件；同一资源包的管理器只取（并刷新）一次"""
+    managers = {}
+    for source, filename in targets:
+        try:
+            if source not in managers:
+                managers[source] = find_resources_manager(source)
+            manager = managers[source]
+            nodes = manager.get_nodes_by_file(source, filename)
+        except Exception as exc:
+            yield {"type": "missing", "source": source, "filename": filename, "reason": str(exc)}
+            continue
+        if nodes is None:
+            yield {"type": "missing", "source": source, "filename": filename, "reason": "File not found"}
+            continue
+        yield {
+            "type": "file",
+            "source": source,
+            "filename": filename,
+            "version": manager.file_version(source, filename),
+            "nodes": nodes,
+        }
+
+
+@resource_bp.route("/resource/files/nodes", methods=["POST"])
+def get_files_nodes():
+    """
+    一次读取多个 pipeline 文件的节点
+
+    stream=true 时以 NDJSON 逐个文件输出（每行一个 {"type": "file" | "missing", ...}，
+    最后一行为 {"type": "done", ...}），前端可以在其余文件到达前先渲染第一个文件。
+    """
+    data = request.get_json(force=True, silent=True) or {}
+    targets, error = _bulk_targets(data)
+    if error:
+        return json_response(False, error, status=400)
+    if len(targets) > MAX_BULK_FILES:
+        return json_response(False, f"Too many files (max {MAX_BULK_FILES})", status=400)
+
+    if data.get("stream"):
+        dumps = current_app.json.dumps
+
+        def generate():
+            loaded = missing = 0
+            for entry in _bulk_entries(targets):
+                if entry["type"] == "file":
+                    loaded += 1
+                else:
+                    missing += 1
+                yield dumps(entry) + "\n"
+            yield dumps({"type": "done", "count": loaded, "missing": missing}) + "\n"
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype="application/x-ndjson",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    files, missing = [], []
+    for entry in _bulk_entries(targets):
+        entry_type = entry.pop("type")
+        (files if entry_type == "file" else missing).append(entry)
+    return json_response(True, f"Loaded {len(files)} files", {"files": files, "missing": missing, "count": len(files)})
+
+
+# ---------------------------
+# 大文件分批读取：先取摘要，再按 id 或按邻域取完整节点
+# ---------------------------
+@resource_bp.route("/resource/file/nodes/summary", methods=["POST"])
+def get_file_node_summaries():
+    data, resource_path, filename = _file_request()
+
+    if not resource_path or not filename:
+        return json_response(False, "Missing params", status=400)
+
+    try:
+        manager = find_resources_manager(resource_path)
+        total = manager.file_node_count(resource_path, filename)
+        if total is None:
+            return json_response(False, "File not found", {"nodes": []}, 404)
+
+        offset = _int_param(data, "offset", 0, 0, total)
+        limit = _int_param(data, "limit", total, 0, total)
+        return _versioned_response(
+            manager, resource_path, filename,
+            lambda version: json_response(True, "Loaded", {
+                "nodes": manager.node_summaries(resource_path, filename, offset, limit) or [],
+                "total": total,
+                "offset": offset,
+                "version": version,
+            }),
+            variant=f"{offset}-{limit}",
+        )
+    except Exception as exc:
+        return json_response(False, str(exc), status=500)
+
+
+@resource_bp.route("/resource/file/nodes/batch", methods=["POST"])
+def get_file_nodes_batch():
+    data, resource_path, filename = _file_request()
+    ids = data.get("ids")
+
+    if not resource_path or not filename or not isinstance(ids, list):
+        return json_response(False, "Missing params", status=400)
+    if len(ids) > MAX_BATCH_NODES:
+        return json_response(False, f"Too many ids (max {MAX_BATCH_NODES})", status=400)
+
+    try:
+        manager = find_resources_manager(resource_path)
+        result = manager.get_nodes_by_ids(resource_path, filename, [str(i) for i in ids])
+        if result is None:
+            return json_response(False, "File not found", {"nodes": {}}, 404)
+        nodes, missing = result
+        version = manager.file_version(resource_path, filename)
+        return json_response(True, "Loaded", {"nodes": nodes, "missing": missing, "version": version})
+    except Exception as exc:
+        return json_response(False, str(exc), status=500)
+
+
+@resource_bp.route("/resource/file/nodes/neighborhood", methods=["POST"])
+def get_file_node_neighborhood():
+    data, resource_path, filename = _file_request()
+    entry = data.get("entry")
+    direction = data.get("direction", "out")
+
+    if not resource_path or not filename or not entry:
+        return json_response(False, "Missing params", status=400)
+    if direction not in ("out", "in", "both"):
+        return json_response(False, f"Invalid direction: {direction}", status=400)
+
+    try:
+        manager = find_resources_manager(resource_path)
+        result = manager.node_neighborhood(
+            resource_path,
+            filename,
+            str(entry),
+            depth=_int_param(data, "depth", 1, 0, 64),
+            limit=_int_param(data, "limit", 200, 1, MAX_NEIGHBORHOOD_NODES),
+            direction=direction,
+        )
+        if result is None:
+            return json_response(False, "File not found", {"nodes": {}}, 404)
+        version = manager.file_version(resource_path, filename)
+        return json_response(True, "Loaded", {**result, "version": version})
+    except Exception as exc:
+        return json_response(False, str(exc), status=500)
+
+
+@resource_bp.route("/resource/file/layout", methods=["POST"])
+def get_file_layout():
+    data, resource_path, filename = _file_request()
+    root = data.get("root")
+    sizes = data.get("sizes")
+
+    if not resource_path or not filename:
+        return json_response(False, "Missing params", status=400)
+    if sizes is not None and not isinstance(sizes, dict):
+        return json_response(False, "Invalid params", status=400)
+
+    try:
+        manager = find_resources_manager(resource_path)
+        nodes = manager.get_nodes_by_file(resource_path, filename)
+        if nodes is None:
+            return json_response(False, "File not found", {"positions": {}}, 404)
+        version = manager.file_version(resource_path, filename)
+        result = layout_cache.layout(
+            resource_path, filename, version, nodes, spacing=data.get("spacing"), root=root or None, sizes=sizes
+        )
+        if result is None:
+            return json_response(False, f"Node not found: {root}", {"positions": {}}, 404)
+        return json_response(True, "OK", {**result, "version": version})
     except Exception as exc:
         return json_response(False, str(exc), status=500)
 
@@ -63,13 +350,67 @@ def resource_file_save():
         return json_response(False, "Missing params", status=400)
 
     try:
-        manager = ResourcesManager(resource_path)
+        manager = find_resources_manager(resource_path)
+        previous = manager.get_nodes_by_file(resource_path, filename)
         count = manager.save_nodes(resource_path, filename, nodes_data)
-        return json_response(True, f"Saved {count} nodes", {"saved_count": count})
+
+        saved = manager.get_nodes_by_file(resource_path, filename) or {}
+        hot_reload = _hot_reload(resource_path, previous, saved)
+        version = manager.file_version(resource_path, filename)
+        return json_response(
+            True, f"Saved {count} nodes", {"saved_count": count, "version": version, "hot_reload": hot_reload}
+        )
     except Exception as exc:
         return json_response(False, f"Save failed: {exc}", status=500)
 
 
+@resource_bp.route("/resource/file/patch", methods=["POST"])
+def resource_file_patch():
+    data, resource_path, filename = _file_request()
+    upserts = data.get("upserts") or {}
+    deletes = data.get("deletes") or []
+
+    if not resource_path or not filename:
+        return json_response(False, "Missing params", status=400)
+    if not isinstance(upserts, dict) or not isinstance(deletes, list):
+        return json_response(False, "Invalid params", status=400)
+
+    try:
+        manager = find_resources_manager(resource_path)
+        result = manager.patch_nodes(
+            resource_path, filename, upserts, [str(i) for i in deletes], base_version=data.get("base_version")
+        )
+    except VersionConflict as exc:
+        return json_response(False, "File changed since it was loaded", {"version": exc.current}, 409)
+    except FileNotFoundError:
+        return json_response(False, "File not found", status=404)
+    except Exception as exc:
+        return json_response(False, f"Save failed: {exc}", status=500)
+
+    hot_reload = _hot_reload(resource_path, result["previous"], result["nodes"])
+    return json_response(
+        True,
+        f"Saved {len(upserts)} nodes, deleted {len(hot_reload['deleted_nodes'])}",
+        {"saved_count": result["count"], "version": result["version"], "hot_reload": hot_reload},
+    )
+
+
+def _hot_reload(resource_path: str, previous: dict, saved: dict) -> dict:
+    """只把变化的节点热更新到运行中的 Resource；删除节点或删除字段无法通过 override 撤销"""
+    changes = ResourcesManager.diff_nodes(previous, saved)
+    touched = changes["added"] + changes["changed"]
+    pool = loaded_resource_pool()
+    updated = pool.hot_update(resource_path, {node_id: saved[node_id] for node_id in touched}) if pool else 0
+    stale = changes["deleted"] + changes["fields_removed"]
+    return {
+        "changed_nodes": touched,
+        "deleted_nodes": changes["deleted"],
+        "updated_resources": updated,
+        "reload_required": bool(stale) and bool(pool) and pool.is_loaded(resource_path),
+        "stale_nodes": stale,
+    }
+
+
 @resource_bp.route("/resource/file/create", methods=["POST"])
 def resource_file_create():
     data = request.get_json(force=True, silent=True) or {}
@@ -80,7 +421,7 @@ def resource_file_create():
         return json_response(False, "Missing params", status=400)
 
     try:
-        manager = ResourcesManager(resource_path)
+        manager = find_resources_manager(resource_path)
         if manager.create_file(resource_path, filename):
             final_filename = filename if filename.endswith(".json") else f"{filename}.json"
             return json_response(True, "Created", {"filename": final_filename, "source": resource_path})
@@ -100,6 +441,20 @@ def search_nodes_globally():
     if not query:
         return jsonify({"results": []})
 
+    manager = get_resources_manager(_profile_paths())
+    results = manager.search_nodes(
+        query,
+        use_regex=use_regex,
+        exclude_file=current_filename,
+        exclude_source=current_source,
+        max_results=50,
+    )
+
+    return jsonify({"results": results})
+
+
+def _profile_paths() -> list:
+    """当前资源配置的路径列表（加载顺序）"""
     cfg = load_config()
     target_paths = []
     profiles = cfg.get("resource_profiles", [])
@@ -111,17 +466,171 @@ def search_nodes_globally():
         for path in raw_paths:
             if path:
                 target_paths.append(norm_path(path))
+    return target_paths
 
-    manager = ResourcesManager(target_paths)
-    results = manager.search_nodes(
-        query,
-        use_regex=use_regex,
-        exclude_file=current_filename,
-        exclude_source=current_source,
-        max_results=50,
-    )
 
-    return jsonify({"results": results})
+# ---------------------------
+# 连线图查询：paths 缺省时使用当前资源配置
+# ---------------------------
+def _request_manager():
+    """
+    请求体中的 paths，缺省时使用当前资源配置
+
+    Returns:
+        (data, manager, error)，paths 不是字符串列表时 manager 为 None、error 为错误信息
+    """
+    data = request.get_json(force=True, silent=True) or {}
+    paths = data.get("paths")
+    if paths is None:
+        return data, get_resources_manager(_profile_paths()), None
+    if not isinstance(paths, list) or not all(isinstance(p, str) for p in paths):
+        return data, None, "Invalid paths, expected a list of strings"
+    return data, get_resources_manager([norm_path(p) for p in paths if p]), None
+
+
+def _name_list(value):
+    """单个节点名或节点名列表规范化为列表；其他类型返回 None"""
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, list) and all(isinstance(v, str) for v in value):
+        return value
+    return None
+
+
+def _graph_request():
+    data, manager, error = _request_manager()
+    return data, manager.graph() if manager is not None else None, error
+
+
+def _edge_json(graph, edge) -> dict:
+    return {
+        "source": edge.source,
+        "field": edge.field,
+        "target": edge.target,
+        "jump_back": edge.jump_back,
+        "anchor": edge.anchor,
+        "location": graph.location(edge.source),
+    }
+
+
+@resource_bp.route("/resource/graph/predecessors", methods=["POST"])
+def graph_predecessors():
+    data, graph, error = _graph_request()
+    if error:
+        return json_response(False, error, status=400)
+    node_id = data.get("node")
+    if not node_id:
+        return json_response(False, "Missing params", status=400)
+    edges = graph.predecessors(str(node_id))
+    return json_response(True, "OK", {
+        "node": node_id,
+        "defined": graph.has_node(str(node_id)),
+        "predecessors": [_edge_json(graph, edge) for edge in edges],
+    })
+
+
+@resource_bp.route("/resource/graph/reachable", methods=["POST"])
+def graph_reachable():
+    data, graph, error = _graph_request()
+    if error:
+        return json_response(False, error, status=400)
+    entries = _name_list(data.get("entries"))
+    if not entries:
+        return json_response(False, "Invalid entries" if data.get("entries") else "Missing params", status=400)
+    fields = _name_list(data.get("fields")) if data.get("fields") else list(EDGE_FIELDS)
+    if not fields or not set(fields) <= set(EDGE_FIELDS):
+        return json_response(False, f"Invalid fields, expected any of: {', '.join(EDGE_FIELDS)}", status=400)
+    # 缺省或非法时不限跳数
+    max_depth = _int_param(data, "max_depth", -1, -1, 1 << 30)
+    depth = graph.reachable(entries, fields=fields, max_depth=max_depth if max_depth >= 0 else None)
+    return json_response(True, "OK", {
+        "count": len(depth),
+        "nodes": [{"id": node_id, "depth": d, "location": graph.location(node_id)} for node_id, d in depth.items()],
+        "missing_entries": [e for e in entries if not graph.has_node(e)],
+    })
+
+
+@resource_bp.route("/resource/graph/undefined", methods=["POST"])
+def graph_undefined():
+    _, graph, error = _graph_request()
+    if error:
+        return json_response(False, error, status=400)
+    targets = graph.undefined_targets()
+    return json_response(True, "OK", {
+        "count": len(targets),
+        "targets": [
+            {"target": name, "referenced_by": [_edge_json(graph, edge) for edge in edges]}
+            for name, edges in targets.items()
+        ],
+    })
+
+
+@resource_bp.route("/resource/graph/unreachable", methods=["POST"])
+def graph_unreachable():
+    data, graph, error = _graph_request()
+    if error:
+        return json_response(False, error, status=400)
+    entries = _name_list(data.get("entries")) if data.get("entries") else None
+    if data.get("entries") and entries is None:
+        return json_response(False, "Invalid entries", status=400)
+    nodes = graph.unreachable(entries)
+    return json_response(True, "OK", {
+        "count": len(nodes),
+        "nodes": [{"id": node_id, "location": graph.location(node_id)} for node_id in nodes],
+        "stats": graph.stats(),
+    })
+
+
+@resource_bp.route("/resource/nodes/effective", methods=["POST"])
+def effective_nodes():
+    """
+    多资源包叠加后的有效节点：传 node / nodes 返回合并结果与覆盖链，
+    都不传时列出被多个文件定义的节点
+    """
+    data, manager, error = _request_manager()
+    if error:
+        return json_response(False, error, status=400)
+    view = manager.effective_nodes()
+
+    raw = data.get("nodes") or data.get("node")
+    if not raw:
+        overridden = view.overridden()
+        return json_response(True, "OK", {"count": len(overridden), "overridden": overridden})
+    ids = _name_list(raw)
+    if ids is None:
+        return json_response(False, "Invalid nodes", status=400)
+
+    results, missing = {}, []
+    for node_id in ids:
+        result = view.effective(node_id)
+        if result is None:
+            missing.append(node_id)
+        else:
+            results[node_id] = result
+    return json_response(True, "OK", {"nodes": results, "missing": missing})
+
+
+@resource_bp.route("/resource/validate", methods=["POST"])
+def validate_resources():
+    """
+    校验资源包中的全部节点，结果按文件版本缓存
+
+    files: 可选，[{source, filename}]，只返回这些文件的诊断；force: 忽略缓存
+    """
+    data, manager, error = _request_manager()
+    if error:
+        return json_response(False, error, status=400)
+    files = [
+        (norm_path(f.get("source")), f.get("filename"))
+        for f in data.get("files") or []
+        if isinstance(f, dict) and isinstance(f.get("source"), str) and isinstance(f.get("filename"), str)
+        and f.get("source") and f.get("filename")
+    ]
+    try:
+        result = manager.validator().validate(files or None, force=bool(data.get("force")))
+    except Exception as exc:
+        return json_response(False, f"Validation failed: {exc}", status=500)
+    return json_response(True, "OK", result)
 
 
 @resource_bp.route("/resource/file/templates", methods=["POST"])
@@ -134,7 +643,7 @@ def get_file_templates():
         return json_response(False, "Missing params", status=400)
 
     try:
-        manager = ResourcesManager(resource_path)
+        manager = find_resources_manager(resource_path)
         nodes = manager.get_nodes_by_file(resource_path, filename) or {}
         image_base = manager.get_image_base_path(resource_path)
 
@@ -180,7 +689,7 @@ def check_unused_images():
         if not paths_to_check:
             return json_response(True, "No valid paths", {"unused_images": [], "used_images": []})
 
-        manager = ResourcesManager(resource_path)
+        manager = find_resources_manager(resource_path)
         used_map = manager.check_image_references(resource_path, paths_to_check, exclude_file=current_filename)
 
         unused_images = [p for p in paths_to_check if p not in used_map]
@@ -201,7 +710,7 @@ def process_images():
     if not resource_path:
         return json_response(False, "Missing source path", status=400)
 
-    manager = ResourcesManager(resource_path)
+    manager = find_resources_manager(resource_path)
     results = {"deleted": [], "delete_failed": [], "saved": [], "save_failed": []}
 
     for path in delete_paths:
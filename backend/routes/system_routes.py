@@ -1,66 +1,93 @@
-from flask import Blueprint, jsonify, request
-from maa.toolkit import Toolkit
+from flask import Blueprint, Response, jsonify, request, send_file
 
+from backend.common.config_store import config_store
+from backend.common.memory import rss_bytes
+from backend.common.metrics import registry
+from backend.common.profiling import profile_store, profiling_enabled, pstats_summary
+from backend.common.startup import startup_report
 from backend.common.utils import json_response, load_config, save_config
+from backend.untils import cached_resources_managers
+from backend.untils.discovery import KINDS, device_discovery
+from backend.untils.runtime import framework_loaded
+from backend.untils.warm_start import warm_start
 
 system_bp = Blueprint("system", __name__)
 
 
 @system_bp.route("/system/init", methods=["GET"])
 def system_init():
-    return jsonify(load_config())
+    # 预热在后台进行，这里立即返回配置并附带各组件的就绪状态
+    startup_report.mark("first_system_init")
+    cfg = load_config()
+    cfg["warm_start"] = warm_start.snapshot()
+    return jsonify(cfg)
 
 
 @system_bp.route("/system/config/save", methods=["POST"])
 def system_save_config():
     data = request.get_json(force=True, silent=True) or {}
-    if save_config(data):
+    # 显式保存同步落盘，写入失败时把错误返回给调用方
+    if save_config(data, flush=True):
         return json_response(True, "Saved")
-    return json_response(False, "Save failed", status=500)
+    return json_response(False, f"Save failed: {config_store.last_error}", status=500)
+
+
+@system_bp.route("/system/startup", methods=["GET"])
+def system_startup():
+    """启动耗时报告：各阶段（导入、创建应用、后台加载 MaaFramework）的起止时间"""
+    report = startup_report.report()
+    report["framework_loaded"] = framework_loaded()
+    return json_response(True, "OK", report)
+
+
+@system_bp.route("/system/metrics", methods=["GET"])
+def system_metrics():
+    """Prometheus 文本格式的指标"""
+    return Response(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@system_bp.route("/system/memory", methods=["GET"])
+def system_memory():
+    """进程 RSS 与各资源管理器的内存占用；?deep=0 只统计索引，不遍历节点数据"""
+    deep = request.args.get("deep", "1") not in ("0", "false")
+    managers = [manager.memory_report(deep=deep) for manager in cached_resources_managers()]
+    return json_response(True, "OK", {"rss_bytes": rss_bytes(), "managers": managers})
+
+
+@system_bp.route("/system/profiles", methods=["GET"])
+def system_profiles():
+    """已保存的请求分析结果列表"""
+    return json_response(True, "OK", {"enabled": profiling_enabled(), "profiles": profile_store.list()})
+
+
+@system_bp.route("/system/profiles/<profile_id>", methods=["GET"])
+def system_profile_download(profile_id: str):
+    """下载分析结果；cprofile 结果可加 ?summary=1 返回按累计耗时排序的文本摘要"""
+    meta = profile_store.get(profile_id)
+    if meta is None:
+        return json_response(False, "Profile not found", status=404)
+    if meta["mode"] == "cprofile" and request.args.get("summary"):
+        sort = request.args.get("sort", "cumulative")
+        try:
+            return Response(pstats_summary(meta["path"], sort=sort), content_type="text/plain; charset=utf-8")
+        except KeyError:
+            return json_response(False, f"Invalid sort key: {sort}", status=400)
+    return send_file(meta["path"], as_attachment=True, download_name=meta["file"])
 
 
 @system_bp.route("/system/devices/search", methods=["POST"])
 def search_devices():
-    payload = request.get_json(silent=True) or {}
-    req_type = (payload.get("type") or "").lower()
-    want_adb = not req_type or req_type == "adb"
-    want_win32 = not req_type or req_type == "win32control"
+    """
+    返回缓存的设备列表（stale 表示缓存已过期、后台正在刷新），设备增减另通过事件流推送
 
-    devices = []
-    if want_adb and Toolkit and hasattr(Toolkit, "find_adb_devices"):
-        try:
-            raw = Toolkit.find_adb_devices()
-            for d in raw or []:
-                devices.append(
-                    {
-                        "name": getattr(d, "name", "ADB Device"),
-                        "address": getattr(d, "address", "").strip(),
-                        "adb_path": str(getattr(d, "adb_path", "") or ""),
-                        "config": getattr(d, "config", {}) or {},
-                        "type": "adb",
-                    }
-                )
-        except Exception:
-            pass
-
-    if want_win32 and Toolkit and hasattr(Toolkit, "find_desktop_windows"):
-        try:
-            raw = Toolkit.find_desktop_windows()
-            for w in raw or []:
-                hwnd = getattr(w, "hwnd", None)
-                window_name = getattr(w, "window_name", "") or "Win32 Window"
-                class_name = getattr(w, "class_name", "") or ""
-                devices.append(
-                    {
-                        "name": window_name,
-                        "type": "win32control",
-                        "hwnd": hwnd,
-                        "class_name": class_name,
-                        "window_name": window_name,
-                    }
-                )
-        except Exception:
-            pass
-
-    return jsonify({"message": "OK", "devices": devices})
+    可选参数：type（adb / win32control）、force（立即重新扫描）、wait（等待本次扫描结束）
+    """
+    payload = request.get_json(silent=True) or {}
+    req_type = str(payload.get("type") or "").lower()
+    if req_type and req_type not in KINDS:
+        # 未知类型与之前一样返回空列表，只有缺省 type 才扫描全部类型
+        return jsonify({"message": "OK", "devices": [], "stale": False, "scanning": False, "sources": {}})
+    kinds = [req_type] if req_type else None
 
+    result = device_discovery.search(kinds, force=bool(payload.get("force")), wait=bool(payload.get("wait")))
+    return jsonify({"message": "OK", **result})
@@ -0,0 +1,104 @@
+"""
+配置存储测试：延迟合并写入、落盘失败重试、外部修改后重新加载与文件权限
+
+运行方式：python -m pytest backend
+"""
+import json
+import os
+import stat
+import time
+
+import pytest
+
+from backend.common.config_store import DEFAULT_CONFIG, ConfigStore
+
+FLUSH_DELAY = 0.05
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ConfigStore(str(tmp_path / "config.json"), flush_delay=FLUSH_DELAY)
+
+
+def read_file(store):
+    with open(store.path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_defaults_without_file(store):
+    assert store.load() == DEFAULT_CONFIG
+    assert not os.path.exists(store.path)
+
+
+def test_updates_are_debounced(store, monkeypatch):
+    writes = []
+    atomic_write = store._atomic_write
+    monkeypatch.setattr(store, "_atomic_write", lambda text: (writes.append(text), atomic_write(text)))
+
+    for i in range(5):
+        store.update({"counter": i})
+    assert store.get("counter") == 4
+    assert not os.path.exists(store.path)
+
+    assert wait_for(lambda: len(writes) == 1)
+    time.sleep(FLUSH_DELAY * 2)
+    assert len(writes) == 1
+    assert read_file(store)["counter"] == 4
+
+
+def test_load_returns_copy(store):
+    store.update({"devices": [{"name": "a"}]}, flush=True)
+    cfg = store.load()
+    cfg["devices"].append({"name": "b"})
+    assert store.get("devices") == [{"name": "a"}]
+
+
+def test_failed_write_is_retried(store, monkeypatch):
+    attempts = []
+    atomic_write = store._atomic_write
+
+    def flaky(text):
+        attempts.append(text)
+        if len(attempts) == 1:
+            raise OSError("disk full")
+        atomic_write(text)
+
+    monkeypatch.setattr(store, "_atomic_write", flaky)
+    assert store.update({"counter": 1}, flush=True) is False
+    assert store.last_error == "disk full"
+    assert not os.path.exists(store.path)
+    # 失败后保留改动，读取仍然得到新值
+    assert store.get("counter") == 1
+
+    assert wait_for(lambda: os.path.exists(store.path))
+    assert len(attempts) == 2
+    assert read_file(store)["counter"] == 1
+    assert store.last_error is None
+
+
+def test_external_edit_is_reloaded(store):
+    store.update({"counter": 1}, flush=True)
+    data = read_file(store)
+    data["counter"] = 2
+    data["extra"] = True
+    with open(store.path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    assert store.get("counter") == 2
+    assert store.get("extra") is True
+
+
+def test_file_mode_is_kept(store):
+    store.update({"counter": 1}, flush=True)
+    os.chmod(store.path, 0o640)
+    store.update({"counter": 2}, flush=True)
+    assert stat.S_IMODE(os.stat(store.path).st_mode) == 0o640
+    assert not [name for name in os.listdir(os.path.dirname(store.path)) if name.endswith(".tmp")]
@@ -0,0 +1,115 @@
+"""
+资源池测试：按路径组共享、引用计数、fork 与热更新
+
+Resource 换成只记录调用的假对象，测试不会加载 MaaFramework 的 bundle。
+运行方式：python -m pytest backend
+"""
+import json
+import os
+
+import pytest
+
+from backend.untils import maafw
+from backend.untils.maafw import ResourcePool
+
+
+class FakeResource:
+    def __init__(self):
+        self.loaded = False
+        self.overrides = []
+
+    def override_pipeline(self, nodes):
+        self.overrides.append(nodes)
+        return True
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(maafw, "Resource", FakeResource)
+    return ResourcePool()
+
+
+def test_key_for_normalizes_paths():
+    assert ResourcePool.key_for(["a/./b", "", None, "c/"]) == (os.path.normpath("a/b"), os.path.normpath("c"))
+
+
+def test_acquire_shares_entries(pool):
+    a = pool.acquire(("x", "y"))
+    b = pool.acquire(("x", "y"))
+    other = pool.acquire(("y", "x"))
+    assert a is b
+    assert a.refs == 2
+    assert other is not a
+    assert a.fingerprints == [None, None]
+
+
+def test_release_drops_unused_entries(pool):
+    entry = pool.acquire(("x",))
+    pool.acquire(("x",))
+    pool.release(entry)
+    assert pool.entries() == [entry]
+    pool.release(entry)
+    assert pool.entries() == []
+    pool.release(None)
+    assert pool.acquire(("x",)) is not entry
+
+
+def test_fork_sole_owner_keeps_entry(pool):
+    entry = pool.acquire(("x",))
+    with entry.lock:
+        assert pool.fork(entry) is entry
+    assert entry.refs == 1
+
+
+def test_fork_shared_entry(pool):
+    entry = pool.acquire(("x",))
+    pool.acquire(("x",))
+    with entry.lock:
+        fresh = pool.fork(entry)
+    try:
+        assert fresh is not entry
+        assert fresh.key == entry.key
+        assert fresh.resource is not entry.resource
+        assert fresh.refs == 1
+        assert fresh.lock.locked()
+        # fork 不减少原项的引用，由调用方换用新项后再 release
+        assert entry.refs == 2
+        assert pool.acquire(("x",)) is fresh
+    finally:
+        fresh.lock.release()
+
+    pool.release(entry)
+    pool.release(entry)
+    assert entry.refs == 0
+    # 原项释放完不影响路径组当前对应的新项
+    assert pool.entries() == [fresh]
+    pool.release(fresh)
+    pool.release(fresh)
+    assert pool.entries() == []
+
+
+def test_is_loaded(pool):
+    entry = pool.acquire(ResourcePool.key_for(["a", "b"]))
+    assert not pool.is_loaded("b")
+    entry.resource.loaded = True
+    assert pool.is_loaded("b")
+    assert not pool.is_loaded("c")
+
+
+def test_hot_update_skips_shadowed_nodes(pool, tmp_path):
+    base, overlay = str(tmp_path / "base"), str(tmp_path / "overlay")
+    os.makedirs(os.path.join(overlay, "pipeline"))
+    with open(os.path.join(overlay, "pipeline", "main.json"), "w", encoding="utf-8") as f:
+        json.dump({"Shadowed": {}}, f)
+
+    alone = pool.acquire(ResourcePool.key_for([base]))
+    layered = pool.acquire(ResourcePool.key_for([base, overlay]))
+    unloaded = pool.acquire(ResourcePool.key_for([base, "other"]))
+    alone.resource.loaded = layered.resource.loaded = True
+
+    nodes = {"Shadowed": {"next": []}, "Visible": {}}
+    assert pool.hot_update(base, nodes) == 2
+    assert alone.resource.overrides == [nodes]
+    assert layered.resource.overrides == [{"Visible": {}}]
+    assert unloaded.resource.overrides == []
+    assert pool.hot_update(base, {}) == 0
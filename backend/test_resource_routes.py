@@ -0,0 +1,137 @@
+"""
+资源接口测试：节点文件的条件请求（ETag / 304）与带版本检查的增量保存
+
+每个测试在临时目录中生成独立的资源包，不依赖 MaaFramework。
+运行方式：python -m pytest backend
+"""
+import json
+
+import pytest
+
+from backend.main import create_app
+
+
+def write_pipeline(root, filename, nodes):
+    pipeline = root / "pipeline"
+    pipeline.mkdir(parents=True, exist_ok=True)
+    (pipeline / filename).write_text(json.dumps(nodes), encoding="utf-8")
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return create_app().test_client()
+
+
+@pytest.fixture
+def bundle(tmp_path):
+    root = tmp_path / "bundle"
+    write_pipeline(root, "main.json", {"A": {"next": ["B"]}, "B": {}, "C": {"next": "A"}})
+    return str(root)
+
+
+def test_file_nodes_returns_weak_etag(client, bundle):
+    resp = client.post("/resource/file/nodes", json={"source": bundle, "filename": "main.json"})
+    assert resp.status_code == 200
+    etag, weak = resp.get_etag()
+    assert weak
+    assert etag == resp.get_json()["version"]
+    assert resp.headers["Cache-Control"] == "no-cache"
+
+
+def test_file_nodes_not_modified(client, bundle):
+    payload = {"source": bundle, "filename": "main.json"}
+    etag = client.post("/resource/file/nodes", json=payload).headers["ETag"]
+
+    resp = client.post("/resource/file/nodes", json=payload, headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.data == b""
+    assert resp.headers["ETag"] == etag
+
+
+def test_file_nodes_changed_after_save(client, bundle):
+    payload = {"source": bundle, "filename": "main.json"}
+    etag = client.post("/resource/file/nodes", json=payload).headers["ETag"]
+
+    saved = client.post("/resource/file/save", json={**payload, "nodes": {"A": {}, "D": {}}})
+    assert saved.status_code == 200
+
+    resp = client.post("/resource/file/nodes", json=payload, headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] != etag
+    assert resp.get_json()["version"] == saved.get_json()["version"]
+    assert set(resp.get_json()["nodes"]) == {"A", "D"}
+
+
+def test_missing_file_has_no_etag(client, bundle):
+    resp = client.post("/resource/file/nodes", json={"source": bundle, "filename": "missing.json"})
+    assert resp.status_code == 404
+    assert "ETag" not in resp.headers
+
+
+def test_summary_pages_have_distinct_etags(client, bundle):
+    payload = {"source": bundle, "filename": "main.json"}
+    first = client.post("/resource/file/nodes/summary", json={**payload, "offset": 0, "limit": 2})
+    second = client.post("/resource/file/nodes/summary", json={**payload, "offset": 2, "limit": 2})
+    assert first.status_code == second.status_code == 200
+    assert [n["id"] for n in first.get_json()["nodes"]] == ["A", "B"]
+    assert [n["id"] for n in second.get_json()["nodes"]] == ["C"]
+    assert first.get_json()["total"] == 3
+    assert first.headers["ETag"] != second.headers["ETag"]
+
+    # 其他分页的 ETag 不能让本页返回 304
+    resp = client.post("/resource/file/nodes/summary", json={**payload, "offset": 2, "limit": 2},
+                       headers={"If-None-Match": first.headers["ETag"]})
+    assert resp.status_code == 200
+
+    resp = client.post("/resource/file/nodes/summary", json={**payload, "offset": 0, "limit": 2},
+                       headers={"If-None-Match": first.headers["ETag"]})
+    assert resp.status_code == 304
+
+
+def test_patch_with_current_version(client, bundle, tmp_path):
+    payload = {"source": bundle, "filename": "main.json"}
+    version = client.post("/resource/file/nodes", json=payload).get_json()["version"]
+
+    resp = client.post("/resource/file/patch", json={
+        **payload, "base_version": version, "upserts": {"B": {"next": ["C"]}, "E": {}}, "deletes": ["C"],
+    })
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["saved_count"] == 3
+    assert body["version"] != version
+
+    # 修改的节点保持原位置，新增节点追加在末尾
+    on_disk = json.loads((tmp_path / "bundle" / "pipeline" / "main.json").read_text(encoding="utf-8"))
+    assert list(on_disk) == ["A", "B", "E"]
+    assert on_disk["B"] == {"next": ["C"]}
+
+
+def test_patch_version_conflict(client, bundle):
+    payload = {"source": bundle, "filename": "main.json"}
+    version = client.post("/resource/file/nodes", json=payload).get_json()["version"]
+    current = client.post("/resource/file/patch", json={**payload, "upserts": {"D": {}}}).get_json()["version"]
+
+    resp = client.post("/resource/file/patch", json={**payload, "base_version": version, "upserts": {"E": {}}})
+    assert resp.status_code == 409
+    assert resp.get_json()["version"] == current
+    nodes = client.post("/resource/file/nodes", json=payload).get_json()["nodes"]
+    assert "E" not in nodes
+
+
+def test_patch_detects_external_change(client, bundle, tmp_path):
+    payload = {"source": bundle, "filename": "main.json"}
+    version = client.post("/resource/file/nodes", json=payload).get_json()["version"]
+    write_pipeline(tmp_path / "bundle", "main.json", {"A": {}, "Outside": {}})
+
+    resp = client.post("/resource/file/patch", json={**payload, "base_version": version, "upserts": {"E": {}}})
+    assert resp.status_code == 409
+    assert resp.get_json()["version"] != version
+
+
+def test_patch_errors(client, bundle):
+    payload = {"source": bundle, "filename": "main.json"}
+    assert client.post("/resource/file/patch", json={**payload, "upserts": ["A"]}).status_code == 400
+    assert client.post("/resource/file/patch", json={**payload, "deletes": "A"}).status_code == 400
+    resp = client.post("/resource/file/patch", json={"source": bundle, "filename": "missing.json", "upserts": {}})
+    assert resp.status_code == 404
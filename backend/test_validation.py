@@ -0,0 +1,111 @@
+"""
+pipeline 校验测试：规则、按文件版本的结果缓存与图片增删后的重查
+
+运行方式：python -m pytest backend
+"""
+import base64
+import json
+
+import pytest
+
+from backend.main import create_app
+from backend.untils import ResourcesManager
+
+
+def write_pipeline(root, filename, nodes):
+    pipeline = root / "pipeline"
+    pipeline.mkdir(parents=True, exist_ok=True)
+    (pipeline / filename).write_text(json.dumps(nodes), encoding="utf-8")
+
+
+def codes(result, filename=None):
+    return sorted(
+        (d["node"], d["code"]) for d in result["diagnostics"] if filename is None or d["filename"] == filename
+    )
+
+
+@pytest.fixture
+def bundle(tmp_path):
+    root = tmp_path / "bundle"
+    write_pipeline(root, "a.json", {"A": {"next": ["B"]}})
+    write_pipeline(root, "b.json", {"B": {"next": ["A"]}})
+    write_pipeline(root, "c.json", {"C": {}})
+    return root
+
+
+def test_rules():
+    manager = ResourcesManager([])
+    result = manager.validator().check_file(("res", "x.json"), {
+        "Unknown": {"recognition": "And", "action": "Shell"},
+        "Swipes": {"action": "MultiSwipe"},
+        "Key": {"action": {"type": "ClickKey", "param": {}}},
+        "Multi": {"action": "Swipe", "begin": [0, 0], "end": [[1, 1], [2, 2, 3]]},
+        "Ok": {"recognition": "DirectHit", "action": "Command", "exec": "echo"},
+    }, lambda name, anchor=False: True)
+    assert sorted((d["node"], d["code"], d["field"]) for d in result.diagnostics) == [
+        ("Key", "missing_param", "key"),
+        ("Multi", "malformed_rect", "end"),
+        ("Swipes", "missing_param", "swipes"),
+        ("Unknown", "unknown_action", "action"),
+        ("Unknown", "unknown_recognition", "recognition"),
+    ]
+
+
+def test_results_are_cached(bundle):
+    validator = ResourcesManager(str(bundle)).validator()
+    first = validator.validate()
+    assert first["summary"]["checked"] == 3
+    assert first["diagnostics"] == []
+
+    second = validator.validate()
+    assert second["summary"]["checked"] == 0
+    assert second["summary"]["cached"] == 3
+
+    forced = validator.validate(force=True)
+    assert forced["summary"]["checked"] == 3
+
+
+def test_dependents_are_rechecked(bundle):
+    manager = ResourcesManager(str(bundle))
+    validator = manager.validator()
+    validator.validate()
+
+    manager.save_nodes(str(bundle), "b.json", {"B2": {}})
+    result = validator.validate()
+    # b.json 改动，引用了 B 的 a.json 随之重查；c.json 不受影响
+    assert result["summary"]["checked"] == 2
+    assert codes(result) == [("A", "undefined_target")]
+
+    manager.save_nodes(str(bundle), "c.json", {"C": {}, "B": {}})
+    result = validator.validate()
+    assert codes(result) == []
+
+
+def test_image_changes_recheck_template_users(bundle):
+    write_pipeline(bundle, "tpl.json", {"T": {"recognition": "TemplateMatch", "template": "x.png"}})
+    manager = ResourcesManager(str(bundle))
+    validator = manager.validator()
+    assert codes(validator.validate()) == [("T", "missing_template")]
+
+    manager.save_image(str(bundle), "x.png", base64.b64encode(b"png").decode("ascii"))
+    result = validator.validate()
+    assert result["summary"]["checked"] == 1
+    assert codes(result) == []
+
+
+def test_validate_route(bundle, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_pipeline(bundle, "a.json", {"A": {"next": ["Missing"]}})
+    client = create_app().test_client()
+
+    resp = client.post("/resource/validate", json={"paths": str(bundle)})
+    assert resp.status_code == 400
+
+    resp = client.post("/resource/validate", json={
+        "paths": [str(bundle)], "files": [{"source": str(bundle), "filename": "b.json"}],
+    })
+    assert resp.status_code == 200
+    assert resp.get_json()["diagnostics"] == []
+
+    resp = client.post("/resource/validate", json={"paths": [str(bundle)]})
+    assert codes(resp.get_json()) == [("A", "undefined_target")]
@@ -1,11 +1,100 @@
+import itertools
 import os
 import json
 import re
-from typing import Dict, Any, List, Union, Optional
+import sys
+import tempfile
+import threading
+from typing import Dict, Any, List, Tuple, Union, Optional
+
+from backend.common.files import replacement_mode
+from backend.common.memory import deep_sizeof
+from backend.common.metrics import registry
+from backend.untils.effective import EffectiveNodes
+from backend.untils.graph import EDGE_FIELDS, PipelineGraph, edge_targets
+from backend.untils.validation import PipelineValidator
 
 JsonValue = Dict[str, Any]
 
 
+# 资源包 -> 图片增删次数。同一资源包可能属于多个缓存的 ResourcesManager（路径组合不同），
+# 计数放在模块级，通过任一管理器增删图片后，其他管理器的校验缓存也能感知
+_image_generations: Dict[str, int] = {}
+_image_generations_lock = threading.Lock()
+
+
+def _bump_image_generation(resource_path: str):
+    with _image_generations_lock:
+        _image_generations[resource_path] = _image_generations.get(resource_path, 0) + 1
+
+
+class VersionConflict(Exception):
+    """保存时携带的 base_version 与文件当前版本不一致"""
+
+    def __init__(self, current: Optional[str]):
+        super().__init__(f"File changed since base version (current: {current})")
+        self.current = current
+
+
+def _type_name(value: Any) -> Optional[str]:
+    """recognition / action 既可能是类型名字符串，也可能是 {"type": ..., "param": ...}"""
+    if isinstance(value, dict):
+        value = value.get("type")
+    return value if isinstance(value, str) else None
+
+
+def node_summary(node_id: str, data: Any) -> Dict[str, Any]:
+    """节点摘要：类型与连线，不含识别 / 动作参数"""
+    data = data if isinstance(data, dict) else {}
+    summary: Dict[str, Any] = {
+        "id": node_id,
+        "recognition": _type_name(data.get("recognition")),
+        "action": _type_name(data.get("action")),
+    }
+    for field in EDGE_FIELDS:
+        targets = edge_targets(data.get(field))
+        if targets:
+            summary[field] = targets
+    return summary
+
+
+def _intern_values(value: Any) -> Any:
+    """
+    原地驻留节点数据中较短的字符串取值（类型名、模板路径、节点名等），整个进程只保留一份
+
+    字段名由 json 在单个文件内复用，跨文件的重复很少，不再单独处理。
+    """
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            for k, v in item.items():
+                if isinstance(v, str):
+                    if len(v) <= 64:
+                        item[k] = sys.intern(v)
+                elif isinstance(v, (dict, list)):
+                    stack.append(v)
+        elif isinstance(item, list):
+            for i, v in enumerate(item):
+                if isinstance(v, str):
+                    if len(v) <= 64:
+                        item[i] = sys.intern(v)
+                elif isinstance(v, (dict, list)):
+                    stack.append(v)
+    return value
+
+
+class NodeRecord:
+    """索引条目：所在文件用整数 id 表示，节点数据与文件缓存共用同一个对象"""
+
+    __slots__ = ("file_id", "node_id", "data")
+
+    def __init__(self, file_id: int, node_id: str, data: Any):
+        self.file_id = file_id
+        self.node_id = node_id
+        self.data = data
+
+
 class ResourcesManager:
     """
     资源管理器 - 统一管理多个资源路径
@@ -41,13 +130,31 @@ class ResourcesManager:
         
         # 缓存：resource_path -> {filename: {node_id: node_data}}
         self._files_cache: Dict[str, Dict[str, Dict[str, Any]]] = {}
-        # 全局节点索引：列表形式，支持同名节点
-        # [{resource_path, filename, node_id, data}, ...]
-        self._node_index: List[Dict[str, Any]] = []
+        # 全局节点索引：列表形式，支持同名节点；同一文件的条目连续存放
+        self._node_index: List[NodeRecord] = []
+        # 文件表：file_id -> (resource_path, filename)，路径与文件名均已驻留
+        self._file_keys: List[Tuple[str, str]] = []
+        self._file_ids: Dict[Tuple[str, str], int] = {}
+        # 文件戳：(resource_path, filename) -> (mtime_ns, size)，用于检测磁盘上的改动
+        self._file_stamps: Dict[Tuple[str, str], Tuple[int, int]] = {}
+        self._lock = threading.RLock()
+        # 连线图：首次查询时构建，之后随文件保存增量更新
+        self._graph: Optional[PipelineGraph] = None
+        # 多资源包叠加后的有效节点视图，同样按需构建
+        self._effective: Optional[EffectiveNodes] = None
+        # 校验结果按文件版本缓存，索引重建后仍然有效
+        self._validator: Optional[PipelineValidator] = None
+        # 单个文件的写锁：(resource_path, filename) -> Lock，不同文件的保存互不阻塞
+        self._file_locks: Dict[Tuple[str, str], threading.Lock] = {}
         
         # 初始化时加载所有数据
         self._load_all()
 
+    @property
+    def image_generation(self) -> Tuple[int, ...]:
+        """各资源包的图片增删次数，任一变化都可能影响模板校验结果"""
+        return tuple(_image_generations.get(p, 0) for p in self.resource_paths)
+
     def _get_pipeline_path(self, resource_path: str) -> str:
         """获取 pipeline 目录路径"""
         return os.path.join(resource_path, "pipeline")
@@ -60,40 +167,105 @@ class ResourcesManager:
         """获取 model 目录路径"""
         return os.path.join(resource_path, "model")
 
+    @staticmethod
+    def _stat_stamp(full_path: str) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(full_path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _list_pipeline_files(self, resource_path: str) -> List[str]:
+        pipeline_path = self._get_pipeline_path(resource_path)
+        if not os.path.isdir(pipeline_path):
+            return []
+        return [f for f in os.listdir(pipeline_path) if f.lower().endswith(".json")]
+
+    def _load_file(self, resource_path: str, fname: str) -> bool:
+        """读取单个 JSON 文件到缓存并记录文件戳，失败返回 False"""
+        full_path = os.path.join(self._get_pipeline_path(resource_path), fname)
+        try:
+            stamp = self._stat_stamp(full_path)
+            with open(full_path, "r", encoding="utf-8") as f:
+                content = json.load(f) or {}
+        except Exception as e:
+            print(f"[ResourcesManager] Failed to load {full_path}: {e}")
+            return False
+
+        resource_path, fname = self._file_key(resource_path, fname)
+        self._files_cache.setdefault(resource_path, {})[fname] = _intern_values(self._normalize_data(content))
+        if stamp:
+            self._file_stamps[(resource_path, fname)] = stamp
+        return True
+
+    def _file_key(self, resource_path: str, filename: str) -> Tuple[str, str]:
+        """驻留后的 (resource_path, filename)，同时登记文件 id（在锁内分配，并发的保存与刷新不会拿到重复的 id）"""
+        key = (sys.intern(resource_path), sys.intern(filename))
+        with self._lock:
+            if key not in self._file_ids:
+                self._file_ids[key] = len(self._file_keys)
+                self._file_keys.append(key)
+        return key
+
+    def _file_records(self, resource_path: str, filename: str) -> List[NodeRecord]:
+        file_id = self._file_ids[self._file_key(resource_path, filename)]
+        return [
+            NodeRecord(file_id, str(node_id), node_data)
+            for node_id, node_data in self._files_cache.get(resource_path, {}).get(filename, {}).items()
+        ]
+
+    def _rebuild_index(self):
+        """根据文件缓存重建全局节点索引（按资源路径顺序）"""
+        index = []
+        for resource_path in self.resource_paths:
+            for fname in self._files_cache.get(resource_path, {}):
+                index.extend(self._file_records(resource_path, fname))
+        self._node_index = index
+        self._graph = None
+        self._effective = None
+
     def _load_all(self):
         """加载所有资源路径下的 JSON 文件"""
-        self._files_cache.clear()
-        self._node_index = []
-        
-        for resource_path in self.resource_paths:
-            pipeline_path = self._get_pipeline_path(resource_path)
-            if not os.path.isdir(pipeline_path):
-                continue
-            
-            self._files_cache[resource_path] = {}
-            
-            for fname in os.listdir(pipeline_path):
-                if not fname.lower().endswith(".json"):
+        with self._lock:
+            self._files_cache.clear()
+            self._file_stamps.clear()
+
+            for resource_path in self.resource_paths:
+                if not os.path.isdir(self._get_pipeline_path(resource_path)):
                     continue
-                
-                full_path = os.path.join(pipeline_path, fname)
-                try:
-                    with open(full_path, "r", encoding="utf-8") as f:
-                        content = json.load(f) or {}
-                    
-                    normalized = self._normalize_data(content)
-                    self._files_cache[resource_path][fname] = normalized
-                    
-                    # 建立索引（使用列表，支持同名节点）
-                    for node_id, node_data in normalized.items():
-                        self._node_index.append({
-                            "resource_path": resource_path,
-                            "filename": fname,
-                            "node_id": str(node_id),
-                            "data": node_data
-                        })
-                except Exception as e:
-                    print(f"[ResourcesManager] Failed to load {full_path}: {e}")
+                self._files_cache[resource_path] = {}
+                for fname in self._list_pipeline_files(resource_path):
+                    self._load_file(resource_path, fname)
+
+            self._rebuild_index()
+
+    def refresh(self) -> bool:
+        """
+        按文件戳检查磁盘改动，只重新读取新增或变化的文件
+
+        Returns:
+            是否有文件发生变化
+        """
+        with self._lock:
+            changed = False
+            for resource_path in self.resource_paths:
+                cached = self._files_cache.get(resource_path, {})
+                on_disk = set(self._list_pipeline_files(resource_path))
+                for fname in list(cached):
+                    if fname not in on_disk:
+                        del cached[fname]
+                        self._file_stamps.pop((resource_path, fname), None)
+                        changed = True
+                pipeline_path = self._get_pipeline_path(resource_path)
+                for fname in on_disk:
+                    stamp = self._stat_stamp(os.path.join(pipeline_path, fname))
+                    if fname in cached and stamp == self._file_stamps.get((resource_path, fname)):
+                        continue
+                    if self._load_file(resource_path, fname):
+                        changed = True
+            if changed:
+                self._rebuild_index()
+            return changed
 
     def _normalize_data(self, data: Any) -> Dict[str, Any]:
         """将前端可能的 List 结构转为标准的 ID->Value Dict 结构"""
@@ -181,26 +353,185 @@ class ResourcesManager:
                 return self._files_cache[resource_path][filename]
         
         # 缓存未命中，尝试直接读取
-        pipeline_path = self._get_pipeline_path(resource_path)
-        full_path = os.path.join(pipeline_path, filename)
-        
+        full_path = os.path.join(self._get_pipeline_path(resource_path), filename)
         if not os.path.exists(full_path):
             return None
-        
-        try:
-            with open(full_path, "r", encoding="utf-8") as f:
-                content = json.load(f) or {}
-            normalized = self._normalize_data(content)
-            
-            # 更新缓存
-            if resource_path not in self._files_cache:
-                self._files_cache[resource_path] = {}
-            self._files_cache[resource_path][filename] = normalized
-            
-            return normalized
-        except Exception as e:
-            print(f"[ResourcesManager] Error reading {full_path}: {e}")
+
+        with self._lock:
+            if not self._load_file(resource_path, filename):
+                return None
+            return self._files_cache[resource_path][filename]
+
+    # ---------------------------
+    # 大文件的分批读取
+    # ---------------------------
+    def file_node_count(self, resource_path: str, filename: str) -> Optional[int]:
+        """文件中的节点数，文件不存在时返回 None"""
+        nodes = self.get_nodes_by_file(resource_path, filename)
+        return None if nodes is None else len(nodes)
+
+    def node_summaries(self, resource_path: str, filename: str, offset: int = 0,
+                       limit: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """按文件内顺序返回 [offset, offset + limit) 范围内节点的摘要，文件不存在时返回 None"""
+        nodes = self.get_nodes_by_file(resource_path, filename)
+        if nodes is None:
+            return None
+        stop = None if limit is None else offset + limit
+        return [node_summary(node_id, data) for node_id, data in itertools.islice(nodes.items(), offset, stop)]
+
+    def get_nodes_by_ids(self, resource_path: str, filename: str,
+                         node_ids: List[str]) -> Optional[Tuple[Dict[str, Any], List[str]]]:
+        """按 id 取节点完整数据，返回 (节点字典, 文件中不存在的 id)"""
+        nodes = self.get_nodes_by_file(resource_path, filename)
+        if nodes is None:
             return None
+        found = {node_id: nodes[node_id] for node_id in node_ids if node_id in nodes}
+        missing = [node_id for node_id in node_ids if node_id not in nodes]
+        return found, missing
+
+    def node_neighborhood(self, resource_path: str, filename: str, entry: str, depth: int = 1,
+                          limit: int = 200, direction: str = "out") -> Optional[Dict[str, Any]]:
+        """
+        以 entry 为起点按连线做广度优先遍历，只在同一文件内展开
+
+        Args:
+            depth: 最大跳数
+            limit: 最多返回的节点数
+            direction: out（沿 next 等字段向后）/ in（找指向它的节点）/ both
+
+        Returns:
+            {"nodes": {...}, "frontier": [达到 depth 或 limit 后未展开的节点],
+             "external": [指向本文件之外的目标], "missing": [不存在的 entry]}，文件不存在时返回 None
+        """
+        nodes = self.get_nodes_by_file(resource_path, filename)
+        if nodes is None:
+            return None
+        if entry not in nodes:
+            return {"nodes": {}, "frontier": [], "external": [], "missing": [entry]}
+
+        incoming: Dict[str, List[str]] = {}
+        if direction in ("in", "both"):
+            for node_id, data in nodes.items():
+                if not isinstance(data, dict):
+                    continue
+                for field in EDGE_FIELDS:
+                    for target in edge_targets(data.get(field)):
+                        incoming.setdefault(target, []).append(node_id)
+
+        def neighbours(node_id: str) -> List[str]:
+            out: List[str] = []
+            data = nodes.get(node_id)
+            if direction in ("out", "both") and isinstance(data, dict):
+                for field in EDGE_FIELDS:
+                    out.extend(edge_targets(data.get(field)))
+            if direction in ("in", "both"):
+                out.extend(incoming.get(node_id, []))
+            return out
+
+        result: Dict[str, Any] = {entry: nodes[entry]}
+        external: List[str] = []
+        frontier: List[str] = []
+        level = [entry]
+        for _ in range(max(0, depth)):
+            next_level = []
+            for node_id in level:
+                for target in neighbours(node_id):
+                    if target in result or target in external:
+                        continue
+                    if target not in nodes:
+                        external.append(target)
+                    elif len(result) >= limit:
+                        if target not in frontier:
+                            frontier.append(target)
+                    else:
+                        result[target] = nodes[target]
+                        next_level.append(target)
+            level = next_level
+            if not level:
+                break
+        # 到达深度上限时，最后一层节点的出边尚未展开
+        for node_id in level:
+            for target in neighbours(node_id):
+                if target in nodes and target not in result and target not in frontier:
+                    frontier.append(target)
+        return {"nodes": result, "frontier": frontier, "external": external, "missing": []}
+
+    @staticmethod
+    def _format_version(stamp: Optional[Tuple[int, int]]) -> Optional[str]:
+        return f"{stamp[0]:x}-{stamp[1]:x}" if stamp else None
+
+    def file_version(self, resource_path: str, filename: str) -> Optional[str]:
+        """
+        文件版本号（由 mtime_ns 与文件大小组成），文件不存在时返回 None
+
+        已缓存的文件直接使用加载 / 保存时记录的文件戳，不访问磁盘。
+        """
+        resource_path = os.path.normpath(resource_path)
+        stamp = self._file_stamps.get((resource_path, filename))
+        if stamp is None:
+            stamp = self._stat_stamp(os.path.join(self._get_pipeline_path(resource_path), filename))
+        return self._format_version(stamp)
+
+    def _reindex_file(self, resource_path: str, filename: str):
+        """只替换索引中属于该文件的条目；文件首次出现时整体重建以保持顺序"""
+        entries = self._file_records(resource_path, filename)
+        file_id = self._file_ids[self._file_key(resource_path, filename)]
+        index = self._node_index
+        start = next((i for i, record in enumerate(index) if record.file_id == file_id), None)
+        if start is None:
+            self._rebuild_index()
+            return
+        end = start
+        while end < len(index) and index[end].file_id == file_id:
+            end += 1
+        self._node_index = index[:start] + entries + index[end:]
+        nodes = self._files_cache[resource_path][filename]
+        if self._graph is not None:
+            self._graph.update_file(resource_path, filename, nodes)
+        if self._effective is not None:
+            self._effective.update_file(resource_path, filename, nodes)
+
+    def _cache_file(self, resource_path: str, filename: str, nodes: Dict[str, Any], full_path: str):
+        """写盘后同步缓存、文件戳与索引"""
+        with self._lock:
+            resource_path, filename = self._file_key(resource_path, filename)
+            self._files_cache.setdefault(resource_path, {})[filename] = nodes
+            stamp = self._stat_stamp(full_path)
+            if stamp:
+                self._file_stamps[(resource_path, filename)] = stamp
+            if resource_path in self.resource_paths:
+                self._reindex_file(resource_path, filename)
+
+    def _file_lock(self, resource_path: str, filename: str) -> threading.Lock:
+        with self._lock:
+            return self._file_locks.setdefault((resource_path, filename), threading.Lock())
+
+    def _write_nodes(self, full_path: str, nodes: Dict[str, Any]):
+        """
+        写入临时文件、fsync 后替换目标文件，中途失败不会留下半截 JSON
+
+        临时文件的权限与原文件一致（见 replacement_mode）。
+        替换后文件戳与原来相同（粗粒度 mtime 且大小不变）时把 mtime 推后 1ns，保证版本号一定变化。
+        """
+        previous = self._stat_stamp(full_path)
+        mode = replacement_mode(full_path)
+        directory = os.path.dirname(full_path)
+        fd, tmp_path = tempfile.mkstemp(prefix=".pipeline-", suffix=".tmp", dir=directory)
+        try:
+            os.chmod(tmp_path, mode)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(nodes, f, ensure_ascii=False, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, full_path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        if previous and self._stat_stamp(full_path) == previous:
+            os.utime(full_path, ns=(previous[0] + 1, previous[0] + 1))
 
     def save_nodes(self, resource_path: str, filename: str, content: Union[Dict, List]) -> int:
         """
@@ -215,7 +546,7 @@ class ResourcesManager:
             保存的节点数量
         """
         resource_path = os.path.normpath(resource_path)
-        normalized = self._normalize_data(content)
+        normalized = _intern_values(self._normalize_data(content))
         
         pipeline_path = self._get_pipeline_path(resource_path)
         full_path = os.path.join(pipeline_path, filename)
@@ -223,16 +554,84 @@ class ResourcesManager:
         # 确保目录存在
         os.makedirs(pipeline_path, exist_ok=True)
         
-        with open(full_path, "w", encoding="utf-8") as f:
-            json.dump(normalized, f, ensure_ascii=False, indent=4)
-        
-        # 更新缓存
-        if resource_path not in self._files_cache:
-            self._files_cache[resource_path] = {}
-        self._files_cache[resource_path][filename] = normalized
+        with self._file_lock(resource_path, filename):
+            self._write_nodes(full_path, normalized)
+
+            # 更新缓存
+            self._cache_file(resource_path, filename, normalized, full_path)
         
         return len(normalized)
 
+    def patch_nodes(self, resource_path: str, filename: str, upserts: Optional[Dict[str, Any]] = None,
+                    deletes: Optional[List[str]] = None, base_version: Optional[str] = None) -> Dict[str, Any]:
+        """
+        只提交变化的节点：新增 / 修改的节点写入 upserts，删除的节点 id 放在 deletes
+
+        修改的节点保持原有位置，新增节点追加在文件末尾。base_version 不为空时必须与文件当前版本一致，
+        否则抛出 VersionConflict；磁盘上的文件被外部修改过时先重新读取再比较。
+
+        Returns:
+            {"version": 新版本号, "count": 节点总数, "previous": {id: 旧数据}, "nodes": {id: 新数据}}
+            previous / nodes 只包含本次涉及的节点，供调用方计算差异
+        """
+        resource_path = os.path.normpath(resource_path)
+        upserts = _intern_values(upserts or {})
+        deletes = [node_id for node_id in (deletes or []) if node_id not in upserts]
+        full_path = os.path.join(self._get_pipeline_path(resource_path), filename)
+
+        with self._file_lock(resource_path, filename):
+            stamp = self._stat_stamp(full_path)
+            if stamp is None:
+                raise FileNotFoundError(filename)
+            cached = self._files_cache.get(resource_path, {}).get(filename)
+            if cached is None or stamp != self._file_stamps.get((resource_path, filename)):
+                with self._lock:
+                    if not self._load_file(resource_path, filename):
+                        raise ValueError(f"Failed to load {filename}")
+                    cached = self._files_cache[resource_path][filename]
+            current = self._format_version(stamp)
+            if base_version is not None and base_version != current:
+                raise VersionConflict(current)
+
+            nodes = dict(cached)
+            for node_id in deletes:
+                nodes.pop(node_id, None)
+            nodes.update(upserts)
+            self._write_nodes(full_path, nodes)
+            self._cache_file(resource_path, filename, nodes, full_path)
+
+            touched = list(upserts) + deletes
+            return {
+                "version": self.file_version(resource_path, filename),
+                "count": len(nodes),
+                "previous": {node_id: cached[node_id] for node_id in touched if node_id in cached},
+                "nodes": {node_id: nodes[node_id] for node_id in upserts},
+            }
+
+    @staticmethod
+    def diff_nodes(old: Optional[Dict[str, Any]], new: Dict[str, Any]) -> Dict[str, List[str]]:
+        """
+        比较同一文件保存前后的节点
+
+        Returns:
+            {"added": [...], "changed": [...], "deleted": [...], "fields_removed": [...]}
+            fields_removed 为修改后删掉了某些字段的节点（override 无法删除字段）
+        """
+        old = old or {}
+        added, changed, fields_removed = [], [], []
+        for node_id, data in new.items():
+            if node_id not in old:
+                added.append(node_id)
+                continue
+            previous = old[node_id]
+            if previous == data:
+                continue
+            changed.append(node_id)
+            if isinstance(previous, dict) and isinstance(data, dict) and set(previous) - set(data):
+                fields_removed.append(node_id)
+        deleted = [node_id for node_id in old if node_id not in new]
+        return {"added": added, "changed": changed, "deleted": deleted, "fields_removed": fields_removed}
+
     def create_file(self, resource_path: str, filename: str) -> bool:
         """
         创建新的空 JSON 文件
@@ -257,13 +656,11 @@ class ResourcesManager:
         
         os.makedirs(pipeline_path, exist_ok=True)
         
-        with open(full_path, "w", encoding="utf-8") as f:
-            json.dump({}, f, ensure_ascii=False, indent=4)
-        
-        # 更新缓存
-        if resource_path not in self._files_cache:
-            self._files_cache[resource_path] = {}
-        self._files_cache[resource_path][filename] = {}
+        with self._file_lock(resource_path, filename):
+            self._write_nodes(full_path, {})
+
+            # 更新缓存
+            self._cache_file(resource_path, filename, {}, full_path)
         
         return True
 
@@ -301,15 +698,16 @@ class ResourcesManager:
         query_lower = query.lower()
         exclude_source_norm = os.path.normpath(exclude_source) if exclude_source else ""
         
-        for info in self._node_index:
-            node_id = info["node_id"]
+        for record in self._node_index:
+            node_id = record.node_id
+            resource_path, filename = self._file_keys[record.file_id]
             
             # 排除当前正在编辑的文件（需要同时匹配 source 和 filename）
-            if exclude_file and info["filename"] == exclude_file:
-                if not exclude_source_norm or info["resource_path"] == exclude_source_norm:
+            if exclude_file and filename == exclude_file:
+                if not exclude_source_norm or resource_path == exclude_source_norm:
                     continue
             
-            node_data = info["data"]
+            node_data = record.data
             display_id = str(node_data.get("id", node_id)) if isinstance(node_data, dict) else str(node_id)
             targets = [str(node_id), display_id]
             
@@ -321,8 +719,8 @@ class ResourcesManager:
             
             if matched:
                 results.append({
-                    "filename": info["filename"],
-                    "source": info["resource_path"],
+                    "filename": filename,
+                    "source": resource_path,
                     "node_id": node_id,
                     "display_id": display_id,
                     "type": node_data.get("recognition", "Unknown") if isinstance(node_data, dict) else "Unknown"
@@ -424,6 +822,7 @@ class ResourcesManager:
         
         with open(full_path, "wb") as f:
             f.write(base64.b64decode(base64_data))
+        _bump_image_generation(resource_path)
         
         return True
 
@@ -445,6 +844,7 @@ class ResourcesManager:
             return False
         
         os.remove(full_path)
+        _bump_image_generation(resource_path)
         
         # 尝试删除空的父目录
         parent_dir = os.path.dirname(full_path)
@@ -461,23 +861,154 @@ class ResourcesManager:
         """重新加载所有数据"""
         self._load_all()
 
+    def graph(self) -> PipelineGraph:
+        """跨文件的连线图（按需构建）"""
+        with self._lock:
+            if self._graph is None:
+                graph = PipelineGraph(self.resource_paths)
+                graph.build(self._files_cache)
+                self._graph = graph
+            return self._graph
+
+    def effective_nodes(self) -> EffectiveNodes:
+        """按加载顺序逐字段合并后的节点视图（按需构建）"""
+        with self._lock:
+            if self._effective is None:
+                self._effective = EffectiveNodes(self.resource_paths, self._files_cache)
+            return self._effective
+
+    def validator(self) -> PipelineValidator:
+        """pipeline 校验器（结果按文件版本缓存）"""
+        with self._lock:
+            if self._validator is None:
+                self._validator = PipelineValidator(self)
+            return self._validator
+
+    def node_count(self) -> int:
+        """已索引的节点条目数（同名节点分别计数）"""
+        return len(self._node_index)
+
+    def node_ids(self) -> set:
+        """所有已索引的节点 ID"""
+        return {record.node_id for record in self._node_index}
+
     def get_node_value(self, node_id: str) -> Optional[Dict[str, Any]]:
         """通过节点 ID 获取节点数据（返回第一个匹配的）"""
-        for entry in self._node_index:
-            if entry["node_id"] == node_id:
-                return entry["data"]
+        for record in self._node_index:
+            if record.node_id == node_id:
+                return record.data
         return None
 
     def get_node_location(self, node_id: str) -> Optional[Dict[str, str]]:
         """通过节点 ID 获取节点位置信息（返回第一个匹配的）"""
-        for entry in self._node_index:
-            if entry["node_id"] == node_id:
+        for record in self._node_index:
+            if record.node_id == node_id:
+                resource_path, filename = self._file_keys[record.file_id]
                 return {
-                    "resource_path": entry["resource_path"],
-                    "filename": entry["filename"]
+                    "resource_path": resource_path,
+                    "filename": filename
                 }
         return None
 
+    def memory_report(self, deep: bool = True) -> Dict[str, Any]:
+        """
+        各内存结构的占用（字节）
+
+        deep=False 时只统计索引本身；deep=True 时再递归统计文件缓存中的节点数据，
+        以及已构建的连线图、有效节点视图与校验缓存（共享的对象只计一次）。
+        """
+        nodes = len(self._node_index)
+        seen: set = set()
+        report: Dict[str, Any] = {
+            "paths": self.resource_paths,
+            "files": len(self._file_stamps),
+            "nodes": nodes,
+        }
+        sizes: Dict[str, Optional[int]] = {}
+        if deep:
+            sizes["files_cache"] = deep_sizeof(self._files_cache, seen)
+        # 索引条目本身（节点名与节点数据属于文件缓存，不计入）
+        record_size = sys.getsizeof(self._node_index[0]) if nodes else 0
+        sizes["index"] = (
+            sys.getsizeof(self._node_index) + record_size * nodes
+            + deep_sizeof((self._file_keys, self._file_ids), seen)
+        )
+        if deep:
+            for name, value in (("graph", self._graph), ("effective", self._effective), ("validation", self._validator)):
+                if value is None:
+                    sizes[name] = None
+                    continue
+                if name == "validation":
+                    value = value._results
+                sizes[name] = deep_sizeof(value.__dict__ if hasattr(value, "__dict__") else value, seen)
+        report["bytes"] = sizes
+        report["per_10k_nodes"] = {
+            name: round(size * 10000 / nodes) if nodes and size is not None else None
+            for name, size in sizes.items()
+        }
+        return report
+
 
 # 保留旧类名的兼容性别名（可选，方便迁移）
 JsonNodeLoader = ResourcesManager
+
+
+# ---------------------------
+# 共享实例
+# ---------------------------
+_managers: Dict[Tuple[str, ...], ResourcesManager] = {}
+_managers_lock = threading.Lock()
+
+
+def _manager_key(paths: Union[str, List[str]]) -> Tuple[str, ...]:
+    if isinstance(paths, str):
+        paths = [paths]
+    key: List[str] = []
+    for p in paths:
+        if p:
+            normalized = os.path.normpath(p)
+            if normalized not in key:
+                key.append(normalized)
+    return tuple(key)
+
+
+def get_resources_manager(paths: Union[str, List[str]], refresh: bool = True) -> ResourcesManager:
+    """
+    获取按路径组缓存的共享资源管理器，避免每个请求都重新解析全部 JSON
+
+    refresh=True 时先按文件戳同步磁盘上的改动（只重读变化的文件）。
+    """
+    key = _manager_key(paths)
+    with _managers_lock:
+        manager = _managers.get(key)
+        created = manager is None
+        if created:
+            manager = ResourcesManager(list(key))
+            _managers[key] = manager
+    if refresh and not created:
+        manager.refresh()
+    return manager
+
+
+def find_resources_manager(resource_path: str) -> ResourcesManager:
+    """优先复用已缓存且包含该资源路径的管理器，否则创建单路径管理器"""
+    resource_path = os.path.normpath(resource_path)
+    with _managers_lock:
+        candidates = [m for key, m in _managers.items() if resource_path in key]
+    if candidates:
+        manager = candidates[0]
+        manager.refresh()
+        return manager
+    return get_resources_manager(resource_path)
+
+
+def cached_resources_managers() -> List[ResourcesManager]:
+    with _managers_lock:
+        return list(_managers.values())
+
+
+registry.register_collector(
+    "maa_resource_nodes",
+    "Indexed pipeline nodes per cached resource set",
+    lambda: [({"paths": os.pathsep.join(m.resource_paths)}, m.node_count()) for m in cached_resources_managers()],
+)
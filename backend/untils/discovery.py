@@ -0,0 +1,213 @@
+"""
+设备发现服务
+
+ADB 与 Win32 两种扫描在各自线程中并行执行，结果按 TTL 缓存：
+    - 有缓存时请求立即返回缓存列表，过期则带 stale=True 并在后台刷新；
+    - 从未扫描过时等待首次扫描（有超时）；
+    - 每次扫描与上次结果比对，通过事件流推送设备出现 / 消失（type=devices）；
+    - 最近有人查询时，后台线程按 TTL 周期刷新，空闲后自动停止。
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from backend.common.events import debug_broker
+
+KIND_ADB = "adb"
+KIND_WIN32 = "win32control"
+KINDS = (KIND_ADB, KIND_WIN32)
+
+DEFAULT_TTL = 10.0
+FIRST_SCAN_TIMEOUT = 15.0
+IDLE_SECONDS = 60.0
+
+
+def _toolkit():
+    from backend.untils.runtime import maafw_module
+
+    maafw_module().init_framework()
+    from maa.toolkit import Toolkit
+
+    return Toolkit
+
+
+def scan_adb() -> List[Dict[str, Any]]:
+    Toolkit = _toolkit()
+    devices = []
+    for d in Toolkit.find_adb_devices() or []:
+        devices.append(
+            {
+                "name": getattr(d, "name", "ADB Device"),
+                "address": getattr(d, "address", "").strip(),
+                "adb_path": str(getattr(d, "adb_path", "") or ""),
+                "config": getattr(d, "config", {}) or {},
+                "type": "adb",
+            }
+        )
+    return devices
+
+
+def scan_win32() -> List[Dict[str, Any]]:
+    Toolkit = _toolkit()
+    if not hasattr(Toolkit, "find_desktop_windows"):
+        return []
+    devices = []
+    for w in Toolkit.find_desktop_windows() or []:
+        window_name = getattr(w, "window_name", "") or "Win32 Window"
+        devices.append(
+            {
+                "name": window_name,
+                "type": "win32control",
+                "hwnd": getattr(w, "hwnd", None),
+                "class_name": getattr(w, "class_name", "") or "",
+                "window_name": window_name,
+            }
+        )
+    return devices
+
+
+def device_key(device: Dict[str, Any]) -> Tuple:
+    if device.get("type") == "adb":
+        return ("adb", device.get("adb_path"), device.get("address"))
+    return (device.get("type"), device.get("hwnd"))
+
+
+class _KindState:
+    def __init__(self):
+        self.devices: List[Dict[str, Any]] = []
+        self.scanned_at: Optional[float] = None
+        self.elapsed_ms: Optional[float] = None
+        self.error: Optional[str] = None
+        self.scanning = False
+        self.done = threading.Event()
+
+
+class DeviceDiscovery:
+    def __init__(self, publish: Callable[[dict], None], ttl: float = DEFAULT_TTL,
+                 scanners: Optional[Dict[str, Callable[[], List[Dict[str, Any]]]]] = None):
+        self._publish = publish
+        self.ttl = ttl
+        self._scanners = scanners or {KIND_ADB: scan_adb, KIND_WIN32: scan_win32}
+        self._lock = threading.Lock()
+        self._state: Dict[str, _KindState] = {kind: _KindState() for kind in self._scanners}
+        self._executor = ThreadPoolExecutor(max_workers=len(self._scanners), thread_name_prefix="maa-discovery")
+        self._last_query = 0.0
+        self._refresher: Optional[threading.Thread] = None
+
+    # ---------------------------
+    # 查询
+    # ---------------------------
+    def search(self, kinds: Optional[List[str]] = None, force: bool = False, wait: bool = False,
+               timeout: float = FIRST_SCAN_TIMEOUT) -> Dict[str, Any]:
+        """
+        返回缓存的设备列表及其新鲜度
+
+        force=True 时立即发起扫描；wait=True（或该类型从未扫描过）时等待扫描结束，最多 timeout 秒。
+        """
+        kinds = [k for k in (kinds or self._scanners) if k in self._scanners]
+        self._last_query = time.time()
+        self._ensure_refresher()
+
+        events = []
+        for kind in kinds:
+            state = self._state[kind]
+            if force or state.scanned_at is None or self._expired(state):
+                self.refresh(kind)
+            if wait or force or state.scanned_at is None:
+                events.append(state.done)
+        deadline = time.time() + timeout
+        for event in events:
+            event.wait(max(0.0, deadline - time.time()))
+
+        devices: List[Dict[str, Any]] = []
+        status = {}
+        with self._lock:
+            for kind in kinds:
+                state = self._state[kind]
+                devices.extend(state.devices)
+                status[kind] = {
+                    "scanned_at": int(state.scanned_at * 1000) if state.scanned_at else None,
+                    "elapsed_ms": state.elapsed_ms,
+                    "scanning": state.scanning,
+                    "stale": state.scanned_at is None or self._expired(state),
+                    "error": state.error,
+                }
+        return {
+            "devices": devices,
+            "stale": any(s["stale"] for s in status.values()),
+            "scanning": any(s["scanning"] for s in status.values()),
+            "sources": status,
+        }
+
+    def _expired(self, state: _KindState) -> bool:
+        return state.scanned_at is None or time.time() - state.scanned_at > self.ttl
+
+    # ---------------------------
+    # 扫描
+    # ---------------------------
+    def refresh(self, kind: str) -> bool:
+        """在后台发起一次扫描；该类型已在扫描中时不重复发起"""
+        with self._lock:
+            state = self._state[kind]
+            if state.scanning:
+                return False
+            state.scanning = True
+            state.done.clear()
+        self._executor.submit(self._scan, kind)
+        return True
+
+    def _scan(self, kind: str):
+        state = self._state[kind]
+        started = time.perf_counter()
+        try:
+            devices = self._scanners[kind]()
+            error = None
+        except Exception as exc:
+            devices, error = None, str(exc)
+        elapsed = round((time.perf_counter() - started) * 1000, 1)
+
+        with self._lock:
+            previous = {device_key(d): d for d in state.devices}
+            if devices is not None:
+                state.devices = devices
+                state.scanned_at = time.time()
+            state.elapsed_ms = elapsed
+            state.error = error
+            state.scanning = False
+            state.done.set()
+
+        if devices is None:
+            return
+        current = {device_key(d): d for d in devices}
+        appeared = [d for k, d in current.items() if k not in previous]
+        disappeared = [d for k, d in previous.items() if k not in current]
+        if appeared or disappeared:
+            self._publish({
+                "type": "devices",
+                "kind": kind,
+                "appeared": appeared,
+                "disappeared": disappeared,
+                "count": len(devices),
+                "timestamp": int(time.time() * 1000),
+            })
+
+    # ---------------------------
+    # 后台刷新
+    # ---------------------------
+    def _ensure_refresher(self):
+        with self._lock:
+            if self._refresher is not None and self._refresher.is_alive():
+                return
+            self._refresher = threading.Thread(target=self._refresh_loop, name="maa-discovery-refresh", daemon=True)
+            self._refresher.start()
+
+    def _refresh_loop(self):
+        while time.time() - self._last_query < IDLE_SECONDS:
+            time.sleep(self.ttl)
+            for kind, state in self._state.items():
+                if self._expired(state):
+                    self.refresh(kind)
+
+
+device_discovery = DeviceDiscovery(debug_broker.publish)
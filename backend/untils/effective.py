@@ -0,0 +1,118 @@
+"""
+多资源包叠加后的有效节点
+
+MaaFW 按 paths 顺序加载资源包，后加载的同名节点逐字段覆盖之前的定义。这里按同样的顺序
+（资源包顺序，包内按文件名）合并节点，并记录每个字段最终来自哪个文件。
+
+合并结果按节点缓存；某个文件保存后只清掉该文件前后涉及的节点。
+"""
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+FileKey = Tuple[str, str]
+
+
+class EffectiveNodes:
+    """
+    Args:
+        resource_paths: 资源包路径（加载顺序）
+        files: ResourcesManager 的文件缓存 {resource_path: {filename: nodes}}，只读引用
+    """
+
+    def __init__(self, resource_paths: List[str], files: Dict[str, Dict[str, Dict[str, Any]]]):
+        self.resource_paths = list(resource_paths)
+        self._files = files
+        self._lock = threading.RLock()
+        # node_id -> 定义该节点的文件（按加载顺序）
+        self._definitions: Dict[str, List[FileKey]] = {}
+        self._file_nodes: Dict[FileKey, List[str]] = {}
+        self._merged: Dict[str, Dict[str, Any]] = {}
+        for resource_path in self.resource_paths:
+            for filename, nodes in files.get(resource_path, {}).items():
+                self._add_file((resource_path, filename), nodes)
+
+    def _order(self, key: FileKey) -> Tuple[int, str]:
+        resource_path, filename = key
+        try:
+            return self.resource_paths.index(resource_path), filename
+        except ValueError:
+            return len(self.resource_paths), filename
+
+    def _add_file(self, key: FileKey, nodes: Dict[str, Any]):
+        ids = [str(node_id) for node_id in nodes]
+        self._file_nodes[key] = ids
+        for node_id in ids:
+            definitions = self._definitions.setdefault(node_id, [])
+            definitions.append(key)
+            definitions.sort(key=self._order)
+
+    def update_file(self, resource_path: str, filename: str, nodes: Optional[Dict[str, Any]]):
+        """文件保存（nodes 为新内容）或删除（nodes 为 None）后只作废涉及的节点"""
+        key = (resource_path, filename)
+        with self._lock:
+            touched = set(self._file_nodes.pop(key, []))
+            for node_id in touched:
+                definitions = self._definitions.get(node_id, [])
+                if key in definitions:
+                    definitions.remove(key)
+                if not definitions:
+                    self._definitions.pop(node_id, None)
+            if nodes is not None:
+                self._add_file(key, nodes)
+                touched.update(self._file_nodes[key])
+            for node_id in touched:
+                self._merged.pop(node_id, None)
+
+    # ---------------------------
+    # 查询
+    # ---------------------------
+    def effective(self, node_id: str) -> Optional[Dict[str, Any]]:
+        """
+        合并后的节点
+
+        Returns:
+            {"id", "node": 合并结果, "provenance": {字段: {resource_path, filename}},
+             "chain": [{resource_path, filename, fields: 该文件定义的字段, overrides: 覆盖了之前取值的字段}]}
+            节点未定义时返回 None
+        """
+        with self._lock:
+            cached = self._merged.get(node_id)
+            if cached is not None:
+                return cached
+            definitions = self._definitions.get(node_id)
+            if not definitions:
+                return None
+
+            merged: Dict[str, Any] = {}
+            provenance: Dict[str, Dict[str, str]] = {}
+            chain = []
+            for resource_path, filename in definitions:
+                data = self._files.get(resource_path, {}).get(filename, {}).get(node_id)
+                data = data if isinstance(data, dict) else {}
+                source = {"resource_path": resource_path, "filename": filename}
+                overrides = [field for field, value in data.items() if field in merged and merged[field] != value]
+                for field, value in data.items():
+                    merged[field] = value
+                    provenance[field] = source
+                chain.append({**source, "fields": list(data), "overrides": overrides})
+
+            result = {"id": node_id, "node": merged, "provenance": provenance, "chain": chain}
+            self._merged[node_id] = result
+            return result
+
+    def overridden(self) -> List[Dict[str, Any]]:
+        """被多个文件定义的节点，以及最终被覆盖掉取值的字段"""
+        with self._lock:
+            ids = [node_id for node_id, definitions in self._definitions.items() if len(definitions) > 1]
+        result = []
+        for node_id in ids:
+            view = self.effective(node_id)
+            if view is None:
+                continue
+            result.append({
+                "id": node_id,
+                "definitions": len(view["chain"]),
+                "overrides": sorted({field for entry in view["chain"] for field in entry["overrides"]}),
+                "winner": view["chain"][-1]["resource_path"],
+            })
+        return result
@@ -0,0 +1,302 @@
+"""
+Pipeline 连线图
+
+由 ResourcesManager 的文件缓存构建，覆盖所有已加载的资源包：
+    - 每个文件只解析一次连线（[JumpBack] / [Anchor] 前缀、{"name": ...} 对象写法）；
+    - 同名节点按加载顺序逐字段覆盖，有效连线取最后一个定义了该字段的文件；
+    - 正向、反向邻接表，以及锚点名 -> 声明节点的映射；
+    - 保存单个文件时只重算该文件涉及的节点。
+
+[Anchor]X 指向声明了锚点 X 的节点（节点的 anchor 字段为名称或名称列表；为 true 时锚点名即节点名），
+没有节点声明该锚点时按同名节点处理。
+"""
+import re
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+# 指向其他节点的字段（timeout_next 为旧版写法）
+EDGE_FIELDS = ("next", "interrupt", "on_error", "timeout_next")
+_EDGE_PREFIX = re.compile(r"\[(Anchor|JumpBack)\]")
+
+FileKey = Tuple[str, str]
+
+
+class Link(NamedTuple):
+    target: str
+    jump_back: bool
+    anchor: bool
+
+
+def parse_links(value: Any) -> List[Link]:
+    """把 next / on_error 等字段的取值解析为连线列表"""
+    if value is None:
+        return []
+    items = value if isinstance(value, list) else [value]
+    links = []
+    for item in items:
+        jump_back = anchor = False
+        if isinstance(item, dict):
+            jump_back = bool(item.get("jump_back"))
+            anchor = bool(item.get("anchor"))
+            item = item.get("name")
+        if not isinstance(item, str) or not item:
+            continue
+        jump_back = jump_back or "[JumpBack]" in item
+        anchor = anchor or "[Anchor]" in item
+        links.append(Link(_EDGE_PREFIX.sub("", item), jump_back, anchor))
+    return links
+
+
+def edge_targets(value: Any) -> List[str]:
+    """
+    把 next / on_error 等字段规范化为目标节点名列表
+
+    兼容单个字符串、字符串列表以及 {"name": ...} 对象写法，并去掉 [JumpBack] / [Anchor] 前缀。
+    """
+    return [link.target for link in parse_links(value)]
+
+
+def anchor_names(node_id: str, data: Any) -> List[str]:
+    """节点声明的锚点名"""
+    value = data.get("anchor") if isinstance(data, dict) else None
+    if value is True:
+        return [node_id]
+    if isinstance(value, str) and value:
+        return [value]
+    if isinstance(value, list):
+        return [v for v in value if isinstance(v, str) and v]
+    return []
+
+
+class Edge(NamedTuple):
+    source: str
+    field: str
+    target: str
+    jump_back: bool
+    anchor: bool
+
+
+class PipelineGraph:
+    """
+    跨文件的节点连线索引
+
+    Args:
+        resource_paths: 资源包路径（加载顺序），同名节点以靠后的定义为准
+    """
+
+    def __init__(self, resource_paths: List[str]):
+        self.resource_paths = list(resource_paths)
+        self._lock = threading.RLock()
+        # 每个文件解析后的结果：file -> {node_id: {field: [Link]}} / {node_id: [anchor]}
+        self._file_links: Dict[FileKey, Dict[str, Dict[str, List[Link]]]] = {}
+        self._file_anchors: Dict[FileKey, Dict[str, List[str]]] = {}
+        # node_id -> 定义该节点的文件（按加载顺序）
+        self._definitions: Dict[str, List[FileKey]] = {}
+        # 有效连线：source -> [Edge]；反向：目标名 -> {Edge}
+        self._out: Dict[str, List[Edge]] = {}
+        self._in: Dict[str, Set[Edge]] = {}
+        # 锚点名 -> 声明节点；node_id -> 有效定义中声明的锚点名
+        self._anchors: Dict[str, Set[str]] = {}
+        self._node_anchors: Dict[str, List[str]] = {}
+
+    # ---------------------------
+    # 构建与增量更新
+    # ---------------------------
+    def _order(self, key: FileKey) -> Tuple[int, str]:
+        resource_path, filename = key
+        try:
+            return self.resource_paths.index(resource_path), filename
+        except ValueError:
+            return len(self.resource_paths), filename
+
+    def build(self, files: Dict[str, Dict[str, Dict[str, Any]]]):
+        """从 ResourcesManager 的文件缓存 {resource_path: {filename: nodes}} 完整构建"""
+        with self._lock:
+            self._file_links.clear()
+            self._file_anchors.clear()
+            self._definitions.clear()
+            self._out.clear()
+            self._in.clear()
+            self._anchors.clear()
+            self._node_anchors.clear()
+            touched: Set[str] = set()
+            for resource_path in self.resource_paths:
+                for filename, nodes in files.get(resource_path, {}).items():
+                    touched.update(self._parse_file((resource_path, filename), nodes))
+            self._recompute(touched)
+
+    def update_file(self, resource_path: str, filename: str, nodes: Optional[Dict[str, Any]]):
+        """文件保存（nodes 为新内容）或删除（nodes 为 None）后只重算该文件涉及的节点"""
+        key = (resource_path, filename)
+        with self._lock:
+            touched = set(self._file_links.get(key, ()))
+            self._drop_file(key)
+            if nodes is not None:
+                touched.update(self._parse_file(key, nodes))
+            self._recompute(touched)
+
+    def _parse_file(self, key: FileKey, nodes: Dict[str, Any]) -> List[str]:
+        links: Dict[str, Dict[str, List[Link]]] = {}
+        anchors: Dict[str, List[str]] = {}
+        for node_id, data in nodes.items():
+            node_id = str(node_id)
+            fields = {}
+            if isinstance(data, dict):
+                for field in EDGE_FIELDS:
+                    if field in data:
+                        fields[field] = parse_links(data[field])
+            links[node_id] = fields
+            # 后加载的定义显式写了 anchor（包括 false）时覆盖之前声明的锚点
+            if isinstance(data, dict) and "anchor" in data:
+                anchors[node_id] = anchor_names(node_id, data)
+            definitions = self._definitions.setdefault(node_id, [])
+            definitions.append(key)
+            definitions.sort(key=self._order)
+        self._file_links[key] = links
+        self._file_anchors[key] = anchors
+        return list(links)
+
+    def _drop_file(self, key: FileKey):
+        for node_id in self._file_links.pop(key, {}):
+            definitions = self._definitions.get(node_id, [])
+            if key in definitions:
+                definitions.remove(key)
+            if not definitions:
+                self._definitions.pop(node_id, None)
+        self._file_anchors.pop(key, None)
+
+    def _recompute(self, node_ids: Iterable[str]):
+        """重新计算节点的有效连线与锚点（逐字段取最后一个定义）"""
+        for node_id in node_ids:
+            for edge in self._out.pop(node_id, []):
+                incoming = self._in.get(edge.target)
+                if incoming is not None:
+                    incoming.discard(edge)
+                    if not incoming:
+                        del self._in[edge.target]
+            for name in self._node_anchors.pop(node_id, []):
+                declarers = self._anchors.get(name)
+                if declarers is not None:
+                    declarers.discard(node_id)
+                    if not declarers:
+                        del self._anchors[name]
+
+            effective: Dict[str, List[Link]] = {}
+            declared: List[str] = []
+            for key in self._definitions.get(node_id, []):
+                effective.update(self._file_links[key].get(node_id, {}))
+                if node_id in self._file_anchors.get(key, {}):
+                    declared = self._file_anchors[key][node_id]
+
+            edges = [
+                Edge(node_id, field, link.target, link.jump_back, link.anchor)
+                for field in EDGE_FIELDS
+                for link in effective.get(field, [])
+            ]
+            if edges:
+                self._out[node_id] = edges
+            for edge in edges:
+                self._in.setdefault(edge.target, set()).add(edge)
+            if declared:
+                self._node_anchors[node_id] = declared
+            for name in declared:
+                self._anchors.setdefault(name, set()).add(node_id)
+
+    # ---------------------------
+    # 查询
+    # ---------------------------
+    def has_node(self, node_id: str) -> bool:
+        return node_id in self._definitions
+
+    def has_anchor(self, name: str) -> bool:
+        return name in self._anchors
+
+    def node_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._definitions)
+
+    def resolve(self, edge: Edge) -> List[str]:
+        """连线实际指向的节点；目标未定义时返回空列表"""
+        if edge.anchor and edge.target in self._anchors:
+            return sorted(self._anchors[edge.target])
+        return [edge.target] if edge.target in self._definitions else []
+
+    def location(self, node_id: str) -> Optional[Dict[str, str]]:
+        """节点有效定义所在的文件（加载顺序中的最后一个）"""
+        definitions = self._definitions.get(node_id)
+        if not definitions:
+            return None
+        resource_path, filename = definitions[-1]
+        return {"resource_path": resource_path, "filename": filename}
+
+    def successors(self, node_id: str, fields: Iterable[str] = EDGE_FIELDS) -> List[Edge]:
+        fields = set(fields)
+        with self._lock:
+            return [edge for edge in self._out.get(node_id, []) if edge.field in fields]
+
+    def predecessors(self, node_id: str) -> List[Edge]:
+        """谁会跳转到 node_id（包括通过其声明的锚点跳转过来的连线）"""
+        with self._lock:
+            names = {node_id, *self._node_anchors.get(node_id, [])}
+            result = []
+            for name in names:
+                for edge in self._in.get(name, ()):
+                    if node_id in self.resolve(edge):
+                        result.append(edge)
+            return sorted(result, key=lambda e: (e.source, EDGE_FIELDS.index(e.field)))
+
+    def reachable(self, entries: Iterable[str], fields: Iterable[str] = EDGE_FIELDS,
+                  max_depth: Optional[int] = None) -> Dict[str, int]:
+        """从入口节点出发可到达的节点及其最短跳数（入口本身为 0）"""
+        fields = set(fields)
+        with self._lock:
+            depth = {entry: 0 for entry in entries if entry in self._definitions}
+            queue = deque(depth)
+            while queue:
+                node_id = queue.popleft()
+                if max_depth is not None and depth[node_id] >= max_depth:
+                    continue
+                for edge in self._out.get(node_id, ()):
+                    if edge.field not in fields:
+                        continue
+                    for target in self.resolve(edge):
+                        if target not in depth:
+                            depth[target] = depth[node_id] + 1
+                            queue.append(target)
+            return depth
+
+    def undefined_targets(self) -> Dict[str, List[Edge]]:
+        """被引用但没有任何定义（锚点也无人声明）的目标 -> 引用它的连线"""
+        with self._lock:
+            result = {}
+            for name, edges in self._in.items():
+                dangling = [edge for edge in edges if not self.resolve(edge)]
+                if dangling:
+                    result[name] = sorted(dangling, key=lambda e: (e.source, EDGE_FIELDS.index(e.field)))
+            return dict(sorted(result.items()))
+
+    def roots(self) -> List[str]:
+        """没有任何节点指向的节点"""
+        with self._lock:
+            targeted = set()
+            for edges in self._in.values():
+                for edge in edges:
+                    targeted.update(self.resolve(edge))
+            return [node_id for node_id in self._definitions if node_id not in targeted]
+
+    def unreachable(self, entries: Optional[Iterable[str]] = None) -> List[str]:
+        """从入口节点（默认为所有 roots）出发无法到达的节点"""
+        entries = list(entries) if entries is not None else self.roots()
+        reached = self.reachable(entries)
+        with self._lock:
+            return [node_id for node_id in self._definitions if node_id not in reached]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "nodes": len(self._definitions),
+                "edges": sum(len(edges) for edges in self._out.values()),
+                "anchors": len(self._anchors),
+                "files": len(self._file_links),
+            }
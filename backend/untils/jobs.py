@@ -0,0 +1,271 @@
+import heapq
+import itertools
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+FINISHED_STATES = (JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED)
+
+
+class TaskJob:
+    """一次调试运行的作业记录"""
+
+    def __init__(self, job_id: str, entry: str, pipeline_override: Optional[dict], priority: int = 0):
+        self.job_id = job_id
+        self.entry = entry
+        self.pipeline_override = pipeline_override or {}
+        self.priority = priority
+        self.status = JOB_QUEUED
+        self.task_id: Optional[int] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.cancel_requested = False
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def elapsed_ms(self) -> Optional[int]:
+        """运行耗时（毫秒），排队中的作业返回 None"""
+        if self.started_at is None:
+            return None
+        end = self.finished_at if self.finished_at is not None else time.time()
+        return int((end - self.started_at) * 1000)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "entry": self.entry,
+            "priority": self.priority,
+            "status": self.status,
+            "task_id": self.task_id,
+            "created_at": int(self.created_at * 1000),
+            "started_at": int(self.started_at * 1000) if self.started_at else None,
+            "finished_at": int(self.finished_at * 1000) if self.finished_at else None,
+            "elapsed_ms": self.elapsed_ms(),
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class TaskJobManager:
+    """
+    调试任务作业管理器
+
+    同一个 Tasker 同一时刻只能执行一个任务，因此所有运行请求先进入优先级队列，
+    由单独的工作线程按 (优先级降序, 提交顺序) 依次执行。每个作业拥有独立 id，
+    可单独查询状态、耗时、结果，或单独取消。
+
+    runner 需提供：
+        run_task(entry, pipeline_override) -> (maa_job | None, error | None)
+        stop_task()
+        get_task_result(task_id) -> dict | None
+    """
+
+    def __init__(self, runner: Any, publish: Optional[Callable[[dict], None]] = None, history_limit: int = 100):
+        self._runner = runner
+        self._publish = publish
+        self._history_limit = history_limit
+
+        self._cond = threading.Condition()
+        self._queue: List[tuple] = []
+        self._jobs: Dict[str, TaskJob] = {}
+        self._task_to_job: Dict[int, str] = {}
+        self._current: Optional[TaskJob] = None
+        self._seq = itertools.count()
+        self._worker: Optional[threading.Thread] = None
+        self._closed = False
+
+    # ---------------------------
+    # 提交与查询
+    # ---------------------------
+    def submit(self, entry: str, pipeline_override: Optional[dict] = None, priority: int = 0) -> TaskJob:
+        job = TaskJob(uuid.uuid4().hex[:12], entry, pipeline_override, priority)
+        with self._cond:
+            self._ensure_worker()
+            self._jobs[job.job_id] = job
+            heapq.heappush(self._queue, (-priority, next(self._seq), job.job_id))
+            self._cond.notify()
+        self._notify(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[TaskJob]:
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self, status: Optional[str] = None) -> List[TaskJob]:
+        with self._cond:
+            jobs = list(self._jobs.values())
+        if status:
+            jobs = [j for j in jobs if j.status == status]
+        return jobs
+
+    @property
+    def current(self) -> Optional[TaskJob]:
+        return self._current
+
+    def queued_count(self) -> int:
+        with self._cond:
+            return len(self._queue)
+
+    def job_id_for_task(self, task_id: Optional[int]) -> Optional[str]:
+        """根据 MaaFramework task_id 反查作业 id；映射尚未建立时归属当前运行的作业"""
+        with self._cond:
+            if task_id is not None and task_id in self._task_to_job:
+                return self._task_to_job[task_id]
+            return self._current.job_id if self._current else None
+
+    # ---------------------------
+    # 取消
+    # ---------------------------
+    def cancel(self, job_id: str) -> bool:
+        """取消指定作业：排队中的直接移出队列，运行中的向 Tasker 发送停止请求"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.done:
+                return False
+            job.cancel_requested = True
+            if job.status == JOB_QUEUED:
+                self._queue = [item for item in self._queue if item[2] != job_id]
+                heapq.heapify(self._queue)
+                self._finish(job, JOB_CANCELLED)
+                running = False
+            else:
+                running = True
+
+        if running:
+            self._runner.stop_task()
+        else:
+            self._notify(job)
+        return True
+
+    def cancel_all(self) -> int:
+        """取消全部排队与运行中的作业，返回被取消的数量"""
+        with self._cond:
+            pending = [self._jobs[item[2]] for item in self._queue if item[2] in self._jobs]
+            self._queue = []
+            for job in pending:
+                job.cancel_requested = True
+                self._finish(job, JOB_CANCELLED)
+            current = self._current
+            if current is not None:
+                current.cancel_requested = True
+
+        for job in pending:
+            self._notify(job)
+        if current is not None:
+            self._runner.stop_task()
+        return len(pending) + (1 if current is not None else 0)
+
+    def shutdown(self):
+        """取消全部作业并让工作线程退出（会话关闭时调用）"""
+        self.cancel_all()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    # ---------------------------
+    # 工作线程
+    # ---------------------------
+    def _ensure_worker(self):
+        if self._closed:
+            raise RuntimeError("Job manager is shut down")
+        if self._worker is not None and self._worker.is_alive():
+            return
+        self._worker = threading.Thread(target=self._worker_loop, name="maa-task-jobs", daemon=True)
+        self._worker.start()
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                _, _, job_id = heapq.heappop(self._queue)
+                job = self._jobs.get(job_id)
+                if job is None or job.done:
+                    continue
+                job.status = JOB_RUNNING
+                job.started_at = time.time()
+                self._current = job
+            self._notify(job)
+
+            try:
+                self._run(job)
+            except Exception as exc:
+                with self._cond:
+                    job.error = str(exc)
+                    self._finish(job, JOB_FAILED)
+            finally:
+                with self._cond:
+                    self._current = None
+                    self._prune_history()
+                self._notify(job)
+
+    def _run(self, job: TaskJob):
+        if job.cancel_requested:
+            with self._cond:
+                self._finish(job, JOB_CANCELLED)
+            return
+
+        maa_job, error = self._runner.run_task(job.entry, job.pipeline_override)
+        if maa_job is None:
+            with self._cond:
+                job.error = error or "Failed to post task"
+                self._finish(job, JOB_FAILED)
+            return
+
+        with self._cond:
+            job.task_id = maa_job.job_id
+            self._task_to_job[job.task_id] = job.job_id
+            # 取消请求可能在 post_task 返回前到达，此时补发一次停止
+            stop_needed = job.cancel_requested
+        if stop_needed:
+            self._runner.stop_task()
+        self._notify(job)
+
+        maa_job.wait()
+        result = self._runner.get_task_result(job.task_id)
+        with self._cond:
+            job.result = result
+            if job.cancel_requested:
+                self._finish(job, JOB_CANCELLED)
+            else:
+                self._finish(job, JOB_SUCCEEDED if maa_job.succeeded else JOB_FAILED)
+
+    def _finish(self, job: TaskJob, status: str):
+        job.status = status
+        job.finished_at = time.time()
+
+    def _prune_history(self):
+        """只保留最近 history_limit 个已结束作业"""
+        finished = [j for j in self._jobs.values() if j.done]
+        overflow = len(finished) - self._history_limit
+        if overflow <= 0:
+            return
+        finished.sort(key=lambda j: j.finished_at or 0)
+        for job in finished[:overflow]:
+            self._jobs.pop(job.job_id, None)
+            if job.task_id is not None:
+                self._task_to_job.pop(job.task_id, None)
+
+    def _notify(self, job: TaskJob):
+        if not self._publish:
+            return
+        self._publish({
+            "type": "job",
+            "job_id": job.job_id,
+            "job": job.to_dict(),
+            "timestamp": int(time.time() * 1000),
+        })
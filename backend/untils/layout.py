@@ -0,0 +1,369 @@
+"""
+服务端分层布局
+
+与前端 useLayout.ts 使用相同的间距预设与节点尺寸补偿，方向自上而下（TB）：
+    1. 沿 next / interrupt / on_error / timeout_next 建图，指向文件外的目标作为占位节点参与布局；
+    2. DFS 反转回边去环，按最长路径分层；
+    3. 重心法上下交替扫描确定层内顺序；
+    4. 逐层累加高度，层内按上层父节点的重心放置横坐标。
+
+结果按 (文件, 版本, 选项) 缓存；版本变化但连线与节点尺寸不变（拓扑哈希相同）时直接复用。
+拓扑变化时以该文件上次布局的横坐标作为层内初始顺序，少量改动通常一两轮扫描即可收敛，
+布局也不会整体跳动。
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from backend.untils import edge_targets
+
+SPACING_OPTIONS = {
+    "compact": {"ranksep": 80, "nodesep": 120},
+    "normal": {"ranksep": 120, "nodesep": 180},
+    "loose": {"ranksep": 300, "nodesep": 300},
+}
+
+NODE_SIZE_PADDING = {
+    "fallback_width": 280,
+    "fallback_height": 150,
+    "extra_width": 20,
+    "extra_height": 20,
+}
+
+# 与前端连线端口顺序一致：next 在左，on_error / timeout_next 在右
+LAYOUT_EDGE_FIELDS = ("next", "interrupt", "on_error", "timeout_next")
+CHAIN_EDGE_FIELDS = ("next", "on_error")
+
+ORDER_SWEEPS = 8
+CACHE_SIZE = 64
+
+Sizes = Dict[str, Any]
+Positions = Dict[str, Dict[str, float]]
+
+
+def resolve_spacing(spacing: Union[str, Dict[str, Any], None] = None) -> Dict[str, float]:
+    """预设名或 {ranksep, nodesep}，未知预设回退到 normal"""
+    base = SPACING_OPTIONS["normal"]
+    if isinstance(spacing, dict):
+        return {
+            "ranksep": float(spacing.get("ranksep", base["ranksep"])),
+            "nodesep": float(spacing.get("nodesep", base["nodesep"])),
+        }
+    preset = SPACING_OPTIONS.get(spacing or "normal", base)
+    return {"ranksep": float(preset["ranksep"]), "nodesep": float(preset["nodesep"])}
+
+
+def node_size(node_id: str, sizes: Optional[Sizes] = None) -> Tuple[float, float]:
+    """前端实测尺寸（[w, h] 或 {width, height}）加上留白，缺失时使用默认尺寸"""
+    width, height = NODE_SIZE_PADDING["fallback_width"], NODE_SIZE_PADDING["fallback_height"]
+    size = (sizes or {}).get(node_id)
+    if isinstance(size, (list, tuple)) and len(size) == 2:
+        width, height = size
+    elif isinstance(size, dict):
+        width, height = size.get("width", width), size.get("height", height)
+    return float(width) + NODE_SIZE_PADDING["extra_width"], float(height) + NODE_SIZE_PADDING["extra_height"]
+
+
+def graph_edges(nodes: Dict[str, Any], fields=LAYOUT_EDGE_FIELDS) -> Tuple[List[str], List[Tuple[str, str]]]:
+    """返回 (节点 id 列表, 去重后的连线)；文件外的目标追加在节点列表末尾"""
+    ids = list(nodes)
+    known = set(ids)
+    edges, seen = [], set()
+    for node_id, data in nodes.items():
+        if not isinstance(data, dict):
+            continue
+        for field in fields:
+            for target in edge_targets(data.get(field)):
+                if target == node_id or (node_id, target) in seen:
+                    continue
+                seen.add((node_id, target))
+                edges.append((node_id, target))
+                if target not in known:
+                    known.add(target)
+                    ids.append(target)
+    return ids, edges
+
+
+def topology_hash(ids: List[str], edges: List[Tuple[str, str]], sizes: Optional[Sizes] = None) -> str:
+    digest = hashlib.sha1()
+    for node_id in ids:
+        digest.update(node_id.encode("utf-8"))
+        digest.update(b"\0")
+    digest.update(b"\1")
+    for source, target in edges:
+        digest.update(f"{source}\0{target}\0".encode("utf-8"))
+    digest.update(json.dumps(sizes or {}, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+# ---------------------------
+# 分层布局
+# ---------------------------
+def _acyclic(ids: List[str], edges: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """迭代 DFS（从无入边的节点开始），把回边反向"""
+    out: Dict[str, List[str]] = {node_id: [] for node_id in ids}
+    has_incoming = set()
+    for source, target in edges:
+        out[source].append(target)
+        has_incoming.add(target)
+
+    state: Dict[str, int] = {}
+    back = set()
+    starts = [n for n in ids if n not in has_incoming] + [n for n in ids if n in has_incoming]
+    for start in starts:
+        if start in state:
+            continue
+        state[start] = 1
+        stack = [(start, iter(out[start]))]
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if child not in state:
+                    state[child] = 1
+                    stack.append((child, iter(out[child])))
+                    break
+                if state[child] == 1:
+                    back.add((node, child))
+            else:
+                state[node] = 2
+                stack.pop()
+
+    result, seen = [], set()
+    for source, target in edges:
+        edge = (target, source) if (source, target) in back else (source, target)
+        if edge not in seen:
+            seen.add(edge)
+            result.append(edge)
+    return result
+
+
+def _ranks(ids: List[str], edges: List[Tuple[str, str]]) -> Dict[str, int]:
+    """最长路径分层（edges 必须无环）"""
+    out: Dict[str, List[str]] = {node_id: [] for node_id in ids}
+    indegree = {node_id: 0 for node_id in ids}
+    for source, target in edges:
+        out[source].append(target)
+        indegree[target] += 1
+    rank = {node_id: 0 for node_id in ids}
+    queue = deque(n for n in ids if indegree[n] == 0)
+    while queue:
+        node = queue.popleft()
+        for target in out[node]:
+            rank[target] = max(rank[target], rank[node] + 1)
+            indegree[target] -= 1
+            if indegree[target] == 0:
+                queue.append(target)
+    return rank
+
+
+def _order_layers(layers: List[List[str]], preds: Dict[str, List[str]], succs: Dict[str, List[str]]) -> int:
+    """重心法排序层内节点，原地修改 layers，返回实际扫描轮数"""
+    pos: Dict[str, float] = {}
+
+    def index(layer: List[str]):
+        offset = (len(layer) - 1) / 2
+        for i, node_id in enumerate(layer):
+            pos[node_id] = i - offset
+
+    for layer in layers:
+        index(layer)
+
+    sweeps = 0
+    unchanged = 0
+    for sweep in range(ORDER_SWEEPS):
+        sweeps += 1
+        downward = sweep % 2 == 0
+        neighbours = preds if downward else succs
+        ranks = range(1, len(layers)) if downward else range(len(layers) - 2, -1, -1)
+        changed = False
+        for r in ranks:
+            layer = layers[r]
+
+            def barycenter(node_id: str) -> float:
+                linked = [pos[n] for n in neighbours[node_id]]
+                return sum(linked) / len(linked) if linked else pos[node_id]
+
+            ordered = sorted(layer, key=barycenter)
+            if ordered != layer:
+                changed = True
+                layers[r] = layer = ordered
+                index(layer)
+        # 上下各一轮都没有变化即已收敛
+        unchanged = 0 if changed else unchanged + 1
+        if unchanged >= 2:
+            break
+    return sweeps
+
+
+def layered_layout(ids: List[str], edges: List[Tuple[str, str]], spacing: Dict[str, float],
+                   sizes: Optional[Sizes] = None, seed: Optional[Positions] = None) -> Tuple[Positions, int]:
+    """
+    计算节点左上角坐标
+
+    Args:
+        seed: 上一次的布局结果，用于确定层内初始顺序；新节点排在已有节点之后
+
+    Returns:
+        (positions, 排序扫描轮数)
+    """
+    if not ids:
+        return {}, 0
+    dag = _acyclic(ids, edges)
+    rank = _ranks(ids, dag)
+    preds: Dict[str, List[str]] = {node_id: [] for node_id in ids}
+    succs: Dict[str, List[str]] = {node_id: [] for node_id in ids}
+    for source, target in dag:
+        preds[target].append(source)
+        succs[source].append(target)
+
+    layers: List[List[str]] = [[] for _ in range(max(rank.values()) + 1)]
+    for node_id in ids:
+        layers[rank[node_id]].append(node_id)
+    if seed:
+        order = {node_id: i for i, node_id in enumerate(ids)}
+        for layer in layers:
+            layer.sort(key=lambda n: (n not in seed, seed[n]["x"] if n in seed else order[n]))
+    sweeps = _order_layers(layers, preds, succs)
+
+    size = {node_id: node_size(node_id, sizes) for node_id in ids}
+    centers: Dict[str, float] = {}
+    positions: Positions = {}
+    top = 0.0
+    for layer in layers:
+        height = max(size[n][1] for n in layer)
+        cursor = None
+        for node_id in layer:
+            width, node_height = size[node_id]
+            parents = [centers[p] for p in preds[node_id] if p in centers]
+            center = sum(parents) / len(parents) if parents else None
+            lowest = cursor + width / 2 if cursor is not None else None
+            if center is None:
+                center = lowest if lowest is not None else width / 2
+            elif lowest is not None and center < lowest:
+                center = lowest
+            centers[node_id] = center
+            cursor = center + width / 2 + spacing["nodesep"]
+            positions[node_id] = {
+                "x": round(center - width / 2, 1),
+                "y": round(top + (height - node_height) / 2, 1),
+            }
+        top += height + spacing["ranksep"]
+    return positions, sweeps
+
+
+def chain_layout(nodes: Dict[str, Any], root: str, spacing: Dict[str, float],
+                 sizes: Optional[Sizes] = None) -> Optional[Dict[str, Any]]:
+    """
+    与前端 computeOrderedChainLayout 相同：从 root 沿 next、on_error 逐层展开并等距排列，
+    其余节点分层布局后放在链的右侧
+    """
+    if root not in nodes:
+        return None
+    visited = {root}
+    levels = []
+    level = [root]
+    while level:
+        levels.append(level)
+        next_level = []
+        for node_id in level:
+            data = nodes.get(node_id)
+            if not isinstance(data, dict):
+                continue
+            for field in CHAIN_EDGE_FIELDS:
+                for child in edge_targets(data.get(field)):
+                    if child not in visited and child in nodes:
+                        visited.add(child)
+                        next_level.append(child)
+        level = next_level
+
+    positions: Positions = {}
+    for depth, level in enumerate(levels):
+        start = -(len(level) - 1) * spacing["nodesep"] / 2
+        for i, node_id in enumerate(level):
+            positions[node_id] = {"x": start + i * spacing["nodesep"], "y": depth * spacing["ranksep"]}
+
+    chain = [node_id for level in levels for node_id in level]
+    ids, edges = graph_edges({k: v for k, v in nodes.items() if k not in visited})
+    ids = [node_id for node_id in ids if node_id not in visited]
+    edges = [(s, t) for s, t in edges if t not in visited]
+    rest, _ = layered_layout(ids, edges, spacing, sizes)
+    offset = max(p["x"] for p in positions.values()) + spacing["nodesep"] * 2
+    for node_id, p in rest.items():
+        positions[node_id] = {"x": p["x"] + offset, "y": p["y"]}
+    return {"positions": positions, "chain": chain}
+
+
+# ---------------------------
+# 缓存
+# ---------------------------
+class LayoutCache:
+    """按 (文件, 版本, 选项) 与 (文件, 拓扑哈希, 选项) 两级缓存布局结果（LRU）"""
+
+    def __init__(self, size: int = CACHE_SIZE):
+        self.size = size
+        self._entries: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self._last: Dict[Tuple[str, str], Positions] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _put(self, keys: List[Tuple], entry: Dict[str, Any]):
+        with self._lock:
+            for key in keys:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def layout(self, resource_path: str, filename: str, version: Optional[str], nodes: Dict[str, Any],
+               spacing: Union[str, Dict[str, Any], None] = None, root: Optional[str] = None,
+               sizes: Optional[Sizes] = None) -> Optional[Dict[str, Any]]:
+        """
+        计算（或复用）文件的布局
+
+        Returns:
+            {"positions": {id: {x, y}}, "chain": [...](仅 root 模式), "cached": bool,
+             "sweeps": 排序扫描轮数, "elapsed_ms": 耗时}；root 不在文件中时返回 None
+        """
+        started = time.perf_counter()
+        spacing = resolve_spacing(spacing)
+        options = json.dumps({"spacing": spacing, "root": root, "sizes": sizes or {}}, sort_keys=True)
+        file_key = (resource_path, filename)
+        version_key = ("version", file_key, version, options)
+
+        entry = self._get(version_key) if version else None
+        topo_key = None
+        if entry is None:
+            ids, edges = graph_edges(nodes)
+            topo_key = ("topology", file_key, topology_hash(ids, edges, sizes), options)
+            entry = self._get(topo_key)
+            if entry is not None and version:
+                self._put([version_key], entry)
+        if entry is not None:
+            return {**entry, "cached": True, "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+        if root:
+            result = chain_layout(nodes, root, spacing, sizes)
+            if result is None:
+                return None
+            result["sweeps"] = 0
+        else:
+            positions, sweeps = layered_layout(ids, edges, spacing, sizes, seed=self._last.get(file_key))
+            result = {"positions": positions, "sweeps": sweeps}
+            with self._lock:
+                self._last[file_key] = positions
+
+        keys = [topo_key] + ([version_key] if version else [])
+        self._put(keys, result)
+        return {**result, "cached": False, "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+
+layout_cache = LayoutCache()
@@ -1,73 +1,208 @@
+import hashlib
+import os
 import re
 import time
 from pathlib import Path
-from queue import Empty, Queue
 from threading import Lock
-from typing import Callable, List, Optional, Tuple, Union
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
 from PIL import Image
 from maa.agent_client import AgentClient
 from maa.context import ContextEventSink
-from maa.controller import AdbController, Win32Controller
+from maa.controller import AdbController, Controller, Win32Controller
 from maa.define import MaaWin32ScreencapMethodEnum
 from maa.event_sink import NotificationType
 from maa.resource import Resource
+from maa.job import JobWithResult
 from maa.tasker import Tasker, RecognitionDetail, TaskerEventSink
 from maa.toolkit import Toolkit, AdbDevice, DesktopWindow
 from numpy import ndarray
 
+from backend.common.events import DebugStreamBroker, debug_broker, stream_event_matches
+from backend.common.metrics import registry, screencap_capture, screencap_convert
+from backend.common.utils import DEFAULT_SESSION_ID, norm_path
+from backend.untils import get_resources_manager
+from backend.untils.jobs import TaskJobManager
 
-class DebugStreamBroker:
-    """简易的 SSE 事件分发器"""
+
+_framework_lock = Lock()
+_framework_inited = False
+
+
+def init_framework():
+    """MaaFramework 全局选项只需初始化一次，与会话数量无关"""
+    global _framework_inited
+    with _framework_lock:
+        if _framework_inited:
+            return
+        Toolkit.init_option("./")
+        Tasker.set_debug_mode(True)
+        _framework_inited = True
+
+
+def fingerprint_bundle(path: Union[str, Path], content_hash: bool = False) -> str:
+    """
+    计算资源包目录的指纹
+
+    默认只遍历目录树的相对路径、mtime 与大小，代价很低；
+    content_hash=True 时额外读取文件内容参与哈希，可识别保持 mtime 的改动。
+    """
+    digest = hashlib.sha1()
+    root = str(path)
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for fname in sorted(filenames):
+            full_path = os.path.join(dirpath, fname)
+            try:
+                st = os.stat(full_path)
+            except OSError:
+                continue
+            rel = os.path.relpath(full_path, root).replace(os.sep, "/")
+            digest.update(f"{rel}\0{st.st_mtime_ns}\0{st.st_size}\n".encode("utf-8"))
+            if content_hash:
+                with open(full_path, "rb") as f:
+                    for chunk in iter(lambda: f.read(1 << 20), b""):
+                        digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SharedResource:
+    """资源池中的一项：同一组路径对应一个 Resource，由多个会话共享"""
+
+    def __init__(self, key: Tuple[str, ...]):
+        self.key = key
+        self.resource = Resource()
+        self.lock = Lock()
+        self.refs = 0
+        # 与 key 一一对应：每个 bundle 上次成功加载时的指纹，None 表示未加载
+        self.fingerprints: List[Optional[str]] = [None] * len(key)
+        # 加载失败后 Resource 中可能残留部分投递的节点，下次加载需先清空
+        self.dirty = False
+
+
+class ResourcePool:
+    """按路径列表共享 Resource，避免多个会话重复加载同一组 bundle"""
 
     def __init__(self):
-        self._clients: List[Queue] = []
+        self._entries: Dict[Tuple[str, ...], SharedResource] = {}
         self._lock = Lock()
 
-    def register(self) -> Queue:
-        q = Queue()
-        with self._lock:
-            self._clients.append(q)
-        return q
+    @staticmethod
+    def key_for(paths: List[Union[str, Path]]) -> Tuple[str, ...]:
+        return tuple(norm_path(str(p)) for p in paths if p)
 
-    def unregister(self, q: Queue):
+    def acquire(self, key: Tuple[str, ...]) -> SharedResource:
         with self._lock:
-            if q in self._clients:
-                self._clients.remove(q)
-
-    def publish(self, payload: dict):
-        if not payload:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = SharedResource(key)
+                self._entries[key] = entry
+            entry.refs += 1
+            return entry
+
+    def release(self, entry: Optional[SharedResource]):
+        if entry is None:
             return
         with self._lock:
-            for q in list(self._clients):
-                try:
-                    q.put_nowait(payload)
-                except Exception:
-                    # 忽略单个客户端队列的异常，避免阻塞其他客户端
-                    pass
+            entry.refs -= 1
+            if entry.refs <= 0 and self._entries.get(entry.key) is entry:
+                del self._entries[entry.key]
+
+    def fork(self, entry: SharedResource) -> SharedResource:
+        """
+        entry 还被其他会话引用时，为调用方换上同一路径组的新 Resource，并返回新的项（已持有其 lock）
+
+        原来的 Resource 留给其他会话继续运行，直到它们重新加载或关闭；此后按路径获取的都是新的项。
+        调用方必须持有 entry.lock，换用新的项后再 release 原来的项；entry 只被调用方引用时原样返回。
+        """
+        with self._lock:
+            if entry.refs <= 1:
+                return entry
+            fresh = SharedResource(entry.key)
+            fresh.lock.acquire()
+            fresh.refs = 1
+            self._entries[entry.key] = fresh
+            return fresh
+
+    def entries(self) -> List[SharedResource]:
+        with self._lock:
+            return list(self._entries.values())
+
+    def is_loaded(self, resource_path: str) -> bool:
+        """是否有已加载的 Resource 包含该资源包"""
+        resource_path = norm_path(resource_path)
+        return any(resource_path in entry.key and entry.resource.loaded for entry in self.entries())
+
+    def hot_update(self, resource_path: str, nodes: Dict[str, dict]) -> int:
+        """
+        把保存后变化的节点作为 pipeline override 推入所有包含该路径的已加载 Resource，
+        避免重新 post_bundle 整个资源包。被后续 bundle 同名节点覆盖的节点会跳过，
+        以保持与加载顺序一致的生效结果。
+
+        Returns:
+            成功更新的 Resource 数量
+        """
+        resource_path = norm_path(resource_path)
+        if not nodes:
+            return 0
+
+        updated = 0
+        shadow_cache: Dict[Tuple[str, ...], set] = {}
+        for entry in self.entries():
+            if resource_path not in entry.key or not entry.resource.loaded:
+                continue
+            later = entry.key[entry.key.index(resource_path) + 1:]
+            shadowed = set()
+            if later:
+                if later not in shadow_cache:
+                    shadow_cache[later] = get_resources_manager(list(later)).node_ids()
+                shadowed = shadow_cache[later]
+            override = {node_id: data for node_id, data in nodes.items() if node_id not in shadowed}
+            if not override:
+                continue
+            with entry.lock:
+                if entry.resource.override_pipeline(override):
+                    updated += 1
+        return updated
 
 
-debug_broker = DebugStreamBroker()
+resource_pool = ResourcePool()
 
 
 class MaaFW:
     resource: Optional[Resource]
-    controller: Union[AdbController, Win32Controller, None]
+    controller: Optional[Controller]
     tasker: Optional[Tasker]
     agent: Optional[AgentClient]
-    context_sink=False
-    tasker_sink=False
 
-    def __init__(self):
+    def __init__(self, session_id: str = DEFAULT_SESSION_ID, broker: DebugStreamBroker = debug_broker,
+                 pool: ResourcePool = resource_pool):
+        init_framework()
+        self.session_id = session_id
+        self.broker = broker
+        self.pool = pool
         self.im = None
-        Toolkit.init_option("./")
-        Tasker.set_debug_mode(True)
+        # 同一会话的截图串行执行；并发的单张截图与多设备截图不会互相覆盖 self.im
+        self._screencap_lock = Lock()
 
         self.resource = None
+        self.resource_entry: Optional[SharedResource] = None
+        self.load_report: List[dict] = []
         self.controller = None
+        self.device: Optional[dict] = None
         self.tasker = None
         self.agent = None
         self.notification_handler = None
+        self.context_sink = False
+        self.tasker_sink = False
+        self.jobs = TaskJobManager(self, self.publish)
+
+    def publish(self, payload: dict):
+        """向 SSE 推送事件，附带会话 id 以便前端区分设备"""
+        if not payload:
+            return
+        payload.setdefault("session_id", self.session_id)
+        self.broker.publish(payload)
 
     @staticmethod
     def detect_adb() -> List[AdbDevice]:
@@ -88,11 +223,9 @@ class MaaFW:
     def connect_adb(
             self, path: Path, address: str, config: dict
     ) -> Tuple[bool, Optional[str]]:
-        self.controller = AdbController(path, address, config=config)
-        connected = self.controller.post_connection().wait().succeeded
-        if not connected:
+        controller = AdbController(path, address, config=config)
+        if not self.connect_controller(controller, {"type": "adb", "adb_path": str(path), "address": address}):
             return (False, f"Failed to connect {path} {address}")
-
         return True, None
 
 
@@ -102,34 +235,112 @@ class MaaFW:
         if isinstance(hwnd, str):
             hwnd = int(hwnd, 16)
 
-        self.controller = Win32Controller(
+        controller = Win32Controller(
             hwnd, screencap_method=screencap_method, mouse_method=mouse_method,keyboard_method=keyboard_method
         )
-        connected = self.controller.post_connection().wait().succeeded
-        if not connected:
+        if not self.connect_controller(controller, {"type": "win32", "hwnd": hex(hwnd)}):
             return (False, f"Failed to connect {hex(hwnd)}")
-
         return True, None
 
-    def load_resource(self, dir: List[Path]) -> Tuple[bool, Optional[str]]:
-        if not self.resource:
-            self.resource = Resource()
+    def connect_controller(self, controller: Controller, device: dict) -> bool:
+        """连接任意控制器（包括自定义控制器）并设为当前会话的设备"""
+        self.controller = controller
+        if not controller.post_connection().wait().succeeded:
+            return False
+        self.device = device
+        return True
+
+    def _bind_resource(self, entry: SharedResource):
+        """切换到资源池中的 entry 并释放之前持有的；调用方持有 entry.lock"""
+        previous = self.resource_entry
+        self.resource_entry = entry
+        self.resource = entry.resource
+        if self.agent:
+            self.agent.bind(self.resource)
+        self.pool.release(previous)
+
+    def _use_resource(self, key: Tuple[str, ...]) -> SharedResource:
+        """切换到资源池中指定路径组对应的 Resource"""
+        entry = self.pool.acquire(key)
+        with entry.lock:
+            self._bind_resource(entry)
+        return entry
+
+    def load_resource(
+            self, dir: List[Path], force: bool = False, content_hash: bool = False
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        加载资源包，结果明细写入 self.load_report
+
+        已加载且指纹未变的前缀 bundle 直接跳过，只追加投递之后尚未加载的 bundle；
+        所有 post_bundle 先全部投递再依次等待。
+        重新投递的节点会逐字段合并到已有定义上，删掉的节点和字段不会消失，因此已加载的
+        bundle 有变化（或上次加载失败）时清空 Resource 后全部重新加载，force=True 同理。
+        Resource 还被其他会话共享时不清空它（对方的任务可能正在运行），而是换用一个新的 Resource。
+        """
         dir = [Path(p) for p in dir]
         for d in dir:
             if not d.exists():
                 return (False, f"{d} does not exist.")
 
-            status = self.resource.post_bundle(d).wait().succeeded
-            if not status:
-                return (
-                    False,
-                    "Fail to load resource,please check the outputs of CLI.",
-                )
+        entry = self.pool.acquire(ResourcePool.key_for(dir))
+        entry.lock.acquire()
+        report = []
+        self.load_report = report
+        try:
+            self._bind_resource(entry)
+            fingerprints = [fingerprint_bundle(d, content_hash) for d in dir]
+            start = 0
+            while start < len(dir) and entry.fingerprints[start] == fingerprints[start]:
+                start += 1
+            changed = any(fp is not None for fp in entry.fingerprints[start:])
+            if force or changed or entry.dirty:
+                fresh = self.pool.fork(entry)
+                if fresh is not entry:
+                    entry.lock.release()
+                    entry = fresh
+                    self._bind_resource(entry)
+                entry.resource.clear()
+                entry.fingerprints = [None] * len(dir)
+                entry.dirty = False
+                start = 0
+            for i in range(start):
+                report.append({"path": str(dir[i]), "status": "skipped", "load_ms": 0,
+                               "fingerprint": fingerprints[i]})
+
+            started = time.perf_counter()
+            jobs = [(i, entry.resource.post_bundle(dir[i])) for i in range(start, len(dir))]
+            last_done = started
+            failed = False
+            for i, job in jobs:
+                succeeded = job.wait().succeeded
+                done = time.perf_counter()
+                report.append({
+                    "path": str(dir[i]),
+                    "status": "loaded" if succeeded else "failed",
+                    "load_ms": round((done - last_done) * 1000, 1),
+                    "fingerprint": fingerprints[i],
+                })
+                last_done = done
+                if succeeded and not failed:
+                    entry.fingerprints[i] = fingerprints[i]
+                else:
+                    failed = True
+                    entry.fingerprints[i] = None
+            entry.dirty = failed
+        finally:
+            entry.lock.release()
+
+        if failed:
+            return (
+                False,
+                "Fail to load resource,please check the outputs of CLI.",
+            )
         return True, None
 
     def create_agent(self, identifier: str) -> str:
         if not self.resource:
-            self.resource = Resource()
+            self._use_resource(())
 
         self.agent = AgentClient(identifier)
         self.agent.bind(self.resource)
@@ -150,45 +361,39 @@ class MaaFW:
             self.tasker.controller=None
         return True
 
-    def run_task(
-            self, entry: str, pipeline_override: dict = {}
-    ):
-
+    def _prepare_tasker(self) -> Optional[str]:
+        """绑定资源与控制器并挂载事件回调，失败时返回错误信息"""
         if not self.tasker:
             self.tasker = Tasker()
 
         if not self.resource or not self.controller:
-            return (False, "Resource or Controller not initialized")
+            return "Resource or Controller not initialized"
 
         self.tasker.bind(self.resource, self.controller)
         if not self.tasker.inited:
-            return (False, "Failed to init MaaFramework tasker")
+            return "Failed to init MaaFramework tasker"
         if not self.context_sink:
-            self.tasker.add_context_sink(MyNotificationHandler(debug_broker))
+            self.tasker.add_context_sink(MyNotificationHandler(self.publish, self.jobs.job_id_for_task))
             self.context_sink=True
         if not self.tasker_sink:
-            self.tasker.add_sink(NotificationHandler(debug_broker))
+            self.tasker.add_sink(NotificationHandler(self.publish))
             self.tasker_sink=True
-        self.tasker.post_task(entry, pipeline_override)
-
         return None
-    def run_re(self):
 
-        if not self.tasker:
-            self.tasker = Tasker()
+    def run_task(
+            self, entry: str, pipeline_override: dict = {}
+    ) -> Tuple[Optional[JobWithResult], Optional[str]]:
+        """直接投递任务并返回 MaaFramework 作业句柄；调试入口应通过 self.jobs 排队提交"""
+        error = self._prepare_tasker()
+        if error:
+            return None, error
 
-        if not self.resource or not self.controller:
-            return (False, "Resource or Controller not initialized")
+        return self.tasker.post_task(entry, pipeline_override), None
 
-        self.tasker.bind(self.resource, self.controller)
-        if not self.tasker.inited:
-            return (False, "Failed to init MaaFramework tasker")
-        if not self.context_sink:
-            self.tasker.add_context_sink(MyNotificationHandler(debug_broker))
-            self.context_sink=True
-        if not self.tasker_sink:
-            self.tasker.add_sink(NotificationHandler(debug_broker))
-            self.tasker_sink=True
+    def run_re(self):
+        error = self._prepare_tasker()
+        if error:
+            return (False, error)
 
         return self.tasker
 
@@ -198,16 +403,52 @@ class MaaFW:
 
         self.tasker.post_stop().wait()
 
-    def screencap(self, capture: bool = True) -> Optional[Image.Image]:
+    def get_task_result(self, task_id: Optional[int]) -> Optional[dict]:
+        """汇总任务详情（入口、状态、经过的节点），供作业结果展示"""
+        if not self.tasker or task_id is None:
+            return None
+        detail = self.tasker.get_task_detail(task_id)
+        if not detail:
+            return None
+
+        nodes = []
+        for node in detail.nodes or []:
+            if node is None:
+                continue
+            reco = getattr(node, "recognition", None)
+            nodes.append({
+                "node_id": node.node_id,
+                "name": node.name,
+                "completed": node.completed,
+                "reco_id": getattr(reco, "reco_id", None),
+                "hit": bool(getattr(reco, "hit", False)),
+            })
+        return {
+            "task_id": detail.task_id,
+            "entry": detail.entry,
+            "status": "succeeded" if detail.status.succeeded else "failed" if detail.status.failed else "running",
+            "nodes": nodes,
+        }
+
+    def capture_raw(self, capture: bool = True):
+        """截图并返回原始图像（capture=False 时返回上一次的截图），同时记录到 self.im"""
         if not self.controller:
             return None
+        if not capture:
+            return self.im
+        with self._screencap_lock:
+            with screencap_capture.time():
+                im = self.controller.post_screencap().wait().get()
+            self.im = im
+        return im
 
-        if capture:
-            self.im=self.controller.post_screencap().wait().get()
-        # self.im = self.controller.cached_image
-        if self.im is None:
+    def screencap(self, capture: bool = True) -> Optional[Image.Image]:
+        # 转换本次拿到的图像，而不是之后可能被其他请求替换掉的 self.im
+        im = self.capture_raw(capture)
+        if im is None:
             return None
-        return cvmat_to_image(self.im)
+        with screencap_convert.time():
+            return cvmat_to_image(im)
 
     def click(self, x, y) -> bool:
         if not self.controller:
@@ -239,17 +480,88 @@ class MaaFW:
 
         return self.tasker.clear_cache()
 
+    def close(self):
+        """停止该会话的全部作业并释放控制器与共享资源的引用"""
+        self.jobs.shutdown()
+        self.pool.release(self.resource_entry)
+        self.resource_entry = None
+        self.resource = None
+        self.controller = None
+        self.device = None
+        self.tasker = None
+
+    def describe(self) -> dict:
+        current = self.jobs.current
+        return {
+            "session_id": self.session_id,
+            "device": self.device,
+            "connected": bool(self.controller and self.controller.connected),
+            "resource_paths": list(self.resource_entry.key if self.resource_entry else ()),
+            "running": bool(self.tasker and self.tasker.running),
+            "current_job_id": current.job_id if current else None,
+            "queued": self.jobs.queued_count(),
+        }
+
+
+class SessionRegistry:
+    """
+    多设备会话注册表
+
+    每个会话拥有独立的 controller / tasker / 事件回调与作业队列，
+    因此不同设备上的调试任务在各自的工作线程中并发执行；
+    路径相同的会话通过 ResourcePool 共享同一个已加载的 Resource。
+    """
+
+    def __init__(self):
+        self._sessions: Dict[str, MaaFW] = {}
+        self._lock = Lock()
+
+    def get(self, session_id: str) -> Optional[MaaFW]:
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def get_or_create(self, session_id: str = DEFAULT_SESSION_ID) -> MaaFW:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = MaaFW(session_id)
+                self._sessions[session_id] = session
+            return session
+
+    def list(self) -> List[MaaFW]:
+        with self._lock:
+            return list(self._sessions.values())
+
+    def close(self, session_id: str) -> bool:
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        session.close()
+        return True
+
 
-# 单例实例，供路由直接使用
-maafw = MaaFW()
+session_registry = SessionRegistry()
+registry.register_collector(
+    "maa_sessions", "Open device sessions", lambda: [({}, len(session_registry.list()))]
+)
+registry.register_collector(
+    "maa_jobs_queued",
+    "Queued debug jobs per session",
+    lambda: [({"session_id": s.session_id}, s.jobs.queued_count()) for s in session_registry.list()],
+)
 
 
 class MyNotificationHandler(ContextEventSink):
     """通知处理器类，处理识别事件并透传到 SSE"""
 
-    def __init__(self, broker: DebugStreamBroker) -> None:
+    def __init__(self, publish: Callable[[dict], None], job_lookup: Optional[Callable[[int], Optional[str]]] = None) -> None:
         super().__init__()
-        self.broker = broker
+        self.publish = publish
+        self.job_lookup = job_lookup
+
+    def _job_id(self, task_id: int) -> Optional[str]:
+        return self.job_lookup(task_id) if self.job_lookup else None
 
     @staticmethod
     def _normalize_next_list(next_list):
@@ -276,13 +588,14 @@ class MyNotificationHandler(ContextEventSink):
         payload = {
             "type": "node_next_list",
             "task_id": detail.task_id,
+            "job_id": self._job_id(detail.task_id),
             "name": detail.name,
             "next_list": self._normalize_next_list(detail.next_list),
             "focus": getattr(detail, "focus", None),
             "timestamp": int(time.time() * 1000),
         }
         print(f"开始识别:{detail}")
-        self.broker.publish(payload)
+        self.publish(payload)
 
     def on_node_recognition(
         self,
@@ -300,6 +613,7 @@ class MyNotificationHandler(ContextEventSink):
         payload = {
             "type": "node_recognition",
             "task_id": detail.task_id,
+            "job_id": self._job_id(detail.task_id),
             "reco_id": detail.reco_id,
             "name": detail.name,
             "status": status,
@@ -307,12 +621,12 @@ class MyNotificationHandler(ContextEventSink):
             "timestamp": int(time.time() * 1000),
         }
 
-        self.broker.publish(payload)
+        self.publish(payload)
 
 class NotificationHandler(TaskerEventSink):
-    def __init__(self, broker: DebugStreamBroker) -> None:
+    def __init__(self, publish: Callable[[dict], None]) -> None:
         super().__init__()
-        self.broker = broker
+        self.publish = publish
 
     def on_tasker_task(self, tasker: Tasker, noti_type: NotificationType, detail: TaskerEventSink.TaskerTaskDetail):
         pass
@@ -322,5 +636,3 @@ def cvmat_to_image(cvmat: ndarray) -> Image.Image:
     pil = Image.fromarray(cvmat)
     b, g, r = pil.split()
     return Image.merge("RGB", (r, g, b))
-
-maafw = MaaFW()
\ No newline at end of file
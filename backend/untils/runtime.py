@@ -0,0 +1,84 @@
+"""
+MaaFramework 的延迟加载入口
+
+backend.untils.maafw 会导入 maa（原生库）、numpy 与 PIL，耗时明显。路由与预热只通过这里访问会话和资源池：
+首次真正用到设备 / 调试功能时才导入，或者由 preload_framework() 在服务开始监听后于后台线程中提前导入。
+"""
+import importlib
+import sys
+import threading
+from typing import Optional
+
+from backend.common.startup import startup_report
+
+MAAFW_MODULE = "backend.untils.maafw"
+
+# 按依赖顺序单独计时，启动报告中可以看到导入时间花在哪里
+_HEAVY_IMPORTS = ("numpy", "PIL.Image", "maa.library", "maa.toolkit", "maa.tasker", "maa.controller", MAAFW_MODULE)
+
+_lock = threading.Lock()
+_preload_thread: Optional[threading.Thread] = None
+
+
+def framework_loaded() -> bool:
+    return MAAFW_MODULE in sys.modules
+
+
+def maafw_module():
+    """导入（必要时）并返回 backend.untils.maafw 模块"""
+    module = sys.modules.get(MAAFW_MODULE)
+    if module is not None:
+        return module
+    with _lock:
+        for name in _HEAVY_IMPORTS:
+            if name in sys.modules:
+                continue
+            with startup_report.timed(f"import:{name}"):
+                importlib.import_module(name)
+        return sys.modules[MAAFW_MODULE]
+
+
+def sessions():
+    """会话注册表（首次调用时加载 MaaFramework）"""
+    return maafw_module().session_registry
+
+
+def resource_pool():
+    return maafw_module().resource_pool
+
+
+def loaded_resource_pool():
+    """MaaFramework 尚未加载时返回 None：此时不存在运行中的 Resource，无需热更新"""
+    module = sys.modules.get(MAAFW_MODULE)
+    return module.resource_pool if module is not None else None
+
+
+def find_session(session_id: str):
+    """
+    已存在的会话，不存在时返回 None
+
+    只查询不创建：状态查询等请求带了未知的会话 id 时不会凭空创建会话，
+    MaaFramework 尚未加载时也不会因此触发导入（此时不可能已有会话）。
+    """
+    module = sys.modules.get(MAAFW_MODULE)
+    return module.session_registry.get(session_id) if module is not None else None
+
+
+def preload_framework(background: bool = True) -> None:
+    """导入 MaaFramework 并完成全局初始化；background=True 时在守护线程中进行，只会启动一次"""
+    global _preload_thread
+
+    def _run():
+        module = maafw_module()
+        with startup_report.timed("framework:init_option"):
+            module.init_framework()
+        startup_report.mark("framework_ready")
+
+    if not background:
+        _run()
+        return
+    with _lock:
+        if _preload_thread is not None:
+            return
+        _preload_thread = threading.Thread(target=_run, name="maa-framework-preload", daemon=True)
+    _preload_thread.start()
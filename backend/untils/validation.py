@@ -0,0 +1,331 @@
+"""
+Pipeline 校验
+
+按 MaaFramework 的 pipeline 规则检查每个节点（兼容 v1 平铺写法与 v2 的 {"type", "param"} 写法）：
+    - recognition / action 类型是否合法，类型要求的参数是否缺失；
+    - template 是否能在资源包的 image 目录中找到；
+    - roi / target 等区域字段的格式；
+    - next / on_error / interrupt 等连线与 roi 引用的节点是否有定义；
+    - 常用数值字段的取值范围。
+
+结果按文件缓存，缓存键为文件版本。再次校验时只重新检查：
+    - 版本变化的文件；
+    - 引用了“定义状态发生变化的节点名”的文件（依赖方）；
+    - 图片有增删时，引用了模板图片的文件。
+文件之间互不依赖地并行检查；节点数据就在 ResourcesManager 的缓存里，主要开销是模板文件的 stat，
+用线程池即可，不必把整份数据复制到子进程。
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from backend.untils.graph import EDGE_FIELDS, anchor_names, parse_links
+
+# 与 requirements.txt 固定的 maafw 版本（maa/pipeline.py 的 JRecognitionType / JActionType）保持一致；
+# 这里不直接导入 maa，避免校验时加载 MaaFramework
+RECOGNITION_TYPES = {
+    "DirectHit", "TemplateMatch", "FeatureMatch", "ColorMatch", "OCR",
+    "NeuralNetworkClassify", "NeuralNetworkDetect", "Custom",
+}
+ACTION_TYPES = {
+    "DoNothing", "Click", "LongPress", "Swipe", "MultiSwipe", "TouchDown", "TouchMove", "TouchUp",
+    "ClickKey", "LongPressKey", "KeyDown", "KeyUp", "InputText",
+    "StartApp", "StopApp", "StopTask", "Scroll", "Command", "Custom",
+}
+# 类型要求的参数（缺失为错误），对应 schema 中标注为必选的字段
+REQUIRED_PARAMS = {
+    "TemplateMatch": ("template",),
+    "FeatureMatch": ("template",),
+    "ColorMatch": ("lower", "upper"),
+    "NeuralNetworkClassify": ("model",),
+    "NeuralNetworkDetect": ("model",),
+    "Custom": ("custom_recognition",),
+}
+REQUIRED_ACTION_PARAMS = {
+    "MultiSwipe": ("swipes",),
+    "ClickKey": ("key",),
+    "LongPressKey": ("key",),
+    "InputText": ("input_text",),
+    "StartApp": ("package",),
+    "StopApp": ("package",),
+    "Command": ("exec",),
+    "Custom": ("custom_action",),
+}
+RECT_FIELDS = ("roi", "target", "begin", "end")
+OFFSET_FIELDS = ("roi_offset", "target_offset", "begin_offset", "end_offset")
+MULTI_TARGET_FIELDS = ("end", "end_offset")
+NON_NEGATIVE_FIELDS = ("timeout", "rate_limit", "pre_delay", "post_delay", "pre_wait_freezes", "post_wait_freezes")
+# 以上字段中也可以写成对象的（如 {"time": 500, "target": ...}），只检查其中的数值成员
+OBJECT_FIELDS = {
+    "pre_wait_freezes": ("time", "rate_limit", "timeout"),
+    "post_wait_freezes": ("time", "rate_limit", "timeout"),
+}
+
+ERROR = "error"
+WARNING = "warning"
+
+FileKey = Tuple[str, str]
+
+
+def _type_and_params(data: Dict[str, Any], field: str) -> Tuple[Any, Dict[str, Any]]:
+    """v2 写法的 param 与节点顶层字段合并后返回 (类型, 参数)"""
+    value = data.get(field)
+    if isinstance(value, dict):
+        param = value.get("param") if isinstance(value.get("param"), dict) else {}
+        return value.get("type"), {**data, **param}
+    return value, data
+
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _rect_error(value: Any, allow_point: bool) -> Optional[str]:
+    """区域字段：true / 节点名 / [x, y, w, h]（target 等还允许 [x, y]）"""
+    if value is True or isinstance(value, str):
+        return None
+    sizes = (2, 4) if allow_point else (4,)
+    if not isinstance(value, list) or len(value) not in sizes or not all(_is_int(v) for v in value):
+        expected = "[x, y] / [x, y, w, h]" if allow_point else "[x, y, w, h]"
+        return f"expected node name or {expected}, got {value!r}"
+    if len(value) == 4 and (value[2] < 0 or value[3] < 0):
+        return f"negative width / height in {value!r}"
+    return None
+
+
+def _targets(field: str, value: Any) -> List[Any]:
+    """Swipe 的 end / end_offset 可以是多段滑动的目标列表，其余区域字段只有一个取值"""
+    if field in MULTI_TARGET_FIELDS and isinstance(value, list) and value and not all(_is_int(v) for v in value):
+        return value
+    return [value]
+
+
+class FileResult:
+    __slots__ = ("version", "diagnostics", "defined", "referenced", "uses_images")
+
+    def __init__(self, version: Optional[str], diagnostics: List[Dict[str, Any]], defined: Set[str],
+                 referenced: Set[str], uses_images: bool):
+        self.version = version
+        self.diagnostics = diagnostics
+        self.defined = defined
+        self.referenced = referenced
+        self.uses_images = uses_images
+
+
+class PipelineValidator:
+    """
+    对一个 ResourcesManager（一组资源包）做校验并缓存结果
+
+    Args:
+        manager: ResourcesManager
+        workers: 并行检查的线程数
+    """
+
+    def __init__(self, manager, workers: Optional[int] = None):
+        self.manager = manager
+        self.workers = workers or min(8, (os.cpu_count() or 2))
+        self._lock = threading.Lock()
+        self._results: Dict[FileKey, FileResult] = {}
+        self._image_generation = manager.image_generation
+
+    # ---------------------------
+    # 单文件检查
+    # ---------------------------
+    def _template_exists(self, path: str) -> bool:
+        for resource_path in self.manager.resource_paths:
+            if os.path.exists(self.manager.get_image_path(resource_path, path)):
+                return True
+        return False
+
+    def check_file(self, key: FileKey, nodes: Dict[str, Any], is_defined) -> FileResult:
+        resource_path, filename = key
+        diagnostics: List[Dict[str, Any]] = []
+        referenced: Set[str] = set()
+        defined: Set[str] = set()
+        uses_images = False
+
+        def report(severity: str, code: str, node_id: str, field: Optional[str], message: str):
+            diagnostics.append({
+                "severity": severity,
+                "code": code,
+                "node": node_id,
+                "field": field,
+                "message": message,
+                "resource_path": resource_path,
+                "filename": filename,
+            })
+
+        def check_reference(node_id: str, field: str, name: str, anchor: bool = False, severity: str = ERROR):
+            referenced.add(name)
+            if not is_defined(name, anchor):
+                kind = "anchor" if anchor else "node"
+                report(severity, "undefined_target", node_id, field, f"{field} -> undefined {kind} '{name}'")
+
+        for node_id, data in nodes.items():
+            node_id = str(node_id)
+            defined.add(node_id)
+            if not isinstance(data, dict):
+                report(ERROR, "invalid_node", node_id, None, f"node must be an object, got {type(data).__name__}")
+                continue
+            defined.update(anchor_names(node_id, data))
+
+            reco_type, reco = _type_and_params(data, "recognition")
+            if reco_type is not None and reco_type not in RECOGNITION_TYPES:
+                report(ERROR, "unknown_recognition", node_id, "recognition", f"unknown recognition type {reco_type!r}")
+            for param in REQUIRED_PARAMS.get(reco_type, ()):
+                if reco.get(param) in (None, "", []):
+                    report(ERROR, "missing_param", node_id, param, f"{reco_type} requires '{param}'")
+
+            action_type, action = _type_and_params(data, "action")
+            if action_type is not None and action_type not in ACTION_TYPES:
+                report(ERROR, "unknown_action", node_id, "action", f"unknown action type {action_type!r}")
+            for param in REQUIRED_ACTION_PARAMS.get(action_type, ()):
+                if action.get(param) in (None, "", []):
+                    report(ERROR, "missing_param", node_id, param, f"{action_type} requires '{param}'")
+
+            if reco_type in ("TemplateMatch", "FeatureMatch"):
+                templates = reco.get("template")
+                templates = [templates] if isinstance(templates, str) else templates
+                if templates is not None and not isinstance(templates, list):
+                    report(ERROR, "invalid_template", node_id, "template", "template must be a path or a list of paths")
+                    templates = []
+                for path in templates or []:
+                    if not isinstance(path, str) or not path:
+                        report(ERROR, "invalid_template", node_id, "template", f"invalid template path {path!r}")
+                        continue
+                    uses_images = True
+                    if not self._template_exists(path):
+                        report(ERROR, "missing_template", node_id, "template", f"template '{path}' not found in image/")
+
+            for field in RECT_FIELDS:
+                params = reco if field == "roi" else action
+                if field not in params:
+                    continue
+                for value in _targets(field, params[field]):
+                    error = _rect_error(value, allow_point=field != "roi")
+                    if error:
+                        report(ERROR, "malformed_rect", node_id, field, error)
+                    elif isinstance(value, str):
+                        check_reference(node_id, field, value, severity=WARNING)
+            for field in OFFSET_FIELDS:
+                params = reco if field == "roi_offset" else action
+                for value in _targets(field, params.get(field)):
+                    if value is not None and (not isinstance(value, list) or len(value) != 4 or not all(_is_int(v) for v in value)):
+                        report(ERROR, "malformed_rect", node_id, field, f"expected [x, y, w, h], got {value!r}")
+
+            for field in NON_NEGATIVE_FIELDS:
+                value = data.get(field)
+                if isinstance(value, dict) and field in OBJECT_FIELDS:
+                    for member in OBJECT_FIELDS[field]:
+                        number = value.get(member)
+                        if number is not None and (not _is_int(number) or number < 0):
+                            report(WARNING, "invalid_number", node_id, f"{field}.{member}",
+                                   f"{field}.{member} should be a non-negative integer")
+                elif value is not None and (not _is_int(value) or value < 0):
+                    report(WARNING, "invalid_number", node_id, field, f"{field} should be a non-negative integer")
+            threshold = reco.get("threshold")
+            for value in threshold if isinstance(threshold, list) else ([threshold] if threshold is not None else []):
+                if not isinstance(value, (int, float)) or isinstance(value, bool) or not 0 <= value <= 1:
+                    report(WARNING, "invalid_number", node_id, "threshold", f"threshold should be within [0, 1], got {value!r}")
+
+            for field in EDGE_FIELDS:
+                if field not in data:
+                    continue
+                value = data[field]
+                if value is not None and not isinstance(value, (str, list, dict)):
+                    report(ERROR, "invalid_edge", node_id, field, f"{field} must be a node name or a list of names")
+                    continue
+                for link in parse_links(value):
+                    check_reference(node_id, field, link.target, anchor=link.anchor)
+
+        return FileResult(self.manager.file_version(resource_path, filename), diagnostics, defined, referenced,
+                          uses_images)
+
+    # ---------------------------
+    # 整体校验
+    # ---------------------------
+    def validate(self, files: Optional[List[FileKey]] = None, force: bool = False) -> Dict[str, Any]:
+        """
+        校验（或复用缓存）并返回诊断
+
+        Args:
+            files: 只返回这些文件的诊断（依赖关系仍按全部文件计算）
+            force: 忽略缓存全部重新检查
+
+        Returns:
+            {"diagnostics": [...], "summary": {...}}
+        """
+        started = time.perf_counter()
+        manager = self.manager
+        current: Dict[FileKey, Dict[str, Any]] = {}
+        for resource_path in manager.resource_paths:
+            for filename, nodes in manager._files_cache.get(resource_path, {}).items():
+                current[(resource_path, filename)] = nodes
+
+        with self._lock:
+            results = dict(self._results)
+            image_generation = manager.image_generation
+            images_changed = image_generation != self._image_generation
+
+        stale: Set[FileKey] = set(current) if force else set()
+        changed_names: Set[str] = set()
+        for key in list(results):
+            if key not in current:
+                changed_names |= results.pop(key).defined
+        for key in current:
+            cached = results.get(key)
+            if cached is None:
+                stale.add(key)
+            elif cached.version != manager.file_version(*key):
+                stale.add(key)
+            elif images_changed and cached.uses_images:
+                stale.add(key)
+
+        graph = manager.graph()
+
+        def is_defined(name: str, anchor: bool = False) -> bool:
+            return graph.has_node(name) or (anchor and graph.has_anchor(name))
+
+        checked: Set[FileKey] = set()
+        # 文件改动可能增删节点名，引用了这些名字的文件也要重查；重查后名字集合不再变化即停止
+        while stale:
+            batch = sorted(stale)
+            stale = set()
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="maa-validate") as executor:
+                fresh = list(executor.map(lambda k: self.check_file(k, current[k], is_defined), batch))
+            checked.update(batch)
+            names: Set[str] = set()
+            for key, result in zip(batch, fresh):
+                previous = results.get(key)
+                if previous is not None:
+                    names |= previous.defined ^ result.defined
+                else:
+                    names |= result.defined
+                results[key] = result
+            names |= changed_names
+            changed_names = set()
+            if names:
+                done = set(batch)
+                stale = {k for k, r in results.items() if k not in done and r.referenced & names}
+
+        with self._lock:
+            self._results = results
+            self._image_generation = image_generation
+
+        wanted = set(files) if files else None
+        diagnostics = [
+            d for key in sorted(results) if wanted is None or key in wanted for d in results[key].diagnostics
+        ]
+        return {
+            "diagnostics": diagnostics,
+            "summary": {
+                "files": len(results),
+                "checked": len(checked),
+                "cached": len(results) - len(checked),
+                "errors": sum(1 for d in diagnostics if d["severity"] == ERROR),
+                "warnings": sum(1 for d in diagnostics if d["severity"] == WARNING),
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+            },
+        }
@@ -0,0 +1,149 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from backend.common.utils import DEFAULT_SESSION_ID, load_config, norm_path
+from backend.untils import get_resources_manager
+from backend.common.events import debug_broker
+from backend.untils.runtime import sessions
+
+WARM_START_ENV = "MAA_WARM_START"
+COMPONENTS = ("device", "resource", "index")
+
+
+def warm_start_enabled(config: Optional[Dict[str, Any]] = None) -> bool:
+    """环境变量 MAA_WARM_START 优先，其次读取 config.json 中的 warm_start 开关（默认关闭）"""
+    env = os.environ.get(WARM_START_ENV)
+    if env is not None:
+        return env.strip().lower() in ("1", "true", "yes", "on")
+    cfg = config if config is not None else load_config()
+    return bool(cfg.get("warm_start", False))
+
+
+def current_profile_paths(config: Dict[str, Any]) -> List[str]:
+    """当前资源配置方案的资源路径（规范化、去空）"""
+    profiles = config.get("resource_profiles", []) or []
+    current_state = config.get("current_state", {}) or {}
+    try:
+        idx = int(current_state.get("resource_profile_index", 0))
+    except (TypeError, ValueError):
+        return []
+    if not (0 <= idx < len(profiles)):
+        return []
+    return [norm_path(p) for p in profiles[idx].get("paths", []) or [] if p]
+
+
+class WarmStart:
+    """
+    启动预热：在后台线程中并行重连上次的设备、加载当前方案的资源包并建立节点索引
+
+    每个组件的进度通过 SSE 推送（type=warm_start），/system/init 通过 snapshot() 返回就绪状态。
+    """
+
+    def __init__(self, publish: Callable[[dict], None]):
+        self._publish = publish
+        self._lock = threading.Lock()
+        self._started = False
+        self._state: Dict[str, Dict[str, Any]] = {
+            name: {"status": "idle", "ready": False, "error": None, "elapsed_ms": None} for name in COMPONENTS
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self._started,
+                "ready": {name: state["ready"] for name, state in self._state.items()},
+                "components": {name: dict(state) for name, state in self._state.items()},
+            }
+
+    def start(self, config: Optional[Dict[str, Any]] = None) -> bool:
+        """启动预热线程（只会执行一次），未开启时返回 False"""
+        cfg = config if config is not None else load_config()
+        if not warm_start_enabled(cfg):
+            return False
+        with self._lock:
+            if self._started:
+                return True
+            self._started = True
+
+        paths = current_profile_paths(cfg)
+        tasks = {
+            "device": lambda: self._restore_device(cfg.get("last_connected_device")),
+            "resource": lambda: self._load_resource(paths),
+            "index": lambda: self._build_index(paths),
+        }
+        for name, target in tasks.items():
+            threading.Thread(target=self._run, args=(name, target), name=f"warm-start-{name}", daemon=True).start()
+        return True
+
+    def _update(self, name: str, **fields):
+        with self._lock:
+            self._state[name].update(fields)
+            state = dict(self._state[name])
+        self._publish({
+            "type": "warm_start",
+            "component": name,
+            **state,
+            "timestamp": int(time.time() * 1000),
+        })
+
+    def _run(self, name: str, target: Callable[[], Optional[str]]):
+        self._update(name, status="running")
+        started = time.perf_counter()
+        try:
+            # 返回字符串表示跳过原因，返回 None 表示完成
+            skipped = target()
+        except Exception as exc:
+            elapsed = round((time.perf_counter() - started) * 1000, 1)
+            self._update(name, status="failed", ready=False, error=str(exc), elapsed_ms=elapsed)
+            return
+        elapsed = round((time.perf_counter() - started) * 1000, 1)
+        if skipped:
+            self._update(name, status="skipped", ready=False, error=skipped, elapsed_ms=elapsed)
+        else:
+            self._update(name, status="ready", ready=True, elapsed_ms=elapsed)
+
+    # ---------------------------
+    # 各组件
+    # ---------------------------
+    @staticmethod
+    def _session():
+        return sessions().get_or_create(DEFAULT_SESSION_ID)
+
+    def _restore_device(self, device: Optional[Dict[str, Any]]) -> Optional[str]:
+        if not device:
+            return "No last connected device"
+        maafw = self._session()
+        if device.get("type") == "adb":
+            success, msg = maafw.connect_adb(device.get("adb_path"), device.get("address"), device.get("config") or {})
+        elif device.get("type") == "win32":
+            success, msg = maafw.connect_win32hwnd(
+                hwnd=device.get("hwnd"),
+                screencap_method=device.get("screencap_method"),
+                mouse_method=device.get("mouse_method"),
+                keyboard_method=device.get("keyboard_method"),
+            )
+        else:
+            return f"Unknown device type: {device.get('type')}"
+        if not success:
+            raise RuntimeError(msg or "Connect failed")
+        return None
+
+    def _load_resource(self, paths: List[str]) -> Optional[str]:
+        if not paths:
+            return "Current profile has no paths"
+        success, msg = self._session().load_resource(paths)
+        if not success:
+            raise RuntimeError(msg or "Load failed")
+        return None
+
+    @staticmethod
+    def _build_index(paths: List[str]) -> Optional[str]:
+        if not paths:
+            return "Current profile has no paths"
+        get_resources_manager(paths)
+        return None
+
+
+warm_start = WarmStart(debug_broker.publish)
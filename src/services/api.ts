@@ -1,3 +1,5 @@
+import type { SpacingKey, SpacingOption } from '../utils/flowTypes'
+
 const DEFAULT_API_BASE_URL = 'http://127.0.0.1:38081'
 
 const API_BASE_URL = (() => {
@@ -89,8 +91,66 @@ export interface DeviceConfigPayload {
 export interface FileNodesResponse<TNodes = Record<string, unknown>> {
   nodes?: TNodes
   list?: ResourceFileInfo[]
+  version?: string
+}
+
+export interface NodeSummary {
+  id: string
+  recognition?: string | null
+  action?: string | null
+  next?: string[]
+  interrupt?: string[]
+  on_error?: string[]
+  timeout_next?: string[]
+}
+
+export interface NodeSummaryResponse {
+  nodes?: NodeSummary[]
+  total?: number
+  offset?: number
+  version?: string
+}
+
+export interface NodeBatchResponse<TNodes = Record<string, unknown>> {
+  nodes?: TNodes
+  missing?: string[]
+  version?: string
+}
+
+export interface NodeNeighborhoodResponse<TNodes = Record<string, unknown>> extends NodeBatchResponse<TNodes> {
+  frontier?: string[]
+  external?: string[]
+}
+
+export interface FileLayoutResponse {
+  positions?: Record<string, { x: number; y: number }>
+  chain?: string[]
+  cached?: boolean
+  elapsed_ms?: number
+  version?: string
 }
 
+export interface BulkFileNodes<TNodes = Record<string, unknown>> {
+  source: string
+  filename: string
+  version?: string | null
+  nodes: TNodes
+}
+
+export interface BulkMissingFile {
+  source: string
+  filename: string
+  reason: string
+}
+
+export interface BulkFileNodesResponse<TNodes = Record<string, unknown>> {
+  files?: BulkFileNodes<TNodes>[]
+  missing?: BulkMissingFile[]
+  count?: number
+}
+
+export type BulkFileNodesTarget = { files: { source: string; filename: string }[] } | { glob: string; source?: string; paths?: string[] }
+
 export interface TemplateImagesResponse<TResult = Record<string, unknown>> {
   results?: TResult
 }
@@ -146,6 +206,81 @@ async function request<T>(endpoint: string, options: RequestOptions = {}): Promi
   }
 }
 
+// 节点文件的条件请求缓存：key 为 source + filename，保存版本号与原始响应文本
+const fileNodesCache = new Map<string, { version: string; text: string }>()
+
+async function requestFileNodes<T>(source: string, filename: string): Promise<T> {
+  const key = `${source}\u0000${filename}`
+  const cached = fileNodesCache.get(key)
+  const url = `${API_BASE_URL}/resource/file/nodes`
+  const controller = new AbortController()
+  const timeoutId = setTimeout(() => controller.abort(), 10_000)
+
+  try {
+    const headers: JsonHeaders = { 'Content-Type': 'application/json' }
+    if (cached) headers['If-None-Match'] = `W/"${cached.version}"`
+    const response = await fetch(url, {
+      method: 'POST',
+      body: JSON.stringify({ source, filename }),
+      headers,
+      signal: controller.signal
+    })
+    clearTimeout(timeoutId)
+    // 文件未变化：复用上次的响应，每次重新解析，调用方拿到的始终是独立的对象
+    if (response.status === 304 && cached) return JSON.parse(cached.text) as T
+    const text = await response.text()
+    if (!response.ok) {
+      fileNodesCache.delete(key)
+      throw new Error(`API Error ${response.status}: ${text || response.statusText}`)
+    }
+    const data = JSON.parse(text) as T & { version?: string }
+    if (data.version) fileNodesCache.set(key, { version: data.version, text })
+    else fileNodesCache.delete(key)
+    return data
+  } catch (err) {
+    clearTimeout(timeoutId)
+    throw err
+  }
+}
+
+// 以 NDJSON 流式读取多个文件：每到达一个文件就回调一次，返回最后的 done 行
+async function streamFileNodes<TNodes>(
+  target: BulkFileNodesTarget,
+  onFile: (file: BulkFileNodes<TNodes>) => void,
+  onMissing?: (missing: BulkMissingFile) => void
+): Promise<{ count: number; missing: number }> {
+  const response = await fetch(`${API_BASE_URL}/resource/files/nodes`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ ...target, stream: true })
+  })
+  if (!response.ok || !response.body) {
+    const text = await response.text().catch(() => '')
+    throw new Error(`API Error ${response.status}: ${text || response.statusText}`)
+  }
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+  let done = { count: 0, missing: 0 }
+  const handleLine = (line: string) => {
+    if (!line.trim()) return
+    const { type, ...entry } = JSON.parse(line)
+    if (type === 'file') onFile(entry as BulkFileNodes<TNodes>)
+    else if (type === 'missing') onMissing?.(entry as BulkMissingFile)
+    else if (type === 'done') done = entry as typeof done
+  }
+  for (;;) {
+    const { value, done: finished } = await reader.read()
+    if (finished) break
+    buffer += decoder.decode(value, { stream: true })
+    const lines = buffer.split('\n')
+    buffer = lines.pop() ?? ''
+    lines.forEach(handleLine)
+  }
+  handleLine(buffer + decoder.decode())
+  return done
+}
+
 export const systemApi = {
   getInitialState: () => request<SystemInitResponse>('/system/init', { method: 'GET' }),
   saveDeviceConfig: (fullConfig: DeviceConfigPayload) =>
@@ -185,13 +320,42 @@ export const resourceApi = {
     })
   },
   getFileNodes: <TNodes = Record<string, unknown>>(source: string, filename: string) =>
-    request<FileNodesResponse<TNodes>>('/resource/file/nodes', { method: 'POST', body: JSON.stringify({ source, filename }) }),
+    requestFileNodes<FileNodesResponse<TNodes>>(source, filename),
+  getNodeSummaries: (source: string, filename: string, offset = 0, limit?: number) =>
+    request<NodeSummaryResponse>('/resource/file/nodes/summary', { method: 'POST', body: JSON.stringify({ source, filename, offset, limit }) }),
+  getNodesByIds: <TNodes = Record<string, unknown>>(source: string, filename: string, ids: string[]) =>
+    request<NodeBatchResponse<TNodes>>('/resource/file/nodes/batch', { method: 'POST', body: JSON.stringify({ source, filename, ids }) }),
+  getNodeNeighborhood: <TNodes = Record<string, unknown>>(
+    source: string,
+    filename: string,
+    entry: string,
+    options: { depth?: number; limit?: number; direction?: 'out' | 'in' | 'both' } = {}
+  ) =>
+    request<NodeNeighborhoodResponse<TNodes>>('/resource/file/nodes/neighborhood', { method: 'POST', body: JSON.stringify({ source, filename, entry, ...options }) }),
+  getFilesNodes: <TNodes = Record<string, unknown>>(target: BulkFileNodesTarget) =>
+    request<BulkFileNodesResponse<TNodes>>('/resource/files/nodes', { method: 'POST', body: JSON.stringify(target), timeoutMs: 60_000 }),
+  streamFilesNodes: streamFileNodes,
   getTemplateImages: (source: string, filename: string) =>
     request<TemplateImagesResponse>('/resource/file/templates', { method: 'POST', body: JSON.stringify({ source, filename }) }),
   createFile: (path: string, filename: string) =>
     request<ApiResponse>('/resource/file/create', { method: 'POST', body: JSON.stringify({ path, filename }) }),
   saveFileNodes: <TNodes = Record<string, unknown>>(source: string, filename: string, nodes: TNodes) =>
     request<ApiResponse>('/resource/file/save', { method: 'POST', body: JSON.stringify({ source, filename, nodes }) }),
+  getFileLayout: (
+    source: string,
+    filename: string,
+    options: { spacing?: SpacingKey | SpacingOption; root?: string; sizes?: Record<string, [number, number]> } = {}
+  ) =>
+    request<FileLayoutResponse>('/resource/file/layout', { method: 'POST', body: JSON.stringify({ source, filename, ...options }) }),
+  patchFileNodes: <TNode = Record<string, unknown>>(
+    source: string,
+    filename: string,
+    patch: { upserts?: Record<string, TNode>; deletes?: string[]; baseVersion?: string }
+  ) =>
+    request<ApiResponse & { version?: string }>('/resource/file/patch', {
+      method: 'POST',
+      body: JSON.stringify({ source, filename, upserts: patch.upserts, deletes: patch.deletes, base_version: patch.baseVersion })
+    }),
   searchGlobalNodes: (query: string, useRegex: boolean, currentFilename: string, currentSource: string) =>
     request<ApiResponse>('/resource/search/nodes', { method: 'POST', body: JSON.stringify({ query, use_regex: useRegex, current_filename: currentFilename, current_source: currentSource }) }),
   checkUnusedImages: (source: string, currentFilename: string, delImages: { path: string }[]) =>